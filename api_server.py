@@ -7,13 +7,16 @@ Access: http://localhost:8000/docs
 """
 
 import os
+import time
+import uuid
+import asyncio
 from pathlib import Path
-from typing import Optional, List
+from typing import Callable, Optional, List
 from datetime import datetime
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, Response
+from fastapi.responses import HTMLResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
@@ -21,13 +24,28 @@ from contextlib import asynccontextmanager
 
 import chromadb
 from chromadb.config import Settings
-from langchain_anthropic import ChatAnthropic
 from langchain_openai import ChatOpenAI
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph, END
 from typing import TypedDict
 import json
 
 from wiki_manager import WikiManager
+from session_queue import SessionTurnQueue
+from llm_limiter import BackendLimiter, BackendSaturated, LimitedLLM
+from context_packer import ContextPacker
+from lore_ingest import LoreIndexer, MANIFEST_NAME, read_manifest_fingerprint, stitch_chunks
+from lore_watcher import VaultWatcher
+from lore_cache import LoreQueryCache, split_rows
+from lore_queries import SubQueryBuilder, merge_by_distance, merge_rows
+from lexical_index import RETRIEVAL_MODES, BM25Index, HybridRetriever
+from lore_diversity import MMRReranker
+from vector_index import STORE_NAME as VECTOR_STORE_NAME, VECTOR_BACKENDS, NumpyVectorIndex
+from wiki_index import WikiIndex
+from llm_router import LLMRouter, TrackedLLM, HedgedCaller, ROUTING_POLICIES, route_override
+from llm_transport import PooledChatAnthropic, build_async_client, warm_up
+from metrics import REGISTRY, DISK_WRITE_SECONDS, timed
+from llm_cassette import Cassette
 
 # ============================================================================
 # Pydantic Models for API
@@ -36,6 +54,7 @@ from wiki_manager import WikiManager
 class NarrativeRequest(BaseModel):
     user_input: str
     session_id: Optional[str] = None
+    wiki_name: Optional[str] = None  # Wiki open in the client; its pages are searched with the vault lore
 
 class NarrativeResponse(BaseModel):
     narrative: str
@@ -43,6 +62,8 @@ class NarrativeResponse(BaseModel):
     quality_check: str
     session_id: str
     timestamp: str
+    backend: Optional[str] = None  # Backend whose narration was used
+    hedged: bool = False  # True if a second backend was raced against the first
 
 class SessionResponse(BaseModel):
     session_id: str
@@ -54,11 +75,33 @@ class HealthResponse(BaseModel):
     status: str
     lore_documents: int
     model: str
+    lore_index: Optional[dict] = None  # Vault watcher freshness (lag, pending files) when enabled
+
+class BatchNarrativeRequest(BaseModel):
+    requests: List[NarrativeRequest]
+    max_concurrency: Optional[int] = None  # Sessions run at once; defaults to the Claude limit
+
+class BatchItemResult(BaseModel):
+    index: int
+    session_id: str
+    status_code: int
+    result: Optional[NarrativeResponse] = None
+    error: Optional[str] = None
+
+class BatchNarrativeResponse(BaseModel):
+    results: List[BatchItemResult]
+    succeeded: int
+    failed: int
+    elapsed_seconds: float
 
 # ============================================================================
 # LangGraph State and Agents
 # ============================================================================
 
+QUALITY_MODES = ("inline", "background")
+BATCH_MAX_ITEMS = 100
+QUALITY_PENDING = "PENDING"
+
 class NarrativeState(TypedDict):
     user_input: str
     session_id: str
@@ -68,6 +111,22 @@ class NarrativeState(TypedDict):
     quality_check: str
     final_output: str
     use_lmstudio: bool  # Router flag
+    backend_used: str  # Backend that actually produced the narrative
+    hedged: bool
+
+
+def load_env_settings(env_path: str = ".env") -> dict:
+    """Read KEY=value pairs from the .env file (empty dict if it doesn't exist)"""
+    settings = {}
+    if os.path.exists(env_path):
+        with open(env_path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#') or '=' not in line:
+                    continue
+                key, value = line.split('=', 1)
+                settings[key.strip()] = value.strip()
+    return settings
 
 
 def route_to_llm(user_input: str) -> bool:
@@ -76,8 +135,9 @@ def route_to_llm(user_input: str) -> bool:
     Returns True if LM Studio should be used, False for Claude.
 
     Rule: If message starts with 'lmstudio' (case-insensitive), use LM Studio.
+    The LLMRouter applies this as an override on top of its routing policy.
     """
-    return user_input.strip().lower().startswith("lmstudio")
+    return route_override(user_input) == "lmstudio"
 
 class ConversationManager:
     """Manages conversation history"""
@@ -88,6 +148,11 @@ class ConversationManager:
         self.sessions_dir.mkdir(exist_ok=True)
         self.session_file = self.sessions_dir / f"api_{session_id}.json"
         self.conversation_history = []
+        # Rolling summary of the first summarized_count messages
+        self.summary = ""
+        self.summarized_count = 0
+        self.summary_epoch = 0  # Bumped when the summary is discarded; retires in-flight folds
+        self.fold_end = None  # End of the slice an in-flight fold is summarizing
         self.load_session()
 
     def load_session(self):
@@ -95,28 +160,97 @@ class ConversationManager:
             with open(self.session_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
                 self.conversation_history = data.get('history', [])
+                self.summary = data.get('summary', "")
+                self.summarized_count = data.get('summarized_count', 0)
 
     def save_session(self):
         data = {
             'session_id': self.session_id,
             'created': self.conversation_history[0]['timestamp'] if self.conversation_history else datetime.now().isoformat(),
             'updated': datetime.now().isoformat(),
-            'history': self.conversation_history
+            'history': self.conversation_history,
+            'summary': self.summary,
+            'summarized_count': self.summarized_count
         }
-        with open(self.session_file, 'w', encoding='utf-8') as f:
+        with DISK_WRITE_SECONDS.time(target="session"), open(self.session_file, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
 
-    def add_message(self, role: str, content: str):
+    def add_message(self, role: str, content: str, **extra) -> dict:
         message = {
             'role': role,
             'content': content,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': datetime.now().isoformat(),
+            **extra
         }
         self.conversation_history.append(message)
         self.save_session()
+        return message
 
-    def get_recent_context(self, max_messages: int = 6) -> str:
-        recent = self.conversation_history[-max_messages:] if len(self.conversation_history) > max_messages else self.conversation_history
+    def set_quality_check(self, message: dict, status: str, verdict: str) -> bool:
+        """
+        Record a quality verdict on a message that is still in the history.
+
+        Returns False if the message was undone in the meantime.
+        """
+        if not any(m is message for m in self.conversation_history):
+            return False
+        message['quality_status'] = status
+        message['quality_check'] = verdict
+        self.save_session()
+        return True
+
+    def summary_backlog(self, packer: ContextPacker) -> tuple:
+        """
+        (start, end) slice of the next fold: the oldest messages that have
+        left the recent window but aren't in the summary yet, capped to what
+        packer.pack_fold() takes, so a long backlog (an old session, or one
+        whose summary was discarded) is folded over several turns instead of
+        in one huge prompt. start == end means nothing to do.
+        """
+        window_start = len(self.conversation_history) - len(packer.pack_history(self.conversation_history))
+        backlog = self.conversation_history[self.summarized_count:window_start]
+        return self.summarized_count, self.summarized_count + len(packer.pack_fold(backlog))
+
+    def reset_summary(self):
+        """Discard the summary (it describes messages that were undone or edited); it is rebuilt over later turns"""
+        self.summary = ""
+        self.summarized_count = 0
+        self.summary_epoch += 1
+
+    def truncate(self, length: int):
+        """Drop the messages from length on, retiring a summary or in-flight fold that covers them"""
+        self.conversation_history = self.conversation_history[:length]
+        if self.summarized_count > length:
+            # The summary describes turns that no longer exist; rebuild it later
+            self.reset_summary()
+        elif self.fold_end is not None and self.fold_end > length:
+            # A fold in flight read turns that no longer exist; new turns may
+            # refill those positions before it lands, so its epoch must not match
+            self.summary_epoch += 1
+
+    def apply_summary(self, summary: str, summarized_count: int, epoch: Optional[int] = None) -> bool:
+        """
+        Store a new rolling summary covering the first summarized_count messages.
+
+        Returns False (and changes nothing) if the history was undone below
+        that point, or the summary was discarded (epoch moved on), while
+        the summary was being written.
+        """
+        if summarized_count > len(self.conversation_history):
+            return False
+        if epoch is not None and epoch != self.summary_epoch:
+            return False
+        self.summary = summary
+        self.summarized_count = summarized_count
+        self.save_session()
+        return True
+
+    def get_recent_context(self, max_messages: int = 6, packer: Optional[ContextPacker] = None) -> str:
+        if packer:
+            # Token-budgeted: as many whole recent messages as fit
+            recent = packer.pack_history(self.conversation_history)
+        else:
+            recent = self.conversation_history[-max_messages:] if len(self.conversation_history) > max_messages else self.conversation_history
         context = ""
         for msg in recent:
             role = "You" if msg['role'] == 'user' else "AI"
@@ -132,37 +266,121 @@ class ConversationManager:
         }
 
 class LoreKeeperAgent:
-    def __init__(self, chroma_collection):
+    def __init__(self, chroma_collection, packer: Optional[ContextPacker] = None, n_results: int = 12,
+                 cache: Optional[LoreQueryCache] = None, hybrid: Optional[HybridRetriever] = None,
+                 query_builder: Optional[SubQueryBuilder] = None, conv_managers: Optional[dict] = None,
+                 wiki_index: Optional[WikiIndex] = None, session_wikis: Optional[dict] = None,
+                 mmr: Optional[MMRReranker] = None):
         self.collection = chroma_collection
-
-    def __call__(self, state: NarrativeState) -> NarrativeState:
-        search_results = self.collection.query(
-            query_texts=[state["user_input"]],
-            n_results=3
+        self.packer = packer or ContextPacker()
+        # Chunks to fetch (several may come from one file); the packer's budget decides what's used
+        self.n_results = n_results
+        self.cache = cache  # None = embed and search on every turn
+        self.hybrid = hybrid  # None = vector search only
+        self.query_builder = query_builder  # None = the player's input is the only query
+        self.conv_managers = conv_managers if conv_managers is not None else {}
+        self.wiki_index = wiki_index  # None = vault lore only
+        self.session_wikis = session_wikis if session_wikis is not None else {}  # session id -> wiki name
+        self.mmr = mmr  # None = keep the n_results best chunks as ranked
+
+    @property
+    def fetch_k(self) -> int:
+        """Chunks retrieved per query (MMR over-fetches candidates, then keeps its k)"""
+        return self.mmr.fetch_k if self.mmr is not None else self.n_results
+
+    async def search(self, queries: List[str]) -> List[dict]:
+        """Results for each query; whatever isn't cached goes out in one batched query"""
+        # Chroma's client and embedding model are synchronous, so run the
+        # query in a worker thread to keep the event loop free
+        if self.cache is None:
+            results = await asyncio.to_thread(
+                self.collection.query,
+                query_texts=queries,
+                n_results=self.fetch_k
+            )
+            return split_rows(results) if len(queries) > 1 else [results]
+
+        # Repeated inputs are answered without leaving the event loop
+        rows = [self.cache.cached(query, self.fetch_k) for query in queries]
+        missing = [i for i, row in enumerate(rows) if row is None]
+        if missing:
+            fetched = await asyncio.to_thread(
+                self.cache.fetch_many, self.collection, [queries[i] for i in missing], self.fetch_k
+            )
+            for i, row in zip(missing, fetched):
+                rows[i] = row
+        return rows
+
+    async def __call__(self, state: NarrativeState) -> NarrativeState:
+        queries = [state["user_input"]]
+        if self.query_builder is not None:
+            # "I follow her inside" needs the narrator's last message to mean anything
+            conv_manager = self.conv_managers.get(state.get("session_id"))
+            history = conv_manager.conversation_history if conv_manager else []
+            queries = self.query_builder.build(state["user_input"], history)
+        wiki_name = self.session_wikis.get(state.get("session_id")) if self.wiki_index else None
+        fetch_k = self.fetch_k
+        if wiki_name is None:
+            search_results = merge_rows(await self.search(queries), fetch_k)
+        else:
+            # Pages the Lore Keeper saved to the session's wiki, searched alongside the vault
+            vault_rows, wiki_rows = await asyncio.gather(
+                self.search(queries),
+                asyncio.to_thread(self.wiki_index.query, wiki_name, queries, fetch_k)
+            )
+            search_results = merge_rows(vault_rows, fetch_k)
+            if wiki_rows:
+                search_results = merge_by_distance([search_results, merge_rows(wiki_rows, fetch_k)], fetch_k)
+
+        # Exact names the embedding missed come in through BM25 (including
+        # the names the sub-queries picked up from the conversation)
+        if self.hybrid is not None:
+            search_results = await asyncio.to_thread(
+                self.hybrid.fuse, " ".join(queries), search_results, fetch_k
+            )
+
+        # Near-duplicate chunks (the same character described three times)
+        # would spend the lore budget on one fact
+        if self.mmr is not None:
+            search_results = await asyncio.to_thread(self.mmr.rerank, search_results)
+
+        distances = search_results.get('distances')
+        # Chunks from the same file are stitched back into one excerpt
+        documents, file_distances = stitch_chunks(
+            search_results['documents'][0],
+            search_results['metadatas'][0],
+            distances[0] if distances else None
         )
 
-        lore_files = [m['filename'] for m in search_results['metadatas'][0]]
-
-        lore_context = ""
-        for i, doc in enumerate(search_results['documents'][0]):
-            filename = search_results['metadatas'][0][i]['filename']
-            lore_context += f"\n--- {filename} ---\n{doc[:1200]}\n"
+        lore_context, lore_files = self.packer.pack_lore(
+            state["user_input"],
+            documents,
+            file_distances
+        )
 
         state["relevant_lore"] = lore_files
         state["lore_context"] = lore_context
         return state
 
 class NarratorAgent:
-    def __init__(self, llm_claude, llm_lmstudio, conv_managers: dict):
+    def __init__(self, llm_claude, llm_lmstudio, conv_managers: dict, packer: Optional[ContextPacker] = None,
+                 hedger: Optional[HedgedCaller] = None):
         self.llm_claude = llm_claude
         self.llm_lmstudio = llm_lmstudio
         self.conv_managers = conv_managers
+        self.packer = packer or ContextPacker()
+        self.hedger = hedger  # None = plain call to the routed backend, no deadline
 
-    def __call__(self, state: NarrativeState) -> NarrativeState:
+    async def __call__(self, state: NarrativeState) -> NarrativeState:
         session_id = state["session_id"]
         conv_manager = self.conv_managers.get(session_id)
 
-        recent_context = conv_manager.get_recent_context() if conv_manager else ""
+        recent_context = conv_manager.get_recent_context(packer=self.packer) if conv_manager else ""
+
+        # Older turns that fell out of the recent window live on in the summary
+        story_so_far = ""
+        if conv_manager and conv_manager.summary:
+            story_so_far = f"STORY SO FAR:\n{self.packer.pack_summary(conv_manager.summary)}\n\n"
 
         # Strip "lmstudio" prefix from user input for the actual prompt
         user_input = state['user_input']
@@ -170,13 +388,14 @@ class NarratorAgent:
             user_input = user_input.strip()
             if user_input.lower().startswith("lmstudio"):
                 user_input = user_input[8:].strip()  # Remove "lmstudio" prefix
+        user_input = self.packer.pack_input(user_input)
 
         prompt = f"""You are the Narrator for the DOAMMO universe.
 
 RELEVANT LORE:
 {state['lore_context']}
 
-RECENT CONVERSATION CONTEXT:
+{story_so_far}RECENT CONVERSATION CONTEXT:
 {recent_context}
 
 CURRENT USER INPUT:
@@ -191,16 +410,28 @@ Generate an engaging narrative response (2-3 paragraphs) that:
 """
 
         # Route to appropriate LLM
-        llm = self.llm_lmstudio if state.get("use_lmstudio") else self.llm_claude
-        response = llm.invoke(prompt)
-        state["narrative"] = response.content
+        backend = "lmstudio" if state.get("use_lmstudio") else "claude"
+        if self.hedger is not None:
+            # Falls back to the other backend if this one stalls before its
+            # first token. The hedged calls stream silently; the winner's
+            # tokens go to /narrative/stream through the custom stream
+            content, backend, hedged = await self.hedger.call(prompt, backend, on_token=stream_writer())
+        else:
+            llm = self.llm_lmstudio if state.get("use_lmstudio") else self.llm_claude
+            content = (await llm.ainvoke(prompt)).content
+            hedged = False
+
+        state["narrative"] = content
+        state["final_output"] = content
+        state["backend_used"] = backend
+        state["hedged"] = hedged
         return state
 
 class QualityAgent:
     def __init__(self, llm):
         self.llm = llm
 
-    def __call__(self, state: NarrativeState) -> NarrativeState:
+    async def __call__(self, state: NarrativeState) -> NarrativeState:
         prompt = f"""You are the Quality Keeper for the DOAMMO universe.
 
 LORE CONTEXT:
@@ -219,18 +450,62 @@ Respond with either:
 - "NEEDS REVISION: [issues]" if there are problems
 """
 
-        response = self.llm.invoke(prompt)
+        response = await self.llm.ainvoke(prompt)
         state["quality_check"] = response.content
         state["final_output"] = state["narrative"]
         return state
 
+class SummaryAgent:
+    """Folds messages that left the recent window into a session's rolling summary."""
+
+    def __init__(self, llm, max_words: int = 250):
+        self.llm = llm
+        self.max_words = max_words
+
+    @timed("summary")
+    async def fold(self, summary: str, messages: list) -> str:
+        """
+        Extend the rolling summary with new messages.
+
+        Args:
+            summary: The current summary ("" if there is none yet)
+            messages: Message dicts to fold in, oldest first
+
+        Returns:
+            The updated summary
+        """
+        transcript = ""
+        for msg in messages:
+            role = "Player" if msg['role'] == 'user' else "Narrator"
+            transcript += f"{role}: {msg['content']}\n\n"
+
+        prompt = f"""You are the Chronicler for the DOAMMO universe.
+
+STORY SO FAR:
+{summary or "(the story has just begun)"}
+
+NEW EVENTS:
+{transcript}
+Rewrite STORY SO FAR so that it also covers the new events.
+- Keep names, places, items, promises and unresolved threads
+- Drop moment-to-moment description that no longer matters
+- Write in past tense, third person
+- Stay under {self.max_words} words
+
+Respond ONLY with the updated summary, no other text.
+"""
+
+        response = await self.llm.ainvoke(prompt)
+        return response.content.strip()
+
 class LoreExtractorAgent:
     """Extracts lore entities (characters, locations, items, events) from narrative text."""
 
     def __init__(self, llm):
         self.llm = llm
 
-    def extract(self, narrative_text: str, existing_entities: dict = None) -> dict:
+    @timed("lore_extractor")
+    async def extract(self, narrative_text: str, existing_entities: dict = None) -> dict:
         """
         Extract lore entities from narrative text.
 
@@ -287,7 +562,7 @@ If no new entities are found for a category, use an empty array [].
 Respond ONLY with the JSON, no other text.
 """
 
-        response = self.llm.invoke(prompt)
+        response = await self.llm.ainvoke(prompt)
 
         # Parse the JSON response
         try:
@@ -303,7 +578,7 @@ Respond ONLY with the JSON, no other text.
             print(f"Failed to parse lore extraction response: {response.content}")
             return {"characters": [], "locations": [], "items": [], "events": []}
 
-    def extract_from_conversation(self, messages: list, existing_entities: dict = None) -> dict:
+    async def extract_from_conversation(self, messages: list, existing_entities: dict = None) -> dict:
         """
         Extract lore from an entire conversation.
 
@@ -324,7 +599,29 @@ Respond ONLY with the JSON, no other text.
         if not narrative_text.strip():
             return {"characters": [], "locations": [], "items": [], "events": []}
 
-        return self.extract(narrative_text, existing_entities)
+        return await self.extract(narrative_text, existing_entities)
+
+def build_workflow(lore_keeper, narrator, quality=None):
+    """
+    Wire the agents into the LangGraph pipeline.
+
+    The agents are async callables, so the compiled graph must be driven
+    with ainvoke() - many turns can then be in flight on one event loop.
+    Without a quality agent the graph ends at the narrator. Every node is
+    timed into the doammo_agent_seconds histogram.
+    """
+    workflow = StateGraph(NarrativeState)
+    workflow.add_node("lore_keeper", timed("lore_keeper")(lore_keeper))
+    workflow.add_node("narrator", timed("narrator")(narrator))
+    workflow.set_entry_point("lore_keeper")
+    workflow.add_edge("lore_keeper", "narrator")
+    if quality is None:
+        workflow.add_edge("narrator", END)
+    else:
+        workflow.add_node("quality", timed("quality")(quality))
+        workflow.add_edge("narrator", "quality")
+        workflow.add_edge("quality", END)
+    return workflow.compile()
 
 # Global lore extractor instance
 lore_extractor = None
@@ -338,7 +635,27 @@ llm_claude = None
 llm_lmstudio = None
 workflow_app = None
 conv_managers = {}
+session_queue = SessionTurnQueue()
+llm_limiters = {}  # backend name -> BackendLimiter
+llm_router = None
+narration_hedger = None  # Deadline + hedging for narrator calls
+http_client = None  # Connection pool shared by all LLM clients
+llm_cassette = None  # Record/replay layer (None = live LLM calls)
+lore_indexer = None  # Incremental vault -> Chroma sync (None = no vault configured)
+lore_watcher = None  # Streams vault edits into the index (None = LORE_WATCH off)
+lore_cache = None  # Query embedding + retrieval result cache (None = disabled)
+lore_hybrid = None  # BM25 + vector fusion (None = LORE_RETRIEVAL=vector)
+lore_vectors = None  # In-process vector index (None = LORE_VECTOR_BACKEND=chroma)
+lore_mmr = None  # Diversity reranking (None = LORE_MMR off)
 wiki_manager = None
+wiki_index = None  # Per-wiki page collections (None = WIKI_INDEX off)
+session_wikis = {}  # session_id -> wiki whose pages the Lore Keeper also searches
+quality_agent = None
+quality_mode = "inline"
+context_packer = ContextPacker()
+summary_agent = None  # None disables rolling summaries
+summary_tasks = {}  # session_id -> running summary task (one at a time per session)
+background_tasks = set()  # Strong refs so pending tasks aren't garbage collected
 
 # ============================================================================
 # Lifespan Context Manager (must be defined before app initialization)
@@ -348,28 +665,34 @@ wiki_manager = None
 async def lifespan(app: FastAPI):
     """Initialize system on startup and cleanup on shutdown"""
     global chroma_collection, llm_claude, llm_lmstudio, workflow_app, wiki_manager, lore_extractor
+    global quality_agent, quality_mode, llm_limiters, context_packer, summary_agent, llm_router
+    global narration_hedger, http_client, llm_cassette, lore_indexer, lore_watcher, lore_cache, lore_hybrid
+    global lore_vectors, wiki_index, lore_mmr
 
     print("Initializing DOAMMO Narrative Engine API...")
 
     # Load environment variables
-    env_path = ".env"
-    api_key = None
-    lmstudio_url = "http://localhost:1234/v1"  # Default
-
-    if os.path.exists(env_path):
-        with open(env_path, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line.startswith('ANTHROPIC_API_KEY='):
-                    api_key = line.split('=', 1)[1]
-                elif line.startswith('LM_STUDIO_URL='):
-                    lmstudio_url = line.split('=', 1)[1]
+    env_settings = load_env_settings()
+    api_key = env_settings.get('ANTHROPIC_API_KEY')
+    lmstudio_url = env_settings.get('LM_STUDIO_URL', "http://localhost:1234/v1")
+    quality_mode = env_settings.get('QUALITY_MODE', "inline").lower()
+    if quality_mode not in QUALITY_MODES:
+        raise RuntimeError(f"QUALITY_MODE must be one of {QUALITY_MODES}, got '{quality_mode}'")
+
+    # LLM_CASSETTE=record saves every LLM response; replay serves them
+    # back without calling (or needing keys for) the providers
+    llm_cassette = Cassette.from_settings(env_settings)
+    replaying = llm_cassette is not None and llm_cassette.mode == "replay"
+    if llm_cassette:
+        print(f"LLM cassette: {llm_cassette.mode} ({llm_cassette.path}, {len(llm_cassette.entries)} entries)")
 
     if not api_key:
-        raise RuntimeError("API key not found in .env file")
+        if not replaying:
+            raise RuntimeError("API key not found in .env file")
+        api_key = "replay"
 
     # Connect to ChromaDB
-    chroma_path = Path("chroma_data")
+    chroma_path = Path(env_settings.get('CHROMA_PATH', "chroma_data"))
     client = chromadb.PersistentClient(
         path=str(chroma_path),
         settings=Settings(anonymized_telemetry=False)
@@ -377,11 +700,47 @@ async def lifespan(app: FastAPI):
     chroma_collection = client.get_collection(name="doammo_lore")
     print(f"Connected to lore database ({chroma_collection.count()} documents)")
 
+    # With a vault configured, POST /lore/reindex re-embeds changed files
+    # into the live collection while queries keep being served
+    vault_path = env_settings.get('VAULT_PATH')
+    lore_dir = Path(vault_path) / env_settings.get('LORE_DIR', "_Lore") if vault_path else None
+    if lore_dir and lore_dir.is_dir():
+        lore_indexer = LoreIndexer(chroma_collection, lore_dir, chroma_path / MANIFEST_NAME,
+                                   workers=int(env_settings.get('LORE_INGEST_WORKERS', 1)))
+        print(f"Lore index tracking {lore_dir} ({len(lore_indexer.manifest['files'])} files in manifest)")
+    else:
+        lore_indexer = None
+
+    # Optionally keep the index in step with the vault as writers edit it
+    if lore_indexer and env_settings.get('LORE_WATCH', "false").lower() == "true":
+        lore_watcher = VaultWatcher(
+            lore_indexer,
+            debounce=float(env_settings.get('LORE_WATCH_DEBOUNCE_SECONDS', 1.0)),
+            max_delay=float(env_settings.get('LORE_WATCH_MAX_DELAY_SECONDS', 10)),
+            poll_interval=float(env_settings.get('LORE_WATCH_POLL_SECONDS', 2)),
+            backend=env_settings.get('LORE_WATCH_BACKEND', "auto").lower()
+        )
+        lore_watcher.start()
+        print(f"Watching {lore_dir} for lore edits ({lore_watcher.backend})")
+    else:
+        lore_watcher = None
+
+    # One keep-alive connection pool for every LLM client, so the narrator,
+    # quality and extractor calls in a turn reuse warm connections
+    http2_setting = env_settings.get('LLM_HTTP2', "auto").lower()
+    http_client = build_async_client(
+        max_connections=int(env_settings.get('LLM_HTTP_MAX_CONNECTIONS', 20)),
+        max_keepalive=int(env_settings.get('LLM_HTTP_MAX_KEEPALIVE', 10)),
+        keepalive_expiry=float(env_settings.get('LLM_HTTP_KEEPALIVE_SECONDS', 30)),
+        http2=None if http2_setting == "auto" else http2_setting == "true"
+    )
+
     # Initialize Claude LLM
-    llm_claude = ChatAnthropic(
+    llm_claude = PooledChatAnthropic(
         model="claude-sonnet-4-20250514",
         api_key=api_key,
-        max_tokens=600
+        max_tokens=600,
+        http_async_client=http_client
     )
     print("Claude LLM initialized")
 
@@ -389,37 +748,232 @@ async def lifespan(app: FastAPI):
     llm_lmstudio = ChatOpenAI(
         base_url=lmstudio_url,
         api_key="lm-studio",  # LM Studio doesn't require a real key
-        max_tokens=600
+        max_tokens=600,
+        http_async_client=http_client
     )
     print(f"LM Studio LLM configured at {lmstudio_url}")
 
-    # Create agents
-    lore_keeper = LoreKeeperAgent(chroma_collection)
-    narrator = NarratorAgent(llm_claude, llm_lmstudio, conv_managers)
-    quality = QualityAgent(llm_claude)  # Quality check always uses Claude
-    lore_extractor = LoreExtractorAgent(llm_claude)  # Lore extraction always uses Claude
+    # Open connections in the background so startup isn't held up by the network
+    warm_connections = int(env_settings.get('LLM_HTTP_WARM_CONNECTIONS', 2))
+    if warm_connections > 0 and not replaying:
+        run_in_background(warm_up(
+            http_client, [llm_claude.anthropic_api_url, lmstudio_url], connections=warm_connections
+        ))
+
+    # Bound concurrent calls per backend so bursts queue (or get a 429)
+    # instead of tripping provider rate limits or overloading LM Studio
+    llm_limiters = {
+        "claude": BackendLimiter(
+            "claude",
+            max_concurrency=int(env_settings.get('CLAUDE_MAX_CONCURRENCY', 4)),
+            max_queue=int(env_settings.get('CLAUDE_MAX_QUEUE', 16))
+        ),
+        "lmstudio": BackendLimiter(
+            "lmstudio",
+            max_concurrency=int(env_settings.get('LM_STUDIO_MAX_CONCURRENCY', 1)),
+            max_queue=int(env_settings.get('LM_STUDIO_MAX_QUEUE', 4))
+        )
+    }
+    for limiter in llm_limiters.values():
+        print(f"  {limiter.name}: {limiter.max_concurrency} concurrent calls, queue of {limiter.max_queue}")
+
+    # Route turns by policy using rolling latency/error stats and health probes
+    # (LLM_PROVIDER=lmstudio keeps its old meaning: use the local model first)
+    default_policy = "prefer_local" if env_settings.get('LLM_PROVIDER', "claude").lower() == "lmstudio" else "claude"
+    routing_policy = env_settings.get('LLM_ROUTING_POLICY', default_policy).lower()
+    if routing_policy not in ROUTING_POLICIES:
+        raise RuntimeError(f"LLM_ROUTING_POLICY must be one of {ROUTING_POLICIES}, got '{routing_policy}'")
+    llm_router = LLMRouter(routing_policy, fallback="claude", limiters=llm_limiters)
+    claude_stats = llm_router.add_backend("claude", cost_rank=1)
+    lmstudio_stats = llm_router.add_backend("lmstudio", cost_rank=0, local=True)
+
+    # Stats wrap the raw model so they measure the call itself, not queueing
+    raw_claude, raw_lmstudio = llm_claude, llm_lmstudio
+    if llm_cassette:
+        raw_claude = llm_cassette.wrap(llm_claude, "claude")
+        raw_lmstudio = llm_cassette.wrap(llm_lmstudio, "lmstudio")
+    claude = LimitedLLM(TrackedLLM(raw_claude, claude_stats), llm_limiters["claude"])
+    lmstudio = LimitedLLM(TrackedLLM(raw_lmstudio, lmstudio_stats), llm_limiters["lmstudio"])
+
+    async def probe_lmstudio():
+        response = await http_client.get(f"{lmstudio_url.rstrip('/')}/models", timeout=2.0)
+        response.raise_for_status()
+
+    # When replaying, LM Studio doesn't need to be running
+    if not replaying:
+        llm_router.start_health_checks(
+            "lmstudio", probe_lmstudio,
+            interval=float(env_settings.get('LM_STUDIO_PROBE_SECONDS', 15))
+        )
+    print(f"LLM routing policy: {routing_policy}")
+
+    # If the routed backend hasn't started answering by its usual
+    # time-to-first-token, race the other one; give up at the deadline
+    if env_settings.get('HEDGING', "true").lower() == "true":
+        narration_hedger = HedgedCaller(
+            llm_router, {"claude": claude, "lmstudio": lmstudio},
+            percentile=float(env_settings.get('HEDGE_PERCENTILE', 95)),
+            min_delay=float(env_settings.get('HEDGE_MIN_SECONDS', 1.5)),
+            default_delay=float(env_settings.get('HEDGE_DEFAULT_SECONDS', 8)),
+            deadline=float(env_settings.get('NARRATION_DEADLINE_SECONDS', 90))
+        )
+        print(f"Narration hedging at p{narration_hedger.percentile:g}, deadline {narration_hedger.deadline:g}s")
+    else:
+        narration_hedger = None
+
+    # Per-section prompt budgets (estimated tokens)
+    context_packer = ContextPacker(
+        lore_tokens=int(env_settings.get('LORE_TOKEN_BUDGET', 900)),
+        history_tokens=int(env_settings.get('HISTORY_TOKEN_BUDGET', 1200)),
+        input_tokens=int(env_settings.get('INPUT_TOKEN_BUDGET', 300)),
+        summary_tokens=int(env_settings.get('SUMMARY_TOKEN_BUDGET', 400))
+    )
 
-    # Build workflow
-    workflow = StateGraph(NarrativeState)
-    workflow.add_node("lore_keeper", lore_keeper)
-    workflow.add_node("narrator", narrator)
-    workflow.add_node("quality", quality)
-    workflow.set_entry_point("lore_keeper")
-    workflow.add_edge("lore_keeper", "narrator")
-    workflow.add_edge("narrator", "quality")
-    workflow.add_edge("quality", END)
-    workflow_app = workflow.compile()
+    # Cache query embeddings and results; any sync that changes the index
+    # bumps lore_indexer.version, which retires every cached result
+    embedding_cache_size = int(env_settings.get('LORE_CACHE_EMBEDDINGS', 1024))
+    result_cache_size = int(env_settings.get('LORE_CACHE_RESULTS', 256))
+    if embedding_cache_size or result_cache_size:
+        lore_cache = LoreQueryCache(
+            embedding_size=embedding_cache_size,
+            result_size=result_cache_size,
+            version=lambda: lore_indexer.version if lore_indexer else 0
+        )
+    else:
+        lore_cache = None
+
+    # The numpy backend searches a float32 copy of the collection's vectors
+    # in process; Chroma stays the store and the copy reloads after syncs
+    vector_backend = env_settings.get('LORE_VECTOR_BACKEND', "chroma").lower()
+    if vector_backend not in VECTOR_BACKENDS:
+        raise RuntimeError(f"LORE_VECTOR_BACKEND must be one of {VECTOR_BACKENDS}, got '{vector_backend}'")
+    if vector_backend == "numpy":
+        # LORE_VECTOR_STORE maps an export of the vectors instead of reading
+        # them from Chroma, when the lore manifest says it is still current
+        store_fingerprint = None
+        if env_settings.get('LORE_VECTOR_STORE', "false").lower() == "true":
+            if lore_indexer:
+                store_fingerprint = lore_indexer.fingerprint
+            elif (chroma_path / MANIFEST_NAME).exists():
+                manifest_fingerprint = read_manifest_fingerprint(chroma_path / MANIFEST_NAME)
+                store_fingerprint = lambda: manifest_fingerprint
+            else:
+                print("LORE_VECTOR_STORE needs a lore manifest (run lore_ingest.py); reading vectors from Chroma")
+        lore_vectors = NumpyVectorIndex(
+            chroma_collection,
+            version=lambda: lore_indexer.version if lore_indexer else 0,
+            store_path=chroma_path / VECTOR_STORE_NAME if store_fingerprint else None,
+            fingerprint=store_fingerprint
+        )
+        await asyncio.to_thread(lore_vectors.load)
+        if lore_indexer:
+            # Reload (and re-export) right after each sync, off the query path
+            lore_indexer.sync_listeners.append(lore_vectors.reload_in_background)
+        stats = lore_vectors.stats()
+        print(f"NumPy vector index: {stats['vectors']} x {stats['dimensions']} ({stats['space']}), "
+              f"{stats['matrix_bytes'] / 2**20:.1f} MB from {stats['source']}"
+              f"{' (memory-mapped)' if stats['mapped'] else ''} in {stats['last_load_seconds']}s")
+    else:
+        lore_vectors = None
+
+    # Hybrid retrieval adds an in-memory BM25 index over the same chunks,
+    # rebuilt whenever a sync bumps the index version
+    retrieval_mode = env_settings.get('LORE_RETRIEVAL', "vector").lower()
+    if retrieval_mode not in RETRIEVAL_MODES:
+        raise RuntimeError(f"LORE_RETRIEVAL must be one of {RETRIEVAL_MODES}, got '{retrieval_mode}'")
+    if retrieval_mode == "hybrid":
+        build_start = time.perf_counter()
+        lexical = await asyncio.to_thread(BM25Index.from_collection, chroma_collection)
+        lore_hybrid = HybridRetriever(
+            chroma_collection,
+            rrf_k=int(env_settings.get('LORE_RRF_K', 60)),
+            version=lambda: lore_indexer.version if lore_indexer else 0,
+            index=lexical
+        )
+        stats = lexical.stats()
+        print(f"BM25 index: {stats['documents']} chunks, {stats['terms']} terms, "
+              f"{stats['postings_bytes'] / 2**20:.1f} MB in {time.perf_counter() - build_start:.2f}s")
+    else:
+        lore_hybrid = None
+    print(f"Lore retrieval: {retrieval_mode} ({vector_backend} vectors)")
+
+    # Multi-query retrieval also searches with the narrator's last message
+    # and the names in it, batched into the same vector query
+    if env_settings.get('LORE_MULTI_QUERY', "false").lower() == "true":
+        query_builder = SubQueryBuilder(
+            context_tokens=int(env_settings.get('LORE_MULTI_QUERY_CONTEXT_TOKENS', 80)),
+            max_entities=int(env_settings.get('LORE_MULTI_QUERY_ENTITIES', 4))
+        )
+    else:
+        query_builder = None
+    print(f"Lore queries per turn: {'conversation-aware batch' if query_builder else 'player input only'}")
+
+    # Diversity reranking: over-fetch LORE_MMR_FETCH_K candidates and keep
+    # the LORE_MMR_K that cover the most distinct lore
+    if env_settings.get('LORE_MMR', "false").lower() == "true":
+        lore_mmr = MMRReranker(
+            lore_vectors or chroma_collection,
+            lambda_mult=float(env_settings.get('LORE_MMR_LAMBDA', 0.5)),
+            k=int(env_settings.get('LORE_MMR_K', 8)),
+            fetch_k=int(env_settings.get('LORE_MMR_FETCH_K', 32))
+        )
+        print(f"Lore MMR: keep {lore_mmr.k} of {lore_mmr.fetch_k} candidates (lambda {lore_mmr.lambda_mult})")
+    else:
+        lore_mmr = None
 
     # Initialize Wiki Manager
     wiki_manager = WikiManager()
     print(f"Wiki Manager initialized (user_data directory)")
 
+    # Pages written to a wiki are embedded into its own collection by a
+    # background worker, and searched for sessions playing in that wiki
+    if env_settings.get('WIKI_INDEX', "false").lower() == "true":
+        wiki_index = WikiIndex(
+            client,
+            wiki_manager.wikis_dir,
+            debounce=float(env_settings.get('WIKI_INDEX_DEBOUNCE_SECONDS', 0.5)),
+            max_delay=float(env_settings.get('WIKI_INDEX_MAX_DELAY_SECONDS', 5))
+        )
+        wiki_index.start()
+        wiki_manager.page_listeners.append(wiki_index.on_page_change)
+        print("Wiki pages are indexed for the Lore Keeper")
+    else:
+        wiki_index = None
+
+    # Create agents
+    lore_keeper = LoreKeeperAgent(lore_vectors or chroma_collection, context_packer, cache=lore_cache,
+                                  hybrid=lore_hybrid, query_builder=query_builder, conv_managers=conv_managers,
+                                  wiki_index=wiki_index, session_wikis=session_wikis, mmr=lore_mmr)
+    narrator = NarratorAgent(claude, lmstudio, conv_managers, context_packer, narration_hedger)
+    quality_agent = QualityAgent(claude)  # Quality check always uses Claude
+    lore_extractor = LoreExtractorAgent(claude)  # Lore extraction always uses Claude
+    if env_settings.get('ROLLING_SUMMARY', "true").lower() == "true":
+        summary_agent = SummaryAgent(claude)
+    else:
+        summary_agent = None
+
+    # Build workflow - in background mode the quality review runs after the
+    # response is sent, so it is left out of the graph
+    if quality_mode == "background":
+        workflow_app = build_workflow(lore_keeper, narrator)
+    else:
+        workflow_app = build_workflow(lore_keeper, narrator, quality_agent)
+    print(f"Quality review mode: {quality_mode}")
+
     print("API ready!")
 
     yield  # Server runs here
 
     # Cleanup (runs on shutdown)
     print("Shutting down...")
+    llm_router.stop()
+    if lore_watcher:
+        await lore_watcher.stop()
+    if wiki_index:
+        await wiki_index.stop()
+    for task in list(background_tasks):
+        task.cancel()
+    await http_client.aclose()
 
 # ============================================================================
 # FastAPI App
@@ -472,59 +1026,403 @@ async def health_check():
     return HealthResponse(
         status="healthy",
         lore_documents=chroma_collection.count(),
-        model="claude-sonnet-4-20250514"
+        model="claude-sonnet-4-20250514",
+        lore_index=lore_watcher.freshness() if lore_watcher else None
     )
 
-@app.post("/narrative", response_model=NarrativeResponse)
-async def generate_narrative(request: NarrativeRequest):
-    """Generate a narrative based on user input"""
+def check_admission(*backends: str):
+    """
+    Raise BackendSaturated if any LLM backend a piece of work needs has no
+    room left in its wait queue; with several, the one with the longest
+    Retry-After.
+    """
+    saturated = []
+    for backend in dict.fromkeys(backends):
+        limiter = llm_limiters.get(backend)
+        if limiter is None:
+            continue
+        try:
+            limiter.admit()
+        except BackendSaturated as e:
+            saturated.append(e)
+    if saturated:
+        raise max(saturated, key=lambda e: e.retry_after)
+
+def admit(*backends: str):
+    """Reject a request up front (429 + Retry-After) if a backend it needs is saturated"""
+    try:
+        check_admission(*backends)
+    except BackendSaturated as e:
+        raise too_busy(e)
+
+def turn_backends(backend: str) -> tuple:
+    """Backends a narrative turn calls: the narrator's, plus Claude for inline quality review"""
+    return (backend, "claude") if quality_mode == "inline" else (backend,)
+
+def too_busy(e: BackendSaturated) -> HTTPException:
+    """Map a saturated backend to a 429 the client can back off from"""
+    return HTTPException(
+        status_code=429,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
+    )
 
-    # Generate or use existing session ID
-    session_id = request.session_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+def choose_backend(user_input: str, session_id: Optional[str] = None) -> str:
+    """Which LLM backend should narrate this turn"""
+    if llm_router is None:
+        return "lmstudio" if route_to_llm(user_input) else "claude"
+    return llm_router.choose(user_input, session_id)
+
+def remember_wiki(session_id: str, wiki_name: Optional[str]):
+    """Note the wiki a session plays in; the Lore Keeper searches its pages too"""
+    if wiki_name:
+        session_wikis[session_id] = wiki_name
 
+def start_turn(session_id: str, user_input: str, backend: str):
+    """
+    Load the session, record the user's input and build the initial
+    workflow state. Call inside session_queue.turn(session_id).
+
+    Returns (conv_manager, initial_state).
+    """
     # Get or create conversation manager
     if session_id not in conv_managers:
         conv_managers[session_id] = ConversationManager(session_id)
 
     conv_manager = conv_managers[session_id]
 
-    # Determine which LLM to use
-    use_lmstudio = route_to_llm(request.user_input)
+    # Backend was picked by the router before admission control
+    use_lmstudio = backend == "lmstudio"
     if use_lmstudio:
         print(f"Routing to LM Studio for this request")
 
     # Add user input to conversation history
-    conv_manager.add_message('user', request.user_input)
+    conv_manager.add_message('user', user_input)
 
-    # Run through workflow
     initial_state = {
-        "user_input": request.user_input,
+        "user_input": user_input,
         "session_id": session_id,
         "relevant_lore": [],
         "lore_context": "",
         "narrative": "",
         "quality_check": "",
         "final_output": "",
-        "use_lmstudio": use_lmstudio
+        "use_lmstudio": use_lmstudio,
+        "backend_used": backend,
+        "hedged": False
     }
+    return conv_manager, initial_state
 
+def finish_turn(conv_manager: ConversationManager, result: dict) -> dict:
+    """
+    Record the AI response in the session history.
+
+    In background quality mode the review is scheduled here and
+    result["quality_check"] is set to PENDING; the verdict is stored on the
+    message once it arrives (see GET /session/{id}/quality/{index}).
+    """
+    if quality_mode == "background":
+        result["quality_check"] = QUALITY_PENDING
+        message = conv_manager.add_message(
+            'assistant', result["final_output"],
+            quality_status="pending", quality_check=QUALITY_PENDING
+        )
+        run_in_background(review_in_background(conv_manager, message, dict(result)))
+    else:
+        message = conv_manager.add_message(
+            'assistant', result["final_output"],
+            quality_status="complete", quality_check=result["quality_check"]
+        )
+
+    schedule_summary(conv_manager)
+    return message
+
+def run_in_background(coro) -> asyncio.Task:
+    """Start a task the server keeps a reference to until it finishes"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+def schedule_summary(conv_manager: ConversationManager):
+    """Fold messages that just left the recent window into the rolling summary"""
+    if summary_agent is None or conv_manager.session_id in summary_tasks:
+        return
+    start, end = conv_manager.summary_backlog(context_packer)
+    if start == end:
+        return
+
+    task = run_in_background(summarize_in_background(conv_manager))
+    summary_tasks[conv_manager.session_id] = task
+    task.add_done_callback(lambda _: summary_tasks.pop(conv_manager.session_id, None))
+
+async def summarize_in_background(conv_manager: ConversationManager):
+    """Run the Chronicler off the response path and store the new summary"""
+    start, end = conv_manager.summary_backlog(context_packer)
+    epoch = conv_manager.summary_epoch
+    conv_manager.fold_end = end
+    try:
+        summary = await summary_agent.fold(
+            conv_manager.summary,
+            context_packer.pack_fold(conv_manager.conversation_history[start:end])
+        )
+    except Exception as e:
+        print(f"Rolling summary update failed: {e}")
+        return
+    finally:
+        conv_manager.fold_end = None
+
+    async with session_queue.turn(conv_manager.session_id):
+        conv_manager.apply_summary(summary, end, epoch)
+
+async def review_in_background(conv_manager: ConversationManager, message: dict, state: dict):
+    """Run the Quality Keeper off the response path and store its verdict"""
     try:
-        result = workflow_app.invoke(initial_state)
+        reviewed = await quality_agent(state)
+        status, verdict = "complete", reviewed["quality_check"]
+    except Exception as e:
+        print(f"Background quality review failed: {e}")
+        status, verdict = "failed", f"ERROR: {e}"
+
+    async with session_queue.turn(conv_manager.session_id):
+        conv_manager.set_quality_check(message, status, verdict)
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Node latency, LLM call and disk write metrics in Prometheus text format"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/llm/limits")
+async def llm_limits():
+    """In-flight and queued call gauges for each LLM backend"""
+    return {name: limiter.stats() for name, limiter in llm_limiters.items()}
+
+async def run_turn(session_id: str, user_input: str, backend: Optional[str] = None) -> NarrativeResponse:
+    """Run one complete narrative turn for a session"""
+    # Turns on one session run in order; other sessions aren't blocked
+    async with session_queue.turn(session_id):
+        if backend is None:
+            # Batch items: admitted here, before the user's input is recorded
+            backend = choose_backend(user_input, session_id)
+            check_admission(*turn_backends(backend))
+        conv_manager, initial_state = start_turn(session_id, user_input, backend)
+        before_input = len(conv_manager.conversation_history) - 1
+
+        # ainvoke lets other requests run while this turn waits on the LLMs
+        try:
+            result = await workflow_app.ainvoke(initial_state)
+        except BackendSaturated:
+            # Rejected before anything was generated: leave no unanswered input behind
+            conv_manager.truncate(before_input)
+            conv_manager.save_session()
+            raise
 
         # Add AI response to conversation history
-        conv_manager.add_message('assistant', result["final_output"])
-
-        return NarrativeResponse(
-            narrative=result["final_output"],
-            lore_used=result["relevant_lore"],
-            quality_check=result["quality_check"],
-            session_id=session_id,
-            timestamp=datetime.now().isoformat()
-        )
+        finish_turn(conv_manager, result)
+
+    return NarrativeResponse(
+        narrative=result["final_output"],
+        lore_used=result["relevant_lore"],
+        quality_check=result["quality_check"],
+        session_id=session_id,
+        timestamp=datetime.now().isoformat(),
+        backend=result.get("backend_used"),
+        hedged=result.get("hedged", False)
+    )
+
+@app.get("/llm/router")
+async def llm_router_diagnostics():
+    """Routing policy, per-backend latency/error/health stats and recent decisions"""
+    if llm_router is None:
+        raise HTTPException(status_code=503, detail="LLM router not initialized")
+    diagnostics = llm_router.diagnostics()
+    diagnostics["hedging"] = narration_hedger.snapshot() if narration_hedger else None
+    diagnostics["cassette"] = llm_cassette.stats() if llm_cassette else None
+    return diagnostics
+
+@app.post("/narrative", response_model=NarrativeResponse)
+async def generate_narrative(request: NarrativeRequest):
+    """Generate a narrative based on user input"""
+
+    # Generate or use existing session ID
+    session_id = request.session_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+    remember_wiki(session_id, request.wiki_name)
 
+    backend = choose_backend(request.user_input, session_id)
+    admit(*turn_backends(backend))
+
+    try:
+        return await run_turn(session_id, request.user_input, backend)
+
+    except BackendSaturated as e:
+        raise too_busy(e)
+    except asyncio.TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/narrative/batch", response_model=BatchNarrativeResponse)
+async def generate_narrative_batch(batch: BatchNarrativeRequest):
+    """
+    Run many narrative turns in one call.
+
+    Items are grouped by session: each session's turns run in the order
+    given, while different sessions run concurrently (up to
+    max_concurrency at once). Items without a session_id each start a new
+    session. Every item gets its own result or error.
+    """
+    if not batch.requests:
+        raise HTTPException(status_code=400, detail="No requests provided")
+    if len(batch.requests) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch is limited to {BATCH_MAX_ITEMS} requests")
+
+    start = time.perf_counter()
+    # Timestamp for readable session files, random part so batches in the same second never share sessions
+    batch_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex}"
+
+    # Group items per session, preserving order within each session
+    sessions = {}
+    for index, item in enumerate(batch.requests):
+        session_id = item.session_id or f"{batch_id}_{index}"
+        remember_wiki(session_id, item.wiki_name)
+        sessions.setdefault(session_id, []).append((index, item))
+
+    # Stay within the Claude limiter's slots so the batch doesn't fill the
+    # shared wait queue and starve interactive players
+    claude_limiter = llm_limiters.get("claude")
+    default_concurrency = claude_limiter.max_concurrency if claude_limiter else 4
+    gate = asyncio.Semaphore(max(1, batch.max_concurrency or default_concurrency))
+
+    results = [None] * len(batch.requests)
+
+    async def run_session(session_id: str, items: list):
+        async with gate:
+            for index, item in items:
+                try:
+                    response = await run_turn(session_id, item.user_input)
+                    results[index] = BatchItemResult(
+                        index=index, session_id=session_id, status_code=200, result=response
+                    )
+                except BackendSaturated as e:
+                    results[index] = BatchItemResult(
+                        index=index, session_id=session_id, status_code=429, error=str(e)
+                    )
+                except asyncio.TimeoutError as e:
+                    results[index] = BatchItemResult(
+                        index=index, session_id=session_id, status_code=504, error=str(e)
+                    )
+                except Exception as e:
+                    results[index] = BatchItemResult(
+                        index=index, session_id=session_id, status_code=500, error=str(e)
+                    )
+
+    await asyncio.gather(*[run_session(sid, items) for sid, items in sessions.items()])
+
+    succeeded = sum(1 for r in results if r.status_code == 200)
+    return BatchNarrativeResponse(
+        results=results,
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        elapsed_seconds=round(time.perf_counter() - start, 3)
+    )
+
+@app.post("/narrative/stream")
+async def stream_narrative(request: NarrativeRequest):
+    """
+    Generate a narrative as a Server-Sent Events stream.
+
+    Events, in order:
+    - lore: {"lore_used": [...], "session_id": ...} once the Lore Keeper is done
+    - token: {"text": ...} for each narrator token as it is generated
+    - quality: {"quality_check": ...} after the Quality Keeper review
+      (inline quality mode only - in background mode done carries PENDING)
+    - done: the full NarrativeResponse payload
+    - error: {"detail": ...} if the workflow fails part way through
+    """
+    session_id = request.session_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+    remember_wiki(session_id, request.wiki_name)
+
+    backend = choose_backend(request.user_input, session_id)
+    admit(*turn_backends(backend))
+
+    async def event_stream():
+        try:
+            async with session_queue.turn(session_id):
+                async for event in stream_turn(session_id, request.user_input, backend):
+                    yield event
+        except BackendSaturated as e:
+            yield sse_event("error", {"detail": str(e), "retry_after": e.retry_after})
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def stream_writer() -> Optional[Callable]:
+    """The running graph's custom stream writer; None outside a graph run"""
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        return None
+
+
+def narrator_token(mode: str, payload) -> Optional[str]:
+    """
+    Narrator text in a "messages" or "custom" stream item, else None. Only
+    the narrator's tokens go to the player; hedged narration arrives as
+    custom items carrying the winning backend's text.
+    """
+    if mode == "custom":
+        return payload if isinstance(payload, str) else None
+    chunk, metadata = payload
+    if metadata.get("langgraph_node") == "narrator":
+        return chunk.text
+    return None
+
+async def stream_turn(session_id: str, user_input: str, backend: str):
+    """Run one turn through the workflow, yielding SSE frames as it goes"""
+    conv_manager, initial_state = start_turn(session_id, user_input, backend)
+    result = dict(initial_state)
+
+    async for mode, payload in workflow_app.astream(
+        initial_state, stream_mode=["updates", "messages", "custom"]
+    ):
+        if mode != "updates":
+            text = narrator_token(mode, payload)
+            if text:
+                yield sse_event("token", {"text": text})
+            continue
+
+        for node, update in payload.items():
+            result.update(update)
+            if node == "lore_keeper":
+                yield sse_event("lore", {
+                    "lore_used": result["relevant_lore"],
+                    "session_id": session_id
+                })
+            elif node == "quality":
+                yield sse_event("quality", {"quality_check": result["quality_check"]})
+
+    finish_turn(conv_manager, result)
+
+    response = NarrativeResponse(
+        narrative=result["final_output"],
+        lore_used=result["relevant_lore"],
+        quality_check=result["quality_check"],
+        session_id=session_id,
+        timestamp=datetime.now().isoformat(),
+        backend=result.get("backend_used"),
+        hedged=result.get("hedged", False)
+    )
+    yield sse_event("done", response.model_dump())
+
 @app.get("/session/{session_id}", response_model=SessionResponse)
 async def get_session(session_id: str):
     """Get information about a conversation session"""
@@ -557,6 +1455,11 @@ async def list_sessions():
 
     return session_ids
 
+@app.get("/sessions/queue")
+async def session_queue_stats():
+    """Per-session turn queue depths (queued + running turns)"""
+    return session_queue.stats()
+
 @app.post("/session/{session_id}/undo")
 async def undo_last_turn(session_id: str):
     """Remove the last user message and AI response from session"""
@@ -565,12 +1468,14 @@ async def undo_last_turn(session_id: str):
 
     conv_manager = conv_managers[session_id]
 
-    if len(conv_manager.conversation_history) < 2:
-        return {"success": False, "message": "Not enough messages to undo"}
+    # Wait for any in-flight turn so we remove that turn, not a half-written one
+    async with session_queue.turn(session_id):
+        if len(conv_manager.conversation_history) < 2:
+            return {"success": False, "message": "Not enough messages to undo"}
 
-    # Remove last 2 messages (AI response, then user message)
-    conv_manager.conversation_history = conv_manager.conversation_history[:-2]
-    conv_manager.save_session()
+        # Remove last 2 messages (AI response, then user message)
+        conv_manager.truncate(len(conv_manager.conversation_history) - 2)
+        conv_manager.save_session()
 
     return {
         "success": True,
@@ -591,19 +1496,46 @@ async def edit_message(session_id: str, edit_data: dict):
     if message_index is None or new_content is None:
         raise HTTPException(status_code=400, detail="Missing message_index or new_content")
 
-    if message_index >= len(conv_manager.conversation_history) or message_index < 0:
-        raise HTTPException(status_code=400, detail="Invalid message index")
+    async with session_queue.turn(session_id):
+        if message_index >= len(conv_manager.conversation_history) or message_index < 0:
+            raise HTTPException(status_code=400, detail="Invalid message index")
 
-    # Update the message content
-    conv_manager.conversation_history[message_index]["content"] = new_content
-    conv_manager.conversation_history[message_index]["edited"] = datetime.now().isoformat()
-    conv_manager.save_session()
+        # Update the message content
+        conv_manager.conversation_history[message_index]["content"] = new_content
+        conv_manager.conversation_history[message_index]["edited"] = datetime.now().isoformat()
+        if message_index < conv_manager.summarized_count:
+            # The summary still tells the old version; refold from the start
+            conv_manager.reset_summary()
+        conv_manager.save_session()
+    schedule_summary(conv_manager)
 
     return {
         "success": True,
         "message": "Message edited successfully"
     }
 
+@app.get("/session/{session_id}/quality/{message_index}")
+async def get_quality_check(session_id: str, message_index: int):
+    """Get the Quality Keeper verdict stored on an AI message"""
+    if session_id not in conv_managers:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    conv_manager = conv_managers[session_id]
+
+    if message_index >= len(conv_manager.conversation_history) or message_index < 0:
+        raise HTTPException(status_code=400, detail="Invalid message index")
+
+    message = conv_manager.conversation_history[message_index]
+    if message['role'] != 'assistant':
+        raise HTTPException(status_code=400, detail="Quality checks are only stored on AI messages")
+
+    return {
+        "session_id": session_id,
+        "message_index": message_index,
+        "status": message.get('quality_status', 'unreviewed'),
+        "quality_check": message.get('quality_check')
+    }
+
 @app.get("/session/{session_id}/export")
 async def export_session(session_id: str):
     """Export conversation as text file"""
@@ -701,11 +1633,14 @@ async def save_session_to_wiki(wiki_name: str, data: dict):
     conv_manager = conv_managers[session_id]
 
     try:
-        wiki_manager.save_session_to_wiki(
-            wiki_name,
-            session_id,
-            conv_manager.conversation_history
-        )
+        # Snapshot the history between turns, never halfway through one
+        async with session_queue.turn(session_id):
+            wiki_manager.save_session_to_wiki(
+                wiki_name,
+                session_id,
+                conv_manager.conversation_history
+            )
+        remember_wiki(session_id, wiki_name)
         return {
             "success": True,
             "message": f"Session saved to wiki '{wiki_name}'"
@@ -718,6 +1653,7 @@ async def load_session_from_wiki(wiki_name: str, session_id: str):
     """Load a session from a wiki"""
     try:
         conversation = wiki_manager.load_session_from_wiki(wiki_name, session_id)
+        remember_wiki(session_id, wiki_name)
         return {
             "success": True,
             "conversation": conversation
@@ -779,15 +1715,78 @@ async def extract_lore_from_text(data: dict):
     if not narrative:
         raise HTTPException(status_code=400, detail="Narrative text is required")
 
+    admit("claude")
+
     try:
-        extracted = lore_extractor.extract(narrative, existing_entities)
+        extracted = await lore_extractor.extract(narrative, existing_entities)
         return {
             "success": True,
             "extracted": extracted
         }
+    except BackendSaturated as e:
+        raise too_busy(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/lore/reindex")
+async def reindex_lore(data: dict = None):
+    """
+    Re-embed new and changed vault files and drop removed ones, in place.
+
+    Optional body: {"paths": ["characters/Lyssia.md", ...]} to check only
+    those files (relative to the lore folder) instead of scanning the vault.
+    """
+    if lore_indexer is None:
+        raise HTTPException(status_code=503, detail="No lore vault configured (set VAULT_PATH in .env)")
+
+    paths = data.get("paths") if data else None
+    if paths is not None:
+        if not isinstance(paths, list):
+            raise HTTPException(status_code=400, detail="paths must be a list of .md files in the lore folder")
+        try:
+            paths = lore_indexer.check_paths(paths)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    try:
+        report = await asyncio.to_thread(lore_indexer.sync, paths)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"success": True, "sync": report, "index": lore_indexer.status()}
+
+@app.get("/lore/index")
+async def lore_index_status():
+    """Manifest size, progress of a sync in flight and the result of the last sync"""
+    if lore_indexer is None:
+        raise HTTPException(status_code=503, detail="No lore vault configured (set VAULT_PATH in .env)")
+    return lore_indexer.status()
+
+@app.get("/lore/retrieval")
+async def lore_retrieval_stats():
+    """Retrieval mode, vector backend and the size and reloads of the in-memory indexes"""
+    stats = {"mode": "vector" if lore_hybrid is None else "hybrid",
+             "vector_backend": "chroma" if lore_vectors is None else "numpy"}
+    if lore_vectors is not None:
+        stats["vectors"] = lore_vectors.stats()
+    if lore_hybrid is not None:
+        stats["lexical"] = lore_hybrid.stats()
+    if lore_mmr is not None:
+        stats["mmr"] = lore_mmr.stats()
+    return stats
+
+@app.get("/lore/wiki-index")
+async def wiki_index_status():
+    """Indexed pages per wiki and how far each wiki's index is behind its page writes"""
+    if wiki_index is None:
+        return {"enabled": False}
+    return {"enabled": True, "sessions": len(session_wikis), "wikis": wiki_index.freshness()}
+
+@app.get("/lore/cache")
+async def lore_cache_stats():
+    """Hit rate, size and evictions of the lore query caches (for tuning LORE_CACHE_*)"""
+    if lore_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **lore_cache.stats()}
+
 @app.post("/lore/extract-session/{session_id}")
 async def extract_lore_from_session(session_id: str, data: dict = None):
     """Extract lore from an entire conversation session."""
@@ -797,8 +1796,10 @@ async def extract_lore_from_session(session_id: str, data: dict = None):
     conv_manager = conv_managers[session_id]
     existing_entities = data.get("existing_entities") if data else None
 
+    admit("claude")
+
     try:
-        extracted = lore_extractor.extract_from_conversation(
+        extracted = await lore_extractor.extract_from_conversation(
             conv_manager.conversation_history,
             existing_entities
         )
@@ -807,6 +1808,8 @@ async def extract_lore_from_session(session_id: str, data: dict = None):
             "session_id": session_id,
             "extracted": extracted
         }
+    except BackendSaturated as e:
+        raise too_busy(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
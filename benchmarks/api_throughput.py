@@ -0,0 +1,259 @@
+"""
+DOAMMO API Throughput Benchmark
+Boots api_server.app offline (fake LLMs, throwaway Chroma and data dirs) and drives its endpoints
+
+Run from the repository root:
+    python -m benchmarks.api_throughput --requests 200 --concurrency 16
+    python -m benchmarks.api_throughput --json results.json
+    python -m benchmarks.api_throughput --compare results.json --max-regression 0.25
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import chromadb
+import httpx
+from chromadb.api.client import SharedSystemClient
+from chromadb.config import Settings
+
+from benchmarks.fake_llm_server import FakeLLMServer
+from benchmarks.hashing_embeddings import HashingEmbeddingFunction
+from benchmarks.synthetic_lore import generate_vault, seed_collection
+
+SCENARIOS = ("narrative", "wiki", "lore")
+
+PLAYER_INPUTS = [
+    "I walk towards the ruins of Karveth",
+    "Lyssia checks the skyship's silver sails",
+    "I ask the archivist about the forgotten citadel",
+    "We follow the canyon towards the reactor",
+    "I search the monastery for the sealed artifact",
+]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def rss_mb() -> Dict[str, float]:
+    """Current and peak resident set size of this process"""
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak_kb /= 1024  # bytes on macOS
+    current = None
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        pass
+    return {"rss_mb": round(current, 1) if current is not None else None, "peak_rss_mb": round(peak_kb / 1024, 1)}
+
+
+async def drive(make_request: Callable[[int], object], total: int, concurrency: int) -> Dict:
+    """Run `total` requests with at most `concurrency` in flight and summarize latencies"""
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = {}
+
+    async def one(i: int):
+        async with gate:
+            start = time.perf_counter()
+            response = await make_request(i)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors[response.status_code] = errors.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(total)])
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": total,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "throughput_rps": round(total / elapsed, 2),
+        **rss_mb()
+    }
+
+
+def write_env(workdir: Path, llm_url: str, options: argparse.Namespace):
+    settings = {
+        "ANTHROPIC_API_KEY": "benchmark",
+        # Absolute, because chromadb caches clients by path string
+        "CHROMA_PATH": str(workdir / "chroma_data"),
+        "LM_STUDIO_URL": f"{llm_url}/v1",
+        "QUALITY_MODE": options.quality_mode,
+        "ROLLING_SUMMARY": "true" if options.rolling_summary else "false",
+        "CLAUDE_MAX_CONCURRENCY": options.llm_concurrency,
+        "CLAUDE_MAX_QUEUE": options.requests,  # Measure queueing, not 429s
+    }
+    (workdir / ".env").write_text("".join(f"{k}={v}\n" for k, v in settings.items()), encoding="utf-8")
+
+
+def build_scenarios(client: httpx.AsyncClient, options: argparse.Namespace) -> Dict[str, Callable]:
+    async def narrative(i: int):
+        return await client.post("/narrative", json={
+            "user_input": PLAYER_INPUTS[i % len(PLAYER_INPUTS)],
+            "session_id": f"bench_{i % options.sessions}"
+        })
+
+    async def wiki(i: int):
+        if i % 4 == 3:
+            return await client.get("/wiki/bench_wiki")
+        return await client.post(f"/wiki/bench_wiki/page/characters/Character_{i % 50}", json={
+            "content": f"# Character {i % 50}\n\nRevision {i}. " + "Lore text. " * 50
+        })
+
+    async def lore(i: int):
+        return await client.post("/lore/extract", json={
+            "narrative": f"Lyssia guides the Windrunner over Karveth (scene {i})."
+        })
+
+    return {"narrative": narrative, "wiki": wiki, "lore": lore}
+
+
+async def run_benchmark(options: argparse.Namespace) -> Dict:
+    """Boot the app against the fake backends and run each selected scenario"""
+    import api_server  # Imported from the repo root: the app mounts ./static at import
+
+    server = FakeLLMServer(options.latency_ms, options.latency_sigma, options.token_ms, options.seed)
+    llm_url = server.start()
+    previous_cwd = os.getcwd()
+    previous_api_url = os.environ.get("ANTHROPIC_API_URL")
+    results = {"config": {k: v for k, v in vars(options).items() if k not in ("json", "compare")}}
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="doammo_bench_") as tmp:
+            workdir = Path(tmp)
+            os.chdir(workdir)  # sessions/ and user_data/ are relative to the working dir
+            os.environ["ANTHROPIC_API_URL"] = llm_url
+            write_env(workdir, llm_url, options)
+
+            client = chromadb.PersistentClient(path=str(workdir / "chroma_data"),
+                                               settings=Settings(anonymized_telemetry=False))
+            # The collection remembers its embedding function, so the server's
+            # get_collection() picks up the offline one too
+            collection = client.create_collection(name="doammo_lore",
+                                                  embedding_function=HashingEmbeddingFunction())
+            seed_start = time.perf_counter()
+            seed_collection(collection, generate_vault(options.lore_files, seed=options.seed))
+            results["seed_seconds"] = round(time.perf_counter() - seed_start, 2)
+
+            quiet = contextlib.nullcontext() if options.verbose else contextlib.redirect_stdout(io.StringIO())
+            with quiet:
+                async with api_server.app.router.lifespan_context(api_server.app):
+                    transport = httpx.ASGITransport(app=api_server.app)
+                    async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                                 timeout=None) as http:
+                        await http.post("/wiki/create", json={"name": "bench_wiki"})
+                        scenarios = build_scenarios(http, options)
+                        for name in options.scenarios:
+                            results[name] = await drive(scenarios[name], options.requests, options.concurrency)
+            results["llm_calls"] = server.calls
+    finally:
+        # Drop the cached client so the temp dir's database isn't held open
+        SharedSystemClient.clear_system_cache()
+        os.chdir(previous_cwd)
+        if previous_api_url is None:
+            os.environ.pop("ANTHROPIC_API_URL", None)
+        else:
+            os.environ["ANTHROPIC_API_URL"] = previous_api_url
+        server.stop()
+
+    return results
+
+
+def compare(results: Dict, baseline: Dict, max_regression: float) -> List[str]:
+    """Scenarios whose p95 latency or throughput regressed beyond the allowed fraction"""
+    failures = []
+    for name in SCENARIOS:
+        if name not in results or name not in baseline:
+            continue
+        now, before = results[name], baseline[name]
+        if before["p95_ms"] and now["p95_ms"] > before["p95_ms"] * (1 + max_regression):
+            failures.append(f"{name}: p95 {before['p95_ms']}ms -> {now['p95_ms']}ms")
+        if before["throughput_rps"] and now["throughput_rps"] < before["throughput_rps"] * (1 - max_regression):
+            failures.append(f"{name}: throughput {before['throughput_rps']} -> {now['throughput_rps']} req/s")
+    return failures
+
+
+def print_report(results: Dict):
+    print(f"\nLore seeded in {results['seed_seconds']}s, {results['llm_calls']} fake LLM calls")
+    print(f"{'scenario':<10} {'reqs':>6} {'errors':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'req/s':>8} {'RSS MB':>8}")
+    for name in SCENARIOS:
+        if name in results:
+            r = results[name]
+            errors = sum(r["errors"].values())
+            print(f"{name:<10} {r['requests']:>6} {errors:>8} {r['p50_ms']:>9} {r['p95_ms']:>9} "
+                  f"{r['p99_ms']:>9} {r['throughput_rps']:>8} {r['rss_mb'] or r['peak_rss_mb']:>8}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline throughput benchmark for the narrative API")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        type=lambda s: [x for x in s.split(",") if x],
+                        help="Comma-separated subset of: narrative, wiki, lore")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight at once")
+    parser.add_argument("--sessions", type=int, default=32, help="Distinct sessions for /narrative")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Median fake LLM time-to-first-token")
+    parser.add_argument("--latency-sigma", type=float, default=0.3, help="Lognormal spread (0 = constant)")
+    parser.add_argument("--token-ms", type=float, default=0, help="Delay between streamed tokens")
+    parser.add_argument("--llm-concurrency", type=int, default=16, help="CLAUDE_MAX_CONCURRENCY for the run")
+    parser.add_argument("--lore-files", type=int, default=200, help="Synthetic lore documents to seed")
+    parser.add_argument("--quality-mode", choices=["inline", "background"], default="inline")
+    parser.add_argument("--rolling-summary", action="store_true", help="Enable rolling summaries")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--compare", help="Baseline results file; exit 1 on regression")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Allowed p95/throughput regression vs the baseline (fraction)")
+    parser.add_argument("--verbose", action="store_true", help="Show server logs")
+    options = parser.parse_args(argv)
+
+    unknown = set(options.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return options
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    options = parse_args(argv)
+    results = asyncio.run(run_benchmark(options))
+    print_report(results)
+
+    if options.json:
+        Path(options.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nResults written to {options.json}")
+
+    if options.compare:
+        baseline = json.loads(Path(options.compare).read_text(encoding="utf-8"))
+        failures = compare(results, baseline, options.max_regression)
+        if failures:
+            print("\nREGRESSION:")
+            for failure in failures:
+                print(f"  {failure}")
+            return 1
+        print(f"\nNo regression beyond {options.max_regression:.0%} vs {options.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
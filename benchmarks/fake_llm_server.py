@@ -0,0 +1,170 @@
+"""
+DOAMMO Fake LLM Server
+Local stand-in for the Anthropic Messages and OpenAI (LM Studio) chat APIs with configurable latency
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import socket
+import threading
+import time
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+_WORDS = ["the", "wind", "howls", "across", "ruins", "of", "Karveth", "while", "Lyssia", "guides",
+          "her", "skyship", "through", "storm", "light", "silver", "sails", "catch", "ancient", "glow"]
+
+
+def fake_reply(prompt: str, words: int = 120) -> str:
+    """Deterministic reply for a prompt, shaped like what the calling agent expects"""
+    if "Quality Keeper" in prompt:
+        return "APPROVED: Consistent with the lore."
+    if "extract any NEW lore entities" in prompt:
+        return json.dumps({
+            "characters": [{"name": "Lyssia", "description": "An Aeth pilot."}],
+            "locations": [{"name": "Karveth", "description": "Desert ruins."}],
+            "items": [], "events": []
+        })
+
+    digest = hashlib.sha256(prompt.encode()).digest()
+    text = " ".join(_WORDS[(digest[i % len(digest)] + i) % len(_WORDS)] for i in range(words))
+    return text.capitalize() + "."
+
+
+def _prompt_of(messages) -> str:
+    content = messages[-1]["content"] if messages else ""
+    if isinstance(content, list):
+        return "".join(block.get("text", "") for block in content)
+    return content
+
+
+class FakeLLMServer:
+    """
+    Serves /v1/messages (Anthropic) and /v1/chat/completions + /v1/models
+    (OpenAI-compatible) on localhost from a background thread.
+
+    Each call waits a latency drawn from a lognormal distribution (median
+    latency_ms, shape sigma; sigma=0 is constant) before the first token,
+    then streams tokens token_ms apart. Latencies are seeded, replies are
+    deterministic per prompt.
+    """
+
+    def __init__(self, latency_ms: float = 200, sigma: float = 0.3, token_ms: float = 0, seed: int = 7):
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.token_ms = token_ms
+        self._rng = random.Random(seed)
+        self.calls = 0
+        self._server = None
+        self._thread = None
+        self.url = None
+
+    def sample_latency(self) -> float:
+        """Seconds before the first token"""
+        return self.latency_ms / 1000 * math.exp(self._rng.gauss(0, self.sigma))
+
+    async def _tokens(self, text: str):
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            if self.token_ms:
+                await asyncio.sleep(self.token_ms / 1000)
+            yield word if i == 0 else " " + word
+
+    async def _messages(self, request: Request):
+        body = await request.json()
+        self.calls += 1
+        text = fake_reply(_prompt_of(body.get("messages", [])))
+        await asyncio.sleep(self.sample_latency())
+
+        usage = {"input_tokens": 100, "output_tokens": len(text.split())}
+        if not body.get("stream"):
+            return JSONResponse({
+                "id": f"msg_{self.calls}", "type": "message", "role": "assistant", "model": body.get("model"),
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn", "stop_sequence": None, "usage": usage
+            })
+
+        async def events():
+            def event(name, data):
+                return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+            yield event("message_start", {"type": "message_start", "message": {
+                "id": f"msg_{self.calls}", "type": "message", "role": "assistant", "model": body.get("model"),
+                "content": [], "stop_reason": None, "stop_sequence": None,
+                "usage": {"input_tokens": 100, "output_tokens": 1}}})
+            yield event("content_block_start", {"type": "content_block_start", "index": 0,
+                                                "content_block": {"type": "text", "text": ""}})
+            async for token in self._tokens(text):
+                yield event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                    "delta": {"type": "text_delta", "text": token}})
+            yield event("content_block_stop", {"type": "content_block_stop", "index": 0})
+            yield event("message_delta", {"type": "message_delta",
+                                          "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                          "usage": {"output_tokens": usage["output_tokens"]}})
+            yield event("message_stop", {"type": "message_stop"})
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def _chat_completions(self, request: Request):
+        body = await request.json()
+        self.calls += 1
+        text = fake_reply(_prompt_of(body.get("messages", [])))
+        await asyncio.sleep(self.sample_latency())
+
+        base = {"id": f"chatcmpl-{self.calls}", "created": int(time.time()), "model": body.get("model") or "local"}
+        if not body.get("stream"):
+            return JSONResponse({
+                **base, "object": "chat.completion",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": text}}],
+                "usage": {"prompt_tokens": 100, "completion_tokens": len(text.split()),
+                          "total_tokens": 100 + len(text.split())}
+            })
+
+        async def chunks():
+            def chunk(delta, finish=None):
+                return "data: " + json.dumps({**base, "object": "chat.completion.chunk", "choices": [
+                    {"index": 0, "delta": delta, "finish_reason": finish}]}) + "\n\n"
+
+            yield chunk({"role": "assistant", "content": ""})
+            async for token in self._tokens(text):
+                yield chunk({"content": token})
+            yield chunk({}, finish="stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    async def _models(self, request: Request):
+        return JSONResponse({"object": "list", "data": [{"id": "local", "object": "model"}]})
+
+    def start(self) -> str:
+        """Start serving; returns the base URL (http://127.0.0.1:port)"""
+        app = Starlette(routes=[
+            Route("/v1/messages", self._messages, methods=["POST"]),
+            Route("/v1/chat/completions", self._chat_completions, methods=["POST"]),
+            Route("/v1/models", self._models, methods=["GET"]),
+        ])
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(("127.0.0.1", 0))
+        self.url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+        self._server = uvicorn.Server(uvicorn.Config(app, log_level="warning", lifespan="off"))
+        self._thread = threading.Thread(target=self._server.run, kwargs={"sockets": [sock]}, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self.url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.should_exit = True
+            self._thread.join(timeout=5)
+            self._server = None
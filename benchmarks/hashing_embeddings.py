@@ -0,0 +1,52 @@
+"""
+DOAMMO Hashing Embeddings
+Offline Chroma embedding function (feature hashing) so benchmarks never download a model
+"""
+
+import re
+import zlib
+from typing import Any, Dict
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+from chromadb.utils.embedding_functions import register_embedding_function
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+@register_embedding_function
+class HashingEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    Word and word-bigram feature hashing into a fixed-size, L2-normalised
+    vector.
+
+    Deterministic and fast, with no model files. Texts sharing words land
+    close together, which is enough to exercise retrieval paths. It does
+    not measure semantic retrieval quality.
+    """
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+
+    def __call__(self, input: Documents) -> Embeddings:
+        vectors = np.zeros((len(input), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(input):
+            words = _WORD_RE.findall(text.lower())
+            features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+            for feature in features:
+                h = zlib.crc32(feature.encode())
+                vectors[row, h % self.dimensions] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1.0, norms)
+        return [v for v in vectors]
+
+    @staticmethod
+    def name() -> str:
+        return "doammo_hashing"
+
+    def get_config(self) -> Dict[str, Any]:
+        return {"dimensions": self.dimensions}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "HashingEmbeddingFunction":
+        return HashingEmbeddingFunction(config.get("dimensions", 384))
@@ -0,0 +1,149 @@
+"""
+DOAMMO Lore Chunking Benchmark
+Whole-file vs heading-chunked lore retrieval on a synthetic vault of long files
+
+Run from the repository root:
+    python -m benchmarks.lore_chunking
+    python -m benchmarks.lore_chunking --files 300 --sections 16 --json chunking.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import chromadb
+from chromadb.api.client import SharedSystemClient
+from chromadb.config import Settings
+
+from benchmarks.hashing_embeddings import HashingEmbeddingFunction
+from benchmarks.synthetic_lore import generate_vault, seed_collection
+from context_packer import ContextPacker, estimate_tokens
+from lore_ingest import find_lore_files, ingest_files
+
+_CODE_WORDS = ["amber", "cinder", "hollow", "ivory", "marrow", "obsidian", "thistle", "vesper"]
+
+
+def plant_facts(vault: Dict[str, str], seed: int = 7) -> List[Tuple[str, str, str]]:
+    """
+    Add one findable fact to each file, in a random section past the first.
+
+    Returns (filename, question, answer) triples; the answer string appears
+    nowhere else in the vault.
+    """
+    rng = random.Random(seed)
+    facts = []
+    for number, (filename, text) in enumerate(sorted(vault.items())):
+        name = text.split("\n", 1)[0].lstrip("# ")  # The file's title
+        answer = f"{rng.choice(_CODE_WORDS)}-{1000 + number}"
+        sections = text.split("\n## ")
+        target = rng.randint(max(1, len(sections) // 2), len(sections) - 1)
+        sections[target] += f"\n\nThe sealed archive of {name} opens only to the passphrase {answer}.\n"
+        vault[filename] = "\n## ".join(sections)
+        facts.append((filename, f"What passphrase opens the sealed archive of {name}?", answer))
+    return facts
+
+
+async def measure(agent, facts: List[Tuple[str, str, str]]) -> Dict:
+    """Run every question through a LoreKeeperAgent and score the packed lore"""
+    hits = 0
+    source_hits = 0
+    tokens = []
+    start = time.perf_counter()
+    for filename, question, answer in facts:
+        state = await agent({"user_input": question})
+        hits += answer in state["lore_context"]
+        source_hits += filename in state["relevant_lore"]
+        tokens.append(estimate_tokens(state["lore_context"]))
+    elapsed = time.perf_counter() - start
+    return {
+        "queries": len(facts),
+        "fact_hit_rate": round(hits / len(facts), 3),
+        "source_hit_rate": round(source_hits / len(facts), 3),
+        "mean_lore_tokens": round(sum(tokens) / len(tokens), 1),
+        # Prompt tokens spent per question actually answerable from the lore
+        "tokens_per_hit": round(sum(tokens) / hits, 1) if hits else None,
+        "ms_per_query": round(elapsed / len(facts) * 1000, 2)
+    }
+
+
+async def run_benchmark(options: argparse.Namespace) -> Dict:
+    from api_server import LoreKeeperAgent  # Imported from the repo root: the app mounts ./static at import
+
+    vault = generate_vault(options.files, sections=options.sections, sentences=options.sentences, seed=options.seed)
+    facts = plant_facts(vault, options.seed)
+    rng = random.Random(options.seed)
+    facts = rng.sample(facts, min(options.queries, len(facts)))
+    packer = ContextPacker()
+    results = {"config": {k: v for k, v in vars(options).items() if k != "json"}}
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="doammo_chunking_") as tmp:
+            lore_dir = Path(tmp) / "_Lore"
+            lore_dir.mkdir()
+            for filename, text in vault.items():
+                (lore_dir / filename).write_text(text, encoding="utf-8")
+
+            client = chromadb.PersistentClient(path=str(Path(tmp) / "chroma_data"),
+                                               settings=Settings(anonymized_telemetry=False))
+
+            whole = client.create_collection(name="whole_file", embedding_function=HashingEmbeddingFunction())
+            start = time.perf_counter()
+            seed_collection(whole, vault)
+            index_seconds = time.perf_counter() - start
+            results["whole_file"] = await measure(LoreKeeperAgent(whole, packer, n_results=5), facts)
+            results["whole_file"].update(documents=whole.count(), index_seconds=round(index_seconds, 2))
+
+            chunked = client.create_collection(name="chunked", embedding_function=HashingEmbeddingFunction())
+            start = time.perf_counter()
+            ingest_files(chunked, lore_dir, find_lore_files(lore_dir),
+                         max_tokens=options.max_tokens, overlap_tokens=options.overlap_tokens)
+            index_seconds = time.perf_counter() - start
+            results["chunked"] = await measure(LoreKeeperAgent(chunked, packer), facts)
+            results["chunked"].update(documents=chunked.count(), index_seconds=round(index_seconds, 2))
+    finally:
+        SharedSystemClient.clear_system_cache()
+
+    return results
+
+
+def print_report(results: Dict):
+    print(f"{'index':<11} {'docs':>6} {'fact hit':>9} {'src hit':>8} {'lore tok':>9} {'tok/hit':>8} "
+          f"{'ms/query':>9} {'index s':>8}")
+    for name in ("whole_file", "chunked"):
+        r = results[name]
+        print(f"{name:<11} {r['documents']:>6} {r['fact_hit_rate']:>9.1%} {r['source_hit_rate']:>8.1%} "
+              f"{r['mean_lore_tokens']:>9} {str(r['tokens_per_hit']):>8} {r['ms_per_query']:>9} "
+              f"{r['index_seconds']:>8}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare whole-file and chunked lore retrieval")
+    parser.add_argument("--files", type=int, default=200, help="Synthetic lore files")
+    parser.add_argument("--sections", type=int, default=12, help="Sections per file")
+    parser.add_argument("--sentences", type=int, default=6, help="Sentences per section")
+    parser.add_argument("--queries", type=int, default=100, help="Fact questions to ask")
+    parser.add_argument("--max-tokens", type=int, default=220, help="Chunk size (estimated tokens)")
+    parser.add_argument("--overlap-tokens", type=int, default=40, help="Overlap between chunks")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Write results to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    options = parse_args(argv)
+    results = asyncio.run(run_benchmark(options))
+    print_report(results)
+    if options.json:
+        Path(options.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nResults written to {options.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+DOAMMO Lore Ingestion Benchmark
+Load-everything-then-add (the original setup script's approach) vs the streaming LoreIndexer
+sync, in-process and across worker processes: throughput, peak memory, and resuming an
+interrupted run
+
+Run from the repository root:
+    python -m benchmarks.lore_ingestion
+    python -m benchmarks.lore_ingestion --files 2000 --workers 4 --json ingestion.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import chromadb
+from chromadb.api.client import SharedSystemClient
+from chromadb.config import Settings
+
+from benchmarks.hashing_embeddings import HashingEmbeddingFunction
+from benchmarks.synthetic_lore import generate_vault
+from lore_ingest import LoreIndexer, chunk_markdown, find_lore_files
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def open_collection(chroma_path: Path):
+    client = chromadb.PersistentClient(path=str(chroma_path), settings=Settings(anonymized_telemetry=False))
+    return client, client.get_or_create_collection(name="doammo_lore", embedding_function=HashingEmbeddingFunction())
+
+
+def load_all(lore_dir: Path, chroma_path: Path, options: argparse.Namespace) -> Dict:
+    """Read and chunk every file into one list, then hand it to Chroma"""
+    client, collection = open_collection(chroma_path)
+    start = time.perf_counter()
+    chunks = []
+    for path in find_lore_files(lore_dir):
+        chunks += chunk_markdown(path.read_text(encoding="utf-8"), path.relative_to(lore_dir).as_posix())
+    # One add per Chroma's largest accepted batch
+    size = client.get_max_batch_size()
+    for i in range(0, len(chunks), size):
+        batch = chunks[i:i + size]
+        collection.add(ids=[c["id"] for c in batch], documents=[c["document"] for c in batch],
+                       metadatas=[c["metadata"] for c in batch])
+    seconds = time.perf_counter() - start
+    return {"chunks": len(chunks), "seconds": round(seconds, 2), "chunks_per_second": round(len(chunks) / seconds, 1)}
+
+
+def streaming(lore_dir: Path, chroma_path: Path, options: argparse.Namespace, workers: int) -> Dict:
+    """LoreIndexer.sync: fixed-size batches, optionally embedded in worker processes"""
+    _, collection = open_collection(chroma_path)
+    indexer = LoreIndexer(collection, lore_dir, chroma_path / "lore_manifest.json",
+                          batch_size=options.batch_size, workers=workers)
+    report = indexer.sync()
+    return {"chunks": report["chunks_written"], "seconds": report["seconds"],
+            "chunks_per_second": report["chunks_per_second"], "workers": report["workers"]}
+
+
+def resume(lore_dir: Path, chroma_path: Path, options: argparse.Namespace, workers: int) -> Dict:
+    """Interrupt a sync half way, then run it again"""
+    _, collection = open_collection(chroma_path)
+    manifest_path = chroma_path / "lore_manifest.json"
+    indexer = LoreIndexer(collection, lore_dir, manifest_path, batch_size=options.batch_size,
+                          workers=workers, checkpoint_seconds=0)
+
+    def interrupt(state):
+        if state["files_done"] >= state["files_total"] // 2:
+            raise KeyboardInterrupt
+
+    try:
+        indexer.sync(progress=interrupt)
+    except KeyboardInterrupt:
+        pass
+    first = collection.count()
+    resumed = LoreIndexer(collection, lore_dir, manifest_path, batch_size=options.batch_size, workers=workers)
+    report = resumed.sync()
+    return {"before_interrupt": first, "resumed_files_skipped": report["unchanged"],
+            "resumed_chunks": report["chunks_written"], "total_chunks": collection.count()}
+
+
+def run_mode(mode: str, vault_dir: str, options: argparse.Namespace, results) -> None:
+    """One mode in a fresh process, so its peak memory is its own"""
+    lore_dir = Path(vault_dir) / "_Lore"
+    chroma_path = Path(vault_dir) / f"chroma_{mode}"
+    if mode == "load_all":
+        result = load_all(lore_dir, chroma_path, options)
+    elif mode == "resume":
+        result = resume(lore_dir, chroma_path, options, options.workers)
+    else:
+        result = streaming(lore_dir, chroma_path, options, 1 if mode == "streaming" else options.workers)
+    result["peak_rss_mb"] = peak_rss_mb()
+    SharedSystemClient.clear_system_cache()
+    results.put(result)
+
+
+def run_benchmark(options: argparse.Namespace) -> Dict:
+    vault = generate_vault(options.files, sections=options.sections, seed=options.seed)
+    results = {"config": {k: v for k, v in vars(options).items() if k != "json"}, "cpus": os.cpu_count()}
+    context = multiprocessing.get_context("spawn")
+
+    with tempfile.TemporaryDirectory(prefix="doammo_ingestion_") as tmp:
+        lore_dir = Path(tmp) / "_Lore"
+        lore_dir.mkdir()
+        for filename, text in vault.items():
+            (lore_dir / filename).write_text(text, encoding="utf-8")
+        results["vault_mb"] = round(sum(len(text.encode()) for text in vault.values()) / 2**20, 2)
+
+        for mode in ("load_all", "streaming", "parallel", "resume"):
+            queue = context.Queue()
+            process = context.Process(target=run_mode, args=(mode, tmp, options, queue))
+            process.start()
+            results[mode] = queue.get()
+            process.join()
+    return results
+
+
+def print_report(results: Dict):
+    config = results["config"]
+    print(f"{config['files']} files ({results['vault_mb']} MB), batch {config['batch_size']}, "
+          f"{config['workers']} workers on {results['cpus']} CPUs")
+    print(f"{'mode':<10} {'chunks':>7} {'seconds':>8} {'chunks/s':>9} {'peak RSS MB':>12}")
+    for mode in ("load_all", "streaming", "parallel"):
+        r = results[mode]
+        print(f"{mode:<10} {r['chunks']:>7} {r['seconds']:>8} {r['chunks_per_second']:>9} {r['peak_rss_mb']:>12}")
+    r = results["resume"]
+    print(f"Interrupted half way with {r['before_interrupt']} chunks written; the rerun skipped "
+          f"{r['resumed_files_skipped']} files and embedded {r['resumed_chunks']} of {r['total_chunks']} chunks")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare bulk lore ingestion strategies")
+    parser.add_argument("--files", type=int, default=1000, help="Synthetic lore files")
+    parser.add_argument("--sections", type=int, default=8, help="Sections per file")
+    parser.add_argument("--batch-size", type=int, default=512, help="Chunks per streamed batch")
+    parser.add_argument("--workers", type=int, default=2, help="Embedding processes for the parallel run")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Write results to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    options = parse_args(argv)
+    results = run_benchmark(options)
+    print_report(results)
+    if options.json:
+        Path(options.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nResults written to {options.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""
+DOAMMO MMR Benchmark
+Plain top-k vs maximal-marginal-relevance reranking on a vault with near-duplicate notes:
+distinct lore in the packed context, and what the rerank costs
+
+Run from the repository root:
+    python -m benchmarks.lore_mmr
+    python -m benchmarks.lore_mmr --files 500 --k 6 --lambda 0.3 --json mmr.json
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import chromadb
+from chromadb.api.client import SharedSystemClient
+from chromadb.config import Settings
+
+from benchmarks.hashing_embeddings import HashingEmbeddingFunction
+from benchmarks.synthetic_lore import generate_vault
+from context_packer import ContextPacker, estimate_tokens
+from lore_diversity import MMRReranker, mmr_select, relevance_scores
+from lore_ingest import find_lore_files, ingest_files, stitch_chunks
+
+COPIES = ("notes", "draft")
+
+
+def add_near_duplicates(vault: Dict[str, str], fraction: float, seed: int) -> List[str]:
+    """
+    Give a fraction of the files "Name (notes).md" and "Name (draft).md"
+    copies with a few words dropped - the same facts, written down again.
+    Returns the duplicated filenames.
+    """
+    rng = random.Random(seed)
+    originals = rng.sample(sorted(vault), int(len(vault) * fraction))
+    for filename in originals:
+        for copy in COPIES:
+            lines = []
+            for line in vault[filename].splitlines():
+                words = line.split()
+                if len(words) > 8 and not line.startswith("#"):
+                    for _ in range(2):
+                        words.pop(rng.randrange(len(words)))
+                lines.append(" ".join(words))
+            vault[f"{filename[:-3]} ({copy}).md"] = "\n".join(lines)
+    return originals
+
+
+def entity(filename: str) -> str:
+    """The file a copy was made from"""
+    return re.sub(r" \((?:%s)\)(?=\.md$)" % "|".join(COPIES), "", filename)
+
+
+def near_duplicate_pairs(vectors: np.ndarray, threshold: float) -> int:
+    unit = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    similarity = unit @ unit.T
+    return int((np.triu(similarity, 1) > threshold).sum())
+
+
+def measure(select: Callable[[Dict], Dict], candidates: List[Dict], targets: List[str],
+            reranker: MMRReranker, packer: ContextPacker, threshold: float) -> Dict:
+    """Diversity of the kept chunks and of the packed lore, whether the target made it, and the latency"""
+    duplicates, entities, packed_entities, packed_tokens, latencies = [], [], [], [], []
+    hits = 0
+    for results, target in zip(candidates, targets):
+        start = time.perf_counter()
+        kept = select(results)
+        latencies.append(time.perf_counter() - start)
+
+        duplicates.append(near_duplicate_pairs(reranker.embeddings(kept["ids"][0]), threshold))
+        entities.append(len({entity(m["filename"]) for m in kept["metadatas"][0]}))
+        documents, distances = stitch_chunks(kept["documents"][0], kept["metadatas"][0],
+                                             kept["distances"][0] if kept.get("distances") else None)
+        lore, sources = packer.pack_lore("", documents, distances)
+        packed_entities.append(len({entity(source) for source in sources}))
+        packed_tokens.append(estimate_tokens(lore))
+        hits += target in {entity(source) for source in sources}
+    latencies.sort()
+    return {
+        "near_duplicate_pairs": round(float(np.mean(duplicates)), 2),
+        "distinct_entities": round(float(np.mean(entities)), 2),
+        "packed_entities": round(float(np.mean(packed_entities)), 2),
+        "packed_tokens": round(float(np.mean(packed_tokens)), 1),
+        "tokens_per_entity": round(sum(packed_tokens) / max(sum(packed_entities), 1), 1),
+        "target_packed": round(hits / len(targets), 3),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 3)
+    }
+
+
+def run_benchmark(options: argparse.Namespace) -> Dict:
+    vault = generate_vault(options.files, sections=options.sections, seed=options.seed)
+    duplicated = add_near_duplicates(vault, options.duplicates, options.seed)
+    rng = random.Random(options.seed)
+    packer = ContextPacker(lore_tokens=options.lore_tokens)
+    results = {"config": {k: v for k, v in vars(options).items() if k != "json"}}
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="doammo_mmr_") as tmp:
+            lore_dir = Path(tmp) / "_Lore"
+            lore_dir.mkdir()
+            for filename, text in vault.items():
+                (lore_dir / filename).write_text(text, encoding="utf-8")
+            client = chromadb.PersistentClient(path=str(Path(tmp) / "chroma_data"),
+                                               settings=Settings(anonymized_telemetry=False))
+            collection = client.create_collection(name="doammo_lore", embedding_function=HashingEmbeddingFunction())
+            ingest_files(collection, lore_dir, find_lore_files(lore_dir))
+
+            # Questions about duplicated entities: the case where top-k repeats itself
+            targets = rng.choices(duplicated, k=options.queries)
+            questions = [" ".join(rng.sample(vault[target].split(), 8)) for target in targets]
+            candidates = [collection.query(query_texts=[question], n_results=options.fetch_k)
+                          for question in questions]
+
+            reranker = MMRReranker(collection, lambda_mult=options.lambda_mult, k=options.k,
+                                   fetch_k=options.fetch_k)
+
+            def top_k(results):
+                return {key: [results[key][0][:options.k]] for key in ("ids", "documents", "metadatas", "distances")}
+
+            results["top_k"] = measure(top_k, candidates, targets, reranker, packer, options.threshold)
+            results["mmr"] = measure(reranker.rerank, candidates, targets, reranker, packer, options.threshold)
+
+            # The selection alone, with the embeddings already fetched
+            fetched = [(relevance_scores(c), reranker.embeddings(c["ids"][0])) for c in candidates]
+            start = time.perf_counter()
+            for relevance, vectors in fetched:
+                mmr_select(relevance, vectors, options.k, options.lambda_mult)
+            results["mmr"]["select_only_ms"] = round((time.perf_counter() - start) / len(fetched) * 1000, 3)
+    finally:
+        SharedSystemClient.clear_system_cache()
+
+    return results
+
+
+def print_report(results: Dict):
+    config = results["config"]
+    print(f"keep {config['k']} of {config['fetch_k']} candidates, lambda {config['lambda_mult']}")
+    print(f"{'mode':<6} {'dup pairs':>9} {'entities':>9} {'packed':>7} {'tokens':>7} {'tok/entity':>11} "
+          f"{'target':>7} {'p50 ms':>7} {'p95 ms':>7}")
+    for mode in ("top_k", "mmr"):
+        r = results[mode]
+        print(f"{mode:<6} {r['near_duplicate_pairs']:>9} {r['distinct_entities']:>9} {r['packed_entities']:>7} "
+              f"{r['packed_tokens']:>7} {r['tokens_per_entity']:>11} {r['target_packed']:>7.1%} {r['p50_ms']:>7} "
+              f"{r['p95_ms']:>7}")
+    print(f"MMR selection alone: {results['mmr']['select_only_ms']} ms per query "
+          f"(the rest is fetching candidate embeddings)")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare plain top-k and MMR-reranked lore retrieval")
+    parser.add_argument("--files", type=int, default=300, help="Synthetic lore files")
+    parser.add_argument("--sections", type=int, default=4, help="Sections per file")
+    parser.add_argument("--duplicates", type=float, default=0.3,
+                        help="Fraction of files with near-duplicate (notes) and (draft) copies")
+    parser.add_argument("--queries", type=int, default=200, help="Questions about duplicated files")
+    parser.add_argument("--k", type=int, default=8, help="Chunks kept")
+    parser.add_argument("--fetch-k", type=int, default=32, help="Candidates retrieved")
+    parser.add_argument("--lambda", dest="lambda_mult", type=float, default=0.5, help="MMR relevance weight")
+    parser.add_argument("--lore-tokens", type=int, default=900, help="Packer lore budget")
+    parser.add_argument("--threshold", type=float, default=0.9, help="Cosine similarity counted as a duplicate")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Write results to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    options = parse_args(argv)
+    results = run_benchmark(options)
+    print_report(results)
+    if options.json:
+        Path(options.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nResults written to {options.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
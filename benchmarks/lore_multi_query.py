@@ -0,0 +1,169 @@
+"""
+DOAMMO Multi-Query Retrieval Benchmark
+Follow-up turns ("I follow her inside"): player input alone vs conversation-aware sub-queries,
+vector-only and hybrid
+
+Run from the repository root:
+    python -m benchmarks.lore_multi_query
+    python -m benchmarks.lore_multi_query --files 500 --k 5 --json multi_query.json
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import chromadb
+from chromadb.api.client import SharedSystemClient
+from chromadb.config import Settings
+
+from benchmarks.hashing_embeddings import HashingEmbeddingFunction
+from benchmarks.lore_retrieval import file_ranks
+from benchmarks.synthetic_lore import _ADJECTIVES, _NOUNS, _VERBS, generate_vault
+from lexical_index import BM25Index, HybridRetriever
+from lore_cache import split_rows
+from lore_ingest import find_lore_files, ingest_files
+from lore_queries import SubQueryBuilder, merge_rows
+
+FOLLOW_UPS = [
+    "I follow her inside.", "I ask him what he knows.", "I keep close behind them.",
+    "What is it hiding?", "I wait until she looks away.", "I tell him we need to leave."
+]
+
+
+def follow_up_turns(vault: Dict[str, str], count: int, seed: int) -> List[Tuple[str, List[Dict], str]]:
+    """
+    (target file, history, player input) turns. The narrator's last
+    message names the target (and, in passing, one other entity); the
+    player's input only refers back to it.
+    """
+    rng = random.Random(seed)
+    filenames = sorted(vault)
+    turns = []
+    for filename in rng.sample(filenames, min(count, len(filenames))):
+        name = filename[:-3]
+        other = rng.choice([f for f in filenames if f != filename])[:-3]
+        narrative = (f"{name} {rng.choice(_VERBS)} the {rng.choice(_ADJECTIVES)} {rng.choice(_NOUNS)} ahead of you. "
+                     f"Slowly, {name} turns toward a door in the {rng.choice(_NOUNS)}. "
+                     f"Somewhere behind you a traveller from {other} is singing.")
+        history = [{"role": "user", "content": "I look around."}, {"role": "assistant", "content": narrative}]
+        turns.append((filename, history, rng.choice(FOLLOW_UPS)))
+    return turns
+
+
+def measure(search: Callable[[str, List[Dict]], Dict], turns, k: int) -> Dict:
+    """Recall@k (target file among the top k distinct files), mean reciprocal rank and latency"""
+    hits = 0
+    reciprocal = 0.0
+    latencies = []
+    for filename, history, user_input in turns:
+        start = time.perf_counter()
+        ranked = file_ranks(search(user_input, history))
+        latencies.append(time.perf_counter() - start)
+        if filename in ranked[:k]:
+            hits += 1
+        if filename in ranked:
+            reciprocal += 1 / (ranked.index(filename) + 1)
+    latencies.sort()
+    return {
+        "turns": len(turns),
+        "recall_at_k": round(hits / len(turns), 3),
+        "mrr": round(reciprocal / len(turns), 3),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 2)
+    }
+
+
+def run_benchmark(options: argparse.Namespace) -> Dict:
+    vault = generate_vault(options.files, sections=options.sections, seed=options.seed)
+    turns = follow_up_turns(vault, options.turns, options.seed)
+    builder = SubQueryBuilder(context_tokens=options.context_tokens, max_entities=options.max_entities)
+    results = {"config": {k: v for k, v in vars(options).items() if k != "json"}}
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="doammo_multi_query_") as tmp:
+            lore_dir = Path(tmp) / "_Lore"
+            lore_dir.mkdir()
+            for filename, text in vault.items():
+                (lore_dir / filename).write_text(text, encoding="utf-8")
+
+            client = chromadb.PersistentClient(path=str(Path(tmp) / "chroma_data"),
+                                               settings=Settings(anonymized_telemetry=False))
+            collection = client.create_collection(name="doammo_lore", embedding_function=HashingEmbeddingFunction())
+            ingest_files(collection, lore_dir, find_lore_files(lore_dir))
+            n = options.n_results
+
+            def single(user_input, history):
+                return collection.query(query_texts=[user_input], n_results=n)
+
+            def batched(user_input, history):
+                queries = builder.build(user_input, history)
+                return merge_rows(split_rows(collection.query(query_texts=queries, n_results=n)), n)
+
+            def sequential(user_input, history):
+                # Same sub-queries, one round trip each
+                rows = [collection.query(query_texts=[query], n_results=n)
+                        for query in builder.build(user_input, history)]
+                return merge_rows(rows, n)
+
+            hybrid = HybridRetriever(collection, index=BM25Index.from_collection(collection))
+
+            def single_hybrid(user_input, history):
+                return hybrid.fuse(user_input, single(user_input, history), n)
+
+            def batched_hybrid(user_input, history):
+                # As LoreKeeperAgent does: BM25 sees every sub-query's words
+                text = " ".join(builder.build(user_input, history))
+                return hybrid.fuse(text, batched(user_input, history), n)
+
+            results["single"] = measure(single, turns, options.k)
+            results["multi_batched"] = measure(batched, turns, options.k)
+            results["multi_sequential"] = measure(sequential, turns, options.k)
+            results["single_hybrid"] = measure(single_hybrid, turns, options.k)
+            results["multi_hybrid"] = measure(batched_hybrid, turns, options.k)
+            results["queries_per_turn"] = round(
+                sum(len(builder.build(user_input, history)) for _, history, user_input in turns) / len(turns), 2)
+    finally:
+        SharedSystemClient.clear_system_cache()
+
+    return results
+
+
+def print_report(results: Dict):
+    print(f"{results['queries_per_turn']} sub-queries per turn on average")
+    print(f"{'mode':<17} {'recall@k':>9} {'MRR':>6} {'p50 ms':>8} {'p95 ms':>8}")
+    for mode in ("single", "multi_batched", "multi_sequential", "single_hybrid", "multi_hybrid"):
+        r = results[mode]
+        print(f"{mode:<17} {r['recall_at_k']:>9.1%} {r['mrr']:>6} {r['p50_ms']:>8} {r['p95_ms']:>8}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare single-query and conversation-aware lore retrieval")
+    parser.add_argument("--files", type=int, default=300, help="Synthetic lore files")
+    parser.add_argument("--sections", type=int, default=8, help="Sections per file")
+    parser.add_argument("--turns", type=int, default=200, help="Follow-up turns to retrieve for")
+    parser.add_argument("--n-results", type=int, default=12, help="Chunks retrieved per query")
+    parser.add_argument("--k", type=int, default=3, help="Recall cutoff in distinct files")
+    parser.add_argument("--context-tokens", type=int, default=80, help="Narrator context in the context sub-query")
+    parser.add_argument("--max-entities", type=int, default=4, help="Name sub-queries per turn")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Write results to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    options = parse_args(argv)
+    results = run_benchmark(options)
+    print_report(results)
+    if options.json:
+        Path(options.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nResults written to {options.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
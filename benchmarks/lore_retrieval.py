@@ -0,0 +1,163 @@
+"""
+DOAMMO Lore Retrieval Benchmark
+Vector-only vs hybrid (BM25 + vector, reciprocal rank fusion) recall on a synthetic chunked vault
+
+Run from the repository root:
+    python -m benchmarks.lore_retrieval
+    python -m benchmarks.lore_retrieval --files 500 --k 5 --json retrieval.json
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import chromadb
+from chromadb.api.client import SharedSystemClient
+from chromadb.config import Settings
+
+from benchmarks.hashing_embeddings import HashingEmbeddingFunction
+from benchmarks.lore_chunking import plant_facts
+from benchmarks.synthetic_lore import generate_vault
+from lexical_index import BM25Index, HybridRetriever
+from lore_ingest import find_lore_files, ingest_files
+
+
+def name_queries(vault: Dict[str, str], seed: int) -> List[Tuple[str, str, str]]:
+    """
+    Questions that name an entity without repeating the file's wording.
+
+    Filenames follow the vault's Kind_Name.md convention; the question only
+    uses the bare name (the file's title), as players do.
+    """
+    rng = random.Random(seed)
+    templates = ["Who is {}?", "Tell me about {}.", "What happened to {} lately?", "Where can I find {}?"]
+    return [(filename, rng.choice(templates).format(text.split("\n", 1)[0].lstrip("# ")), "")
+            for filename, text in sorted(vault.items())]
+
+
+def file_ranks(results: Dict) -> List[str]:
+    """Distinct source files in result order"""
+    files = []
+    for metadata in results["metadatas"][0]:
+        if metadata["filename"] not in files:
+            files.append(metadata["filename"])
+    return files
+
+
+def measure(search, questions: List[Tuple[str, str, str]], k: int) -> Dict:
+    """Recall@k (target file among the top k distinct files) and mean reciprocal rank"""
+    hits = 0
+    reciprocal = 0.0
+    latencies = []
+    for filename, question, _ in questions:
+        start = time.perf_counter()
+        ranked = file_ranks(search(question))
+        latencies.append(time.perf_counter() - start)
+        if filename in ranked[:k]:
+            hits += 1
+        if filename in ranked:
+            reciprocal += 1 / (ranked.index(filename) + 1)
+    latencies.sort()
+    return {
+        "queries": len(questions),
+        "recall_at_k": round(hits / len(questions), 3),
+        "mrr": round(reciprocal / len(questions), 3),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 2)
+    }
+
+
+def run_benchmark(options: argparse.Namespace) -> Dict:
+    vault = generate_vault(options.files, sections=options.sections, seed=options.seed)
+    # Kind prefixes like the real vault's Char_Aeth_Lyssia.md
+    rng = random.Random(options.seed)
+    vault = {f"{rng.choice(['Char', 'Loc', 'Fac', 'Art'])}_{name}": text for name, text in vault.items()}
+    facts = plant_facts(vault, options.seed)
+    sample = random.Random(options.seed).sample
+    workloads = {
+        "names": sample(name_queries(vault, options.seed), min(options.queries, len(vault))),
+        "facts": sample(facts, min(options.queries, len(facts)))
+    }
+    results = {"config": {k: v for k, v in vars(options).items() if k != "json"}}
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="doammo_retrieval_") as tmp:
+            lore_dir = Path(tmp) / "_Lore"
+            lore_dir.mkdir()
+            for filename, text in vault.items():
+                (lore_dir / filename).write_text(text, encoding="utf-8")
+
+            client = chromadb.PersistentClient(path=str(Path(tmp) / "chroma_data"),
+                                               settings=Settings(anonymized_telemetry=False))
+            collection = client.create_collection(name="doammo_lore", embedding_function=HashingEmbeddingFunction())
+            ingest_files(collection, lore_dir, find_lore_files(lore_dir))
+
+            start = time.perf_counter()
+            index = BM25Index.from_collection(collection)
+            results["bm25"] = {**index.stats(), "build_seconds": round(time.perf_counter() - start, 3)}
+            hybrid = HybridRetriever(collection, rrf_k=options.rrf_k, index=index)
+
+            def vector(question):
+                return collection.query(query_texts=[question], n_results=options.n_results)
+
+            def fused(question):
+                return hybrid.fuse(question, vector(question), options.n_results)
+
+            for workload, questions in workloads.items():
+                results[workload] = {
+                    "vector": measure(vector, questions, options.k),
+                    "hybrid": measure(fused, questions, options.k)
+                }
+            # The lexical half on its own, to show what hybrid mode adds per turn
+            questions = workloads["names"]
+            start = time.perf_counter()
+            for _, question, _ in questions:
+                index.search(question, options.n_results)
+            results["bm25"]["ms_per_query"] = round((time.perf_counter() - start) / len(questions) * 1000, 3)
+    finally:
+        SharedSystemClient.clear_system_cache()
+
+    return results
+
+
+def print_report(results: Dict):
+    bm25 = results["bm25"]
+    print(f"BM25: {bm25['documents']} chunks, {bm25['terms']} terms, {bm25['postings_bytes'] / 1024:.0f} KB, "
+          f"built in {bm25['build_seconds']}s, {bm25['ms_per_query']} ms/query")
+    print(f"{'workload':<9} {'mode':<7} {'recall@k':>9} {'MRR':>6} {'p50 ms':>8} {'p95 ms':>8}")
+    for workload in ("names", "facts"):
+        for mode in ("vector", "hybrid"):
+            r = results[workload][mode]
+            print(f"{workload:<9} {mode:<7} {r['recall_at_k']:>9.1%} {r['mrr']:>6} {r['p50_ms']:>8} {r['p95_ms']:>8}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare vector-only and hybrid lore retrieval")
+    parser.add_argument("--files", type=int, default=300, help="Synthetic lore files")
+    parser.add_argument("--sections", type=int, default=8, help="Sections per file")
+    parser.add_argument("--queries", type=int, default=200, help="Questions per workload")
+    parser.add_argument("--n-results", type=int, default=12, help="Chunks retrieved per query")
+    parser.add_argument("--k", type=int, default=3, help="Recall cutoff in distinct files")
+    parser.add_argument("--rrf-k", type=int, default=60, help="Reciprocal rank fusion constant")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Write results to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    options = parse_args(argv)
+    results = run_benchmark(options)
+    print_report(results)
+    if options.json:
+        Path(options.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nResults written to {options.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
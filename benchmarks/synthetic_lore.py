@@ -0,0 +1,63 @@
+"""
+DOAMMO Synthetic Lore
+Deterministic fake vault content for benchmarks (no real vault needed)
+"""
+
+import random
+from typing import Dict, List
+
+_SYLLABLES = ["ka", "ly", "ssa", "veth", "mor", "an", "dra", "el", "th", "ion", "ru", "zar", "qu", "is", "ne", "orr"]
+_KINDS = ["character", "location", "faction", "artifact", "event"]
+_ADJECTIVES = ["ancient", "silver", "forgotten", "storm-worn", "floating", "buried", "sacred", "rusted"]
+_NOUNS = ["megastructure", "skyship", "desert", "archive", "citadel", "reactor", "canyon", "monastery"]
+_VERBS = ["guards", "remembers", "betrayed", "rebuilt", "charted", "hunts", "worships", "sealed"]
+
+
+def make_name(rng: random.Random) -> str:
+    return "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+
+
+def make_sentence(rng: random.Random, names: List[str]) -> str:
+    return (f"{rng.choice(names)} {rng.choice(_VERBS)} the {rng.choice(_ADJECTIVES)} "
+            f"{rng.choice(_NOUNS)} near {rng.choice(names)}.")
+
+
+def generate_vault(n_files: int = 200, sections: int = 4, sentences: int = 5, seed: int = 7) -> Dict[str, str]:
+    """
+    Build a fake lore vault.
+
+    Returns {filename: markdown}. Each file has a title, a short intro and
+    `sections` headed sections, and mentions other entities from the vault
+    so queries have realistic cross-file matches.
+    """
+    rng = random.Random(seed)
+    names = []
+    while len(names) < n_files:
+        name = make_name(rng)
+        if name not in names:
+            names.append(name)
+
+    vault = {}
+    for name in names:
+        kind = rng.choice(_KINDS)
+        lines = [f"# {name}", "", f"{name} is a {rng.choice(_ADJECTIVES)} {kind} of the DOAMMO universe.", ""]
+        for section in range(sections):
+            lines.append(f"## {rng.choice(_NOUNS).capitalize()} {section + 1}")
+            lines.append("")
+            lines.append(" ".join(make_sentence(rng, names) for _ in range(sentences)))
+            lines.append("")
+        vault[f"{name}.md"] = "\n".join(lines)
+    return vault
+
+
+def seed_collection(collection, vault: Dict[str, str], batch_size: int = 100):
+    """Add a vault to a Chroma collection the same way the setup script does (one document per file)"""
+    items = list(vault.items())
+    for start in range(0, len(items), batch_size):
+        batch = items[start:start + batch_size]
+        collection.add(
+            documents=[text for _, text in batch],
+            metadatas=[{"filename": filename, "filepath": filename, "size": len(text), "type": "lore"}
+                       for filename, text in batch],
+            ids=[filename[:-3] for filename, _ in batch]
+        )
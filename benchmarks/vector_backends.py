@@ -0,0 +1,162 @@
+"""
+DOAMMO Vector Backend Benchmark
+Chroma's HNSW query path vs the in-process NumPy index: startup time, query latency, batching
+
+Run from the repository root:
+    python -m benchmarks.vector_backends
+    python -m benchmarks.vector_backends --files 1000 --batch 32 --json vectors.json
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import chromadb
+from chromadb.api.client import SharedSystemClient
+from chromadb.config import Settings
+
+from benchmarks.hashing_embeddings import HashingEmbeddingFunction
+from benchmarks.synthetic_lore import generate_vault
+from lore_ingest import find_lore_files, ingest_files
+from vector_index import NumpyVectorIndex
+
+
+def open_collection(chroma_path: Path):
+    client = chromadb.PersistentClient(path=str(chroma_path), settings=Settings(anonymized_telemetry=False))
+    return client.get_collection(name="doammo_lore", embedding_function=HashingEmbeddingFunction())
+
+
+def time_startup(chroma_path: Path, backend: str, probe: List[float], runs: int) -> Dict:
+    """Seconds from opening the database to the first answered query, median of cold runs"""
+    timings = []
+    for _ in range(runs):
+        SharedSystemClient.clear_system_cache()
+        start = time.perf_counter()
+        collection = open_collection(chroma_path)
+        if backend == "numpy":
+            index = NumpyVectorIndex(collection)
+            index.load()
+            index.query(query_embeddings=[probe], n_results=1)
+        else:
+            # Chroma loads the HNSW segment on the first query
+            collection.query(query_embeddings=[probe], n_results=1)
+        timings.append(time.perf_counter() - start)
+    SharedSystemClient.clear_system_cache()
+    return {"median_seconds": round(statistics.median(timings), 4), "runs": runs}
+
+
+def time_queries(search: Callable[[List], Dict], embeddings: List, batch: int) -> Dict:
+    """Latency of one query per call, then throughput of batch queries per call"""
+    latencies = []
+    for embedding in embeddings:
+        start = time.perf_counter()
+        search([embedding])
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    start = time.perf_counter()
+    for i in range(0, len(embeddings), batch):
+        search(embeddings[i:i + batch])
+    batched = time.perf_counter() - start
+    return {
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 3),
+        "batched_ms_per_query": round(batched / len(embeddings) * 1000, 3)
+    }
+
+
+def run_benchmark(options: argparse.Namespace) -> Dict:
+    vault = generate_vault(options.files, sections=options.sections, seed=options.seed)
+    rng = random.Random(options.seed)
+    results = {"config": {k: v for k, v in vars(options).items() if k != "json"}}
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="doammo_vectors_") as tmp:
+            lore_dir = Path(tmp) / "_Lore"
+            lore_dir.mkdir()
+            for filename, text in vault.items():
+                (lore_dir / filename).write_text(text, encoding="utf-8")
+            chroma_path = Path(tmp) / "chroma_data"
+            client = chromadb.PersistentClient(path=str(chroma_path), settings=Settings(anonymized_telemetry=False))
+            collection = client.create_collection(name="doammo_lore", embedding_function=HashingEmbeddingFunction())
+            ingest_files(collection, lore_dir, find_lore_files(lore_dir))
+
+            # Queries are pre-embedded so both backends time the search alone
+            questions = [" ".join(rng.sample(text.split(), 8)) for text in rng.choices(list(vault.values()),
+                                                                                         k=options.queries)]
+            embeddings = [np.asarray(e, dtype=np.float32).tolist()
+                          for e in collection._embed(input=questions, is_query=True)]
+
+            index = NumpyVectorIndex(collection)
+            index.load()
+            results["index"] = index.stats()
+
+            def chroma(batch):
+                return collection.query(query_embeddings=batch, n_results=options.n_results)
+
+            def numpy_index(batch):
+                return index.query(query_embeddings=batch, n_results=options.n_results)
+
+            results["chroma"] = {"query": time_queries(chroma, embeddings, options.batch)}
+            results["numpy"] = {"query": time_queries(numpy_index, embeddings, options.batch)}
+
+            # HNSW is approximate; the numpy search is exact
+            chroma_ids = chroma(embeddings)["ids"]
+            exact_ids = numpy_index(embeddings)["ids"]
+            overlap = [len(set(a) & set(b)) / len(b) for a, b in zip(chroma_ids, exact_ids) if b]
+            results["chroma"]["recall_vs_exact"] = round(sum(overlap) / len(overlap), 4)
+
+            SharedSystemClient.clear_system_cache()
+            for backend in ("chroma", "numpy"):
+                results[backend]["startup"] = time_startup(chroma_path, backend, embeddings[0], options.startup_runs)
+    finally:
+        SharedSystemClient.clear_system_cache()
+
+    return results
+
+
+def print_report(results: Dict):
+    index = results["index"]
+    print(f"{index['vectors']} chunks x {index['dimensions']} dims, "
+          f"matrix {index['matrix_bytes'] / 2**20:.1f} MB, batch {results['config']['batch']}")
+    print(f"{'backend':<8} {'startup s':>10} {'p50 ms':>8} {'p95 ms':>8} {'batched ms/q':>13}")
+    for backend in ("chroma", "numpy"):
+        r = results[backend]
+        print(f"{backend:<8} {r['startup']['median_seconds']:>10} {r['query']['p50_ms']:>8} "
+              f"{r['query']['p95_ms']:>8} {r['query']['batched_ms_per_query']:>13}")
+    print(f"Chroma top-{results['config']['n_results']} overlap with the exact search: "
+          f"{results['chroma']['recall_vs_exact']:.1%}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare Chroma and the in-process NumPy vector index")
+    parser.add_argument("--files", type=int, default=400, help="Synthetic lore files")
+    parser.add_argument("--sections", type=int, default=8, help="Sections per file")
+    parser.add_argument("--queries", type=int, default=300, help="Timed queries")
+    parser.add_argument("--n-results", type=int, default=12, help="Chunks retrieved per query")
+    parser.add_argument("--batch", type=int, default=16, help="Queries per call in the batched run")
+    parser.add_argument("--startup-runs", type=int, default=3, help="Cold starts to take the median of")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Write results to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    options = parse_args(argv)
+    results = run_benchmark(options)
+    print_report(results)
+    if options.json:
+        Path(options.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nResults written to {options.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
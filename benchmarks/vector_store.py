@@ -0,0 +1,164 @@
+"""
+DOAMMO Vector Store Benchmark
+Cold start of lore search in a fresh process: opening Chroma, loading the numpy index out
+of Chroma, and memory-mapping the exported vector store - time to the first answer and
+how much of the memory is shareable page cache
+
+Run from the repository root:
+    python -m benchmarks.vector_store
+    python -m benchmarks.vector_store --files 2000 --json vector_store.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import chromadb
+from chromadb.api.client import SharedSystemClient
+from chromadb.config import Settings
+
+from benchmarks.hashing_embeddings import HashingEmbeddingFunction
+from benchmarks.synthetic_lore import generate_vault
+from lore_ingest import MANIFEST_NAME, LoreIndexer
+from vector_index import STORE_NAME, NumpyVectorIndex, open_current_store
+
+MODES = ("chroma", "numpy", "mapped")
+
+
+def memory_mb() -> Dict:
+    """Current anonymous (private) and file-backed (shareable) resident memory, from /proc on Linux"""
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            fields = dict(line.split(":", 1) for line in f if line.startswith("Rss"))
+    except OSError:
+        return {}
+    return {key: round(int(fields[field].split()[0]) / 1024, 1)
+            for key, field in (("anon_mb", "RssAnon"), ("file_mb", "RssFile")) if field in fields}
+
+
+def open_chroma(chroma_path: Path):
+    client = chromadb.PersistentClient(path=str(chroma_path), settings=Settings(anonymized_telemetry=False))
+    return client.get_collection(name="doammo_lore", embedding_function=HashingEmbeddingFunction())
+
+
+def run_mode(mode: str, chroma_path: str, questions: List[str], n_results: int, results) -> None:
+    """Open the lore one way in a fresh process and answer the questions"""
+    chroma_path = Path(chroma_path)
+    start = time.perf_counter()
+    if mode == "chroma":
+        search = open_chroma(chroma_path)
+    elif mode == "numpy":
+        search = NumpyVectorIndex(open_chroma(chroma_path))
+        search.load()
+    else:
+        search = open_current_store(chroma_path)
+    opened = time.perf_counter()
+    answers = [search.query(query_texts=questions[:1], n_results=n_results)["ids"][0]]
+    answered = time.perf_counter()
+    for question in questions[1:]:
+        answers.append(search.query(query_texts=[question], n_results=n_results)["ids"][0])
+    rest = time.perf_counter() - answered
+
+    result = {
+        "open_ms": round((opened - start) * 1000, 1),
+        "first_query_ms": round((answered - opened) * 1000, 1),
+        "cold_start_ms": round((answered - start) * 1000, 1),
+        "query_ms": round(rest / max(len(questions) - 1, 1) * 1000, 3),
+        "answers": answers
+    }
+    result.update(memory_mb())
+    SharedSystemClient.clear_system_cache()
+    results.put(result)
+
+
+def build(lore_dir: Path, chroma_path: Path, options: argparse.Namespace) -> Dict:
+    """Index the vault and export the store, as python lore_ingest.py does"""
+    client = chromadb.PersistentClient(path=str(chroma_path), settings=Settings(anonymized_telemetry=False))
+    collection = client.create_collection(name="doammo_lore", embedding_function=HashingEmbeddingFunction())
+    indexer = LoreIndexer(collection, lore_dir, chroma_path / MANIFEST_NAME)
+    indexer.sync()
+    start = time.perf_counter()
+    store = NumpyVectorIndex(collection, store_path=chroma_path / STORE_NAME, fingerprint=indexer.fingerprint)
+    store.load()
+    export_seconds = time.perf_counter() - start
+    stats = store.stats()
+    SharedSystemClient.clear_system_cache()
+    store_bytes = sum(path.stat().st_size for path in (chroma_path / STORE_NAME).iterdir())
+    return {"chunks": stats["vectors"], "dimensions": stats["dimensions"],
+            "export_ms": round(export_seconds * 1000, 1), "store_mb": round(store_bytes / 2**20, 1)}
+
+
+def run_benchmark(options: argparse.Namespace) -> Dict:
+    vault = generate_vault(options.files, sections=options.sections, seed=options.seed)
+    rng = random.Random(options.seed)
+    questions = [" ".join(rng.sample(text.split(), 8)) for text in rng.sample(list(vault.values()), options.queries)]
+    results = {"config": {k: v for k, v in vars(options).items() if k != "json"}}
+    context = multiprocessing.get_context("spawn")
+
+    with tempfile.TemporaryDirectory(prefix="doammo_store_") as tmp:
+        lore_dir = Path(tmp) / "_Lore"
+        lore_dir.mkdir()
+        for filename, text in vault.items():
+            (lore_dir / filename).write_text(text, encoding="utf-8")
+        chroma_path = Path(tmp) / "chroma_data"
+        results["build"] = build(lore_dir, chroma_path, options)
+
+        for mode in MODES:
+            queue = context.Queue()
+            process = context.Process(target=run_mode, args=(mode, str(chroma_path), questions, options.k, queue))
+            process.start()
+            results[mode] = queue.get()
+            process.join()
+    # Both exact searches must return the same chunks; Chroma's HNSW is approximate
+    answers = {mode: results[mode].pop("answers") for mode in MODES}
+    results["mapped_matches_numpy"] = answers["mapped"] == answers["numpy"]
+    results["chroma_recall"] = round(float(np.mean([len(set(approximate) & set(exact)) / max(len(exact), 1)
+                                                    for approximate, exact in zip(answers["chroma"], answers["mapped"])])), 3)
+    return results
+
+
+def print_report(results: Dict):
+    build = results["build"]
+    print(f"{build['chunks']} chunks x {build['dimensions']} dims; export took {build['export_ms']} ms "
+          f"and {build['store_mb']} MB on disk")
+    print(f"{'mode':<7} {'open ms':>8} {'1st query':>10} {'cold start':>11} {'query ms':>9} "
+          f"{'anon MB':>8} {'file MB':>8}")
+    for mode in MODES:
+        r = results[mode]
+        print(f"{mode:<7} {r['open_ms']:>8} {r['first_query_ms']:>10} {r['cold_start_ms']:>11} {r['query_ms']:>9} "
+              f"{r.get('anon_mb', '-'):>8} {r.get('file_mb', '-'):>8}")
+    print(f"Mapped store answers like the in-memory index: {results['mapped_matches_numpy']}; "
+          f"Chroma's recall of the exact top {results['config']['k']}: {results['chroma_recall']:.1%}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare cold-start lore search: Chroma, numpy, mapped store")
+    parser.add_argument("--files", type=int, default=1000, help="Synthetic lore files")
+    parser.add_argument("--sections", type=int, default=8, help="Sections per file")
+    parser.add_argument("--queries", type=int, default=50, help="Questions asked")
+    parser.add_argument("--k", type=int, default=8, help="Results per question")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Write results to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    options = parse_args(argv)
+    results = run_benchmark(options)
+    print_report(results)
+    if options.json:
+        Path(options.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nResults written to {options.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
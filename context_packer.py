@@ -0,0 +1,210 @@
+"""
+DOAMMO Context Packer
+Assembles prompt sections (lore, summary, history, input) under per-section token budgets
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Roughly mirrors BPE tokenizers: short words are one token, longer words
+# split every ~4 characters, punctuation is its own token
+_TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]")
+_WORD_RE = re.compile(r"[a-z0-9']+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_HEADING_RE = re.compile(r"^#{1,6}\s")
+
+# Very common words that shouldn't count as a query match
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "of", "to", "in", "on", "at", "for",
+    "with", "from", "by", "is", "are", "was", "were", "be", "i", "you", "he",
+    "she", "it", "we", "they", "my", "your", "his", "her", "its", "our",
+    "their", "this", "that", "these", "those", "as", "into", "up", "down"
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast local approximation of the LLM token count for a piece of text"""
+    return len(_TOKEN_RE.findall(text))
+
+
+def content_words(text: str) -> List[str]:
+    """Lowercased words in order, without stopwords and single letters"""
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS and len(w) > 1]
+
+
+def query_terms(text: str) -> set:
+    """Lowercased content words used for relevance scoring"""
+    return set(content_words(text))
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s for s in _SENTENCE_RE.split(text.strip()) if s]
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """
+    Split markdown into paragraphs on blank lines.
+
+    A heading with nothing under it before the next blank line is kept with
+    the paragraph that follows, so sections never lose their title.
+    """
+    blocks = [b.strip() for b in re.split(r"\n\s*\n", text) if b.strip()]
+    paragraphs = []
+    pending_heading = None
+    for block in blocks:
+        if _HEADING_RE.match(block) and "\n" not in block:
+            pending_heading = f"{pending_heading}\n{block}" if pending_heading else block
+            continue
+        if pending_heading:
+            block = f"{pending_heading}\n{block}"
+            pending_heading = None
+        paragraphs.append(block)
+    if pending_heading:
+        paragraphs.append(pending_heading)
+    return paragraphs
+
+
+def fit_sentences(text: str, budget: int, from_end: bool = False) -> str:
+    """Keep whole sentences (from the start, or the end) until the budget is used"""
+    sentences = split_sentences(text)
+    if from_end:
+        sentences.reverse()
+
+    kept = []
+    used = 0
+    for sentence in sentences:
+        cost = estimate_tokens(sentence)
+        if used + cost > budget:
+            break
+        kept.append(sentence)
+        used += cost
+
+    if from_end:
+        kept.reverse()
+    return " ".join(kept)
+
+
+class ContextPacker:
+    """
+    Builds bounded prompt sections.
+
+    Each section has its own token budget. Lore is packed by relevance a
+    whole paragraph at a time, history keeps the newest whole messages, and
+    nothing is ever cut mid-sentence.
+    """
+
+    def __init__(self, lore_tokens: int = 900, history_tokens: int = 1200, input_tokens: int = 300,
+                 summary_tokens: int = 400):
+        self.lore_tokens = lore_tokens
+        self.history_tokens = history_tokens
+        self.input_tokens = input_tokens
+        self.summary_tokens = summary_tokens
+
+    def pack_lore(self, query: str, documents: List[Tuple[str, str]],
+                  distances: Optional[List[float]] = None) -> Tuple[str, List[str]]:
+        """
+        Pack retrieved lore into the lore budget.
+
+        Args:
+            query: The text the lore was retrieved for
+            documents: (source filename, text) pairs, best match first
+            distances: Optional vector distances for the documents (lower = closer)
+
+        Returns:
+            (lore_context, sources actually included)
+        """
+        terms = query_terms(query)
+        candidates = []  # (score, doc index, paragraph index, text, tokens)
+
+        for doc_idx, (source, text) in enumerate(documents):
+            if distances is not None:
+                doc_weight = 1.0 / (1.0 + max(distances[doc_idx], 0.0))
+            else:
+                doc_weight = 1.0 / (doc_idx + 1)
+
+            for para_idx, paragraph in enumerate(split_paragraphs(text)):
+                tokens = estimate_tokens(paragraph)
+                if tokens > self.lore_tokens:
+                    # A single huge paragraph: keep its leading sentences
+                    paragraph = fit_sentences(paragraph, self.lore_tokens // 2)
+                    tokens = estimate_tokens(paragraph)
+                    if not paragraph:
+                        continue
+
+                overlap = len(terms & query_terms(paragraph)) / len(terms) if terms else 0.0
+                # Earlier paragraphs usually introduce the subject
+                position = 1.0 / (1.0 + 0.1 * para_idx)
+                score = doc_weight * (1.0 + 2.0 * overlap) * position
+                candidates.append((score, doc_idx, para_idx, paragraph, tokens))
+
+        candidates.sort(key=lambda c: c[0], reverse=True)
+
+        chosen: Dict[int, List[Tuple[int, str]]] = {}
+        used = 0
+        for score, doc_idx, para_idx, paragraph, tokens in candidates:
+            header_cost = 0 if doc_idx in chosen else estimate_tokens(f"--- {documents[doc_idx][0]} ---")
+            if used + tokens + header_cost > self.lore_tokens:
+                continue
+            chosen.setdefault(doc_idx, []).append((para_idx, paragraph))
+            used += tokens + header_cost
+
+        lore_context = ""
+        sources = []
+        for doc_idx in sorted(chosen):
+            source = documents[doc_idx][0]
+            body = "\n\n".join(p for _, p in sorted(chosen[doc_idx]))
+            lore_context += f"\n--- {source} ---\n{body}\n"
+            sources.append(source)
+
+        return lore_context, sources
+
+    def pack_history(self, messages: List[Dict]) -> List[Dict]:
+        """Newest messages that fit in the history budget, in chronological order"""
+        kept = []
+        used = 0
+        for msg in reversed(messages):
+            cost = estimate_tokens(msg['content']) + 2  # + role label
+            if used + cost > self.history_tokens:
+                if not kept:
+                    # Even the latest message is too long: keep its ending
+                    content = fit_sentences(msg['content'], self.history_tokens - 2, from_end=True)
+                    if content:
+                        kept.append({**msg, 'content': content})
+                break
+            kept.append(msg)
+            used += cost
+        kept.reverse()
+        return kept
+
+    def pack_fold(self, messages: List[Dict]) -> List[Dict]:
+        """
+        Oldest messages that fit in the history budget, in chronological
+        order: one rolling-summary fold. At least one message is taken (its
+        beginning, if it alone overruns), so a long backlog folds a window's
+        worth at a time.
+        """
+        kept = []
+        used = 0
+        for msg in messages:
+            cost = estimate_tokens(msg['content']) + 2  # + role label
+            if used + cost > self.history_tokens:
+                if not kept:
+                    budget = self.history_tokens - 2
+                    content = fit_sentences(msg['content'], budget) or msg['content'][:budget * 4]
+                    kept.append({**msg, 'content': content})
+                break
+            kept.append(msg)
+            used += cost
+        return kept
+
+    def pack_summary(self, text: str) -> str:
+        """The rolling story summary; if it overruns, the most recent part is kept"""
+        if estimate_tokens(text) <= self.summary_tokens:
+            return text
+        return fit_sentences(text, self.summary_tokens, from_end=True)
+
+    def pack_input(self, text: str) -> str:
+        """The user's input, trimmed to whole sentences if it exceeds its budget"""
+        if estimate_tokens(text) <= self.input_tokens:
+            return text
+        return fit_sentences(text, self.input_tokens) or text[:self.input_tokens * 4]
@@ -9,6 +9,8 @@ import os
 from pathlib import Path
 from typing import TypedDict
 from langchain_anthropic import ChatAnthropic
+from llm_cassette import Cassette
+from vector_index import open_current_store
 from langgraph.graph import StateGraph, END
 import chromadb
 from chromadb.config import Settings
@@ -227,27 +229,37 @@ def main():
 
     # Load API key
     env_path = ".env"
-    api_key = None
+    settings = {}
 
     if os.path.exists(env_path):
         with open(env_path, 'r') as f:
             for line in f:
-                if line.startswith('ANTHROPIC_API_KEY='):
-                    api_key = line.strip().split('=', 1)[1]
-                    break
+                line = line.strip()
+                if '=' in line and not line.startswith('#'):
+                    key, value = line.split('=', 1)
+                    settings[key.strip()] = value.strip()
+    api_key = settings.get('ANTHROPIC_API_KEY')
 
-    if not api_key:
+    # LLM_CASSETTE=record/replay (see .env.example)
+    cassette = Cassette.from_settings(settings)
+    replaying = cassette is not None and cassette.mode == "replay"
+
+    if not api_key and not replaying:
         print("ERROR: API key not found in .env")
         return
 
-    # Connect to ChromaDB
+    # Map a current vector store export (lore_ingest.py writes one), else connect to ChromaDB
     chroma_path = Path("chroma_data")
-    client = chromadb.PersistentClient(
-        path=str(chroma_path),
-        settings=Settings(anonymized_telemetry=False)
-    )
-    collection = client.get_collection(name="doammo_lore")
-    print(f"Connected to lore database ({collection.count()} documents)")
+    collection = open_current_store(chroma_path)
+    if collection is not None:
+        print(f"Mapped lore vector store ({collection.count()} chunks)")
+    else:
+        client = chromadb.PersistentClient(
+            path=str(chroma_path),
+            settings=Settings(anonymized_telemetry=False)
+        )
+        collection = client.get_collection(name="doammo_lore")
+        print(f"Connected to lore database ({collection.count()} documents)")
 
     # Initialize conversation manager
     conv_manager = ConversationManager()
@@ -256,9 +268,12 @@ def main():
     # Initialize LLM
     llm = ChatAnthropic(
         model="claude-sonnet-4-20250514",
-        api_key=api_key,
+        api_key=api_key or "replay",
         max_tokens=600
     )
+    if cassette:
+        llm = cassette.wrap(llm, "claude")
+        print(f"LLM cassette in {cassette.mode} mode ({len(cassette.entries)} entries)")
 
     # Create agents
     lore_keeper = LoreKeeperAgent(collection)
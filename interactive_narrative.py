@@ -12,6 +12,8 @@ from pathlib import Path
 import chromadb
 from chromadb.config import Settings
 from anthropic import Anthropic
+from llm_cassette import Cassette
+from vector_index import open_current_store
 
 class DOAMMONarrator:
     def __init__(self):
@@ -20,6 +22,7 @@ class DOAMMONarrator:
         self.chroma_client = None
         self.collection = None
         self.anthropic_client = None
+        self.cassette = None
 
     def setup(self):
         """Initialize all components"""
@@ -30,32 +33,47 @@ class DOAMMONarrator:
         # Load API key
         print("\nInitializing...")
         env_path = ".env"
+        settings = {}
 
         if os.path.exists(env_path):
             with open(env_path, 'r') as f:
                 for line in f:
-                    if line.startswith('ANTHROPIC_API_KEY='):
-                        self.api_key = line.strip().split('=', 1)[1]
-                        break
+                    line = line.strip()
+                    if '=' in line and not line.startswith('#'):
+                        key, value = line.split('=', 1)
+                        settings[key.strip()] = value.strip()
+        self.api_key = settings.get('ANTHROPIC_API_KEY')
 
-        if not self.api_key:
+        # LLM_CASSETTE=record/replay (see .env.example)
+        self.cassette = Cassette.from_settings(settings)
+        replaying = self.cassette is not None and self.cassette.mode == "replay"
+
+        if not self.api_key and not replaying:
             print("ERROR: API key not found in .env")
             return False
 
-        # Connect to ChromaDB
-        try:
-            self.chroma_client = chromadb.PersistentClient(
-                path=str(self.chroma_path),
-                settings=Settings(anonymized_telemetry=False)
-            )
-            self.collection = self.chroma_client.get_collection(name="doammo_lore")
-            print(f"OK Connected to lore database ({self.collection.count()} documents)")
-        except Exception as e:
-            print(f"ERROR: Could not connect to ChromaDB. Run test_chromadb_setup.py first!")
-            return False
+        # A current vector store export (lore_ingest.py writes one) is
+        # memory-mapped; otherwise search through ChromaDB
+        self.collection = open_current_store(self.chroma_path)
+        if self.collection is not None:
+            print(f"OK Mapped lore vector store ({self.collection.count()} chunks)")
+        else:
+            try:
+                self.chroma_client = chromadb.PersistentClient(
+                    path=str(self.chroma_path),
+                    settings=Settings(anonymized_telemetry=False)
+                )
+                self.collection = self.chroma_client.get_collection(name="doammo_lore")
+                print(f"OK Connected to lore database ({self.collection.count()} documents)")
+            except Exception as e:
+                print(f"ERROR: Could not connect to ChromaDB. Run test_chromadb_setup.py first!")
+                return False
 
         # Setup Claude client
-        self.anthropic_client = Anthropic(api_key=self.api_key)
+        self.anthropic_client = Anthropic(api_key=self.api_key or "replay")
+        if self.cassette:
+            self.anthropic_client = self.cassette.wrap_anthropic(self.anthropic_client)
+            print(f"OK LLM cassette in {self.cassette.mode} mode ({len(self.cassette.entries)} entries)")
         print("OK Connected to Claude AI")
 
         return True
@@ -0,0 +1,220 @@
+"""
+DOAMMO Lexical Index
+In-memory BM25 inverted index over the lore chunks, fused with vector results by reciprocal rank
+"""
+
+import math
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from context_packer import content_words
+
+RETRIEVAL_MODES = ("vector", "hybrid")
+
+
+def lexical_terms(text: str) -> List[str]:
+    """Content words with quotes and possessives stripped ("Lyssia's" -> "lyssia")"""
+    terms = []
+    for word in content_words(text):
+        word = word.strip("'")
+        if word.endswith("'s"):
+            word = word[:-2]
+        if len(word) > 1:
+            terms.append(word)
+    return terms
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Merge ranked id lists: each list adds 1 / (k + rank) to an id's score"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed set of documents, stored as compact postings.
+
+    Postings are CSR-style: one int32 array of document numbers and one
+    float32 array of precomputed term weights, sliced per term through an
+    offsets array. The weight already includes BM25's length normalization,
+    so a query is one idf-scaled scatter-add per query term plus an
+    argpartition for the top k.
+
+    The words of a document's filename are counted title_weight extra
+    times, so "Char_Aeth_Lyssia.md" answers queries about Lyssia.
+    """
+
+    def __init__(self, ids: List[str], documents: List[str], metadatas: List[Dict],
+                 k1: float = 1.2, b: float = 0.75, title_weight: int = 2):
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self.metadatas = list(metadatas)
+        self.k1 = k1
+        self.b = b
+        self.built_at = time.time()
+
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = np.zeros(len(self.ids), dtype=np.float32)
+        for number, (document, metadata) in enumerate(zip(self.documents, self.metadatas)):
+            terms = lexical_terms(document)
+            filename = (metadata or {}).get("filename")
+            if filename:
+                terms += lexical_terms(Path(filename).stem) * title_weight
+            lengths[number] = len(terms)
+            for term, tf in Counter(terms).items():
+                postings.setdefault(term, []).append((number, tf))
+
+        average = float(lengths.mean()) if len(lengths) else 0.0
+        norms = k1 * (1 - b + b * lengths / average) if average else np.full(len(lengths), k1, dtype=np.float32)
+
+        self.vocabulary: Dict[str, int] = {}
+        self.offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+        self.idf = np.zeros(len(postings), dtype=np.float32)
+        total = sum(len(entries) for entries in postings.values())
+        self.postings_docs = np.empty(total, dtype=np.int32)
+        self.postings_weights = np.empty(total, dtype=np.float32)
+
+        position = 0
+        n_docs = len(self.ids)
+        for index, (term, entries) in enumerate(postings.items()):
+            self.vocabulary[term] = index
+            docs = np.fromiter((d for d, _ in entries), dtype=np.int32, count=len(entries))
+            tfs = np.fromiter((tf for _, tf in entries), dtype=np.float32, count=len(entries))
+            end = position + len(entries)
+            self.postings_docs[position:end] = docs
+            self.postings_weights[position:end] = tfs * (k1 + 1) / (tfs + norms[docs])
+            self.offsets[index + 1] = end
+            self.idf[index] = math.log(1 + (n_docs - len(entries) + 0.5) / (len(entries) + 0.5))
+            position = end
+
+    @classmethod
+    def from_collection(cls, collection, page_size: int = 1000, **options) -> "BM25Index":
+        """Build from every document in a Chroma collection"""
+        ids, documents, metadatas = [], [], []
+        offset = 0
+        while True:
+            page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            ids += page["ids"]
+            documents += page["documents"]
+            metadatas += page["metadatas"]
+            if len(page["ids"]) < page_size:
+                break
+            offset += page_size
+        return cls(ids, documents, metadatas, **options)
+
+    def search(self, text: str, n_results: int) -> List[Tuple[int, float]]:
+        """(document number, score) of the best matches, best first"""
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        matched = False
+        for term in set(lexical_terms(text)):
+            index = self.vocabulary.get(term)
+            if index is None:
+                continue
+            start, end = self.offsets[index], self.offsets[index + 1]
+            # A term occurs once per document in its postings, so plain fancy-index add is safe
+            scores[self.postings_docs[start:end]] += self.idf[index] * self.postings_weights[start:end]
+            matched = True
+        if not matched:
+            return []
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > n_results:
+            candidates = candidates[np.argpartition(-scores[candidates], n_results - 1)[:n_results]]
+        best = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(number), float(scores[number])) for number in best]
+
+    def stats(self) -> Dict:
+        arrays = (self.offsets, self.idf, self.postings_docs, self.postings_weights)
+        return {
+            "documents": len(self.ids),
+            "terms": len(self.vocabulary),
+            "postings": int(len(self.postings_docs)),
+            "postings_bytes": int(sum(a.nbytes for a in arrays))
+        }
+
+
+class HybridRetriever:
+    """
+    Fuses vector results with BM25 results by reciprocal rank.
+
+    The BM25 index is built from the collection and rebuilt when version()
+    changes (LoreIndexer bumps it on every sync that changes the
+    collection). One caller rebuilds while the others keep using the
+    previous index, so a sync never blocks a turn on the rebuild.
+
+    Fused results have Chroma's query() shape without distances, which
+    have no meaning for a fused ranking; consumers fall back to rank order.
+    """
+
+    def __init__(self, collection, rrf_k: int = 60, lexical_results: Optional[int] = None,
+                 version: Optional[Callable[[], int]] = None, index: Optional[BM25Index] = None):
+        self.collection = collection
+        self.rrf_k = rrf_k
+        self.lexical_results = lexical_results  # None = as many as the caller asks for
+        self.version = version or (lambda: 0)
+        self.index = index
+        self.index_version = self.version() if index is not None else None
+        self.rebuilds = 0
+        self.last_build_seconds = None
+        self._rebuild_lock = threading.Lock()
+
+    def refresh(self, force: bool = False):
+        """Rebuild the BM25 index if the collection changed (blocking)"""
+        version = self.version()
+        if not force and self.index is not None and version == self.index_version:
+            return
+        # Whoever gets the lock rebuilds; with an index in hand, others don't wait
+        if not self._rebuild_lock.acquire(blocking=self.index is None):
+            return
+        try:
+            if not force and self.index is not None and self.version() == self.index_version:
+                return
+            start = time.perf_counter()
+            self.index = BM25Index.from_collection(self.collection)
+            self.index_version = version
+            self.last_build_seconds = round(time.perf_counter() - start, 3)
+            self.rebuilds += 1
+        finally:
+            self._rebuild_lock.release()
+
+    def fuse(self, text: str, vector_results: Dict, n_results: int) -> Dict:
+        """Combine one query's vector results with a BM25 search (blocking)"""
+        self.refresh()
+        entries: Dict[str, Tuple[str, Dict]] = {}
+
+        vector_ids = vector_results["ids"][0]
+        for doc_id, document, metadata in zip(vector_ids, vector_results["documents"][0],
+                                              vector_results["metadatas"][0]):
+            entries[doc_id] = (document, metadata)
+
+        lexical_ids = []
+        for number, _ in self.index.search(text, self.lexical_results or n_results):
+            doc_id = self.index.ids[number]
+            lexical_ids.append(doc_id)
+            entries.setdefault(doc_id, (self.index.documents[number], self.index.metadatas[number]))
+
+        fused = reciprocal_rank_fusion([vector_ids, lexical_ids], self.rrf_k)[:n_results]
+        return {
+            "ids": [[doc_id for doc_id, _ in fused]],
+            "documents": [[entries[doc_id][0] for doc_id, _ in fused]],
+            "metadatas": [[entries[doc_id][1] for doc_id, _ in fused]],
+            "distances": None,
+            "scores": [[score for _, score in fused]]
+        }
+
+    def stats(self) -> Dict:
+        return {
+            "rrf_k": self.rrf_k,
+            "index_version": self.index_version,
+            "rebuilds": self.rebuilds,
+            "last_build_seconds": self.last_build_seconds,
+            **(self.index.stats() if self.index is not None else {})
+        }
@@ -0,0 +1,281 @@
+"""
+DOAMMO LLM Cassettes
+Record LLM responses (with timings) to a local file and replay them without calling the provider
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+CASSETTE_MODES = ("off", "record", "replay")
+
+
+class CassetteMiss(LookupError):
+    """Replay mode was asked for a prompt that was never recorded"""
+
+    def __init__(self, namespace: str, key: str):
+        super().__init__(f"No recorded '{namespace}' response for prompt {key[:12]} - record it first")
+        self.namespace = namespace
+        self.key = key
+
+
+def _prompt_text(prompt) -> str:
+    if isinstance(prompt, str):
+        return prompt
+    # A message list
+    return "\n".join(f"{getattr(m, 'type', '')}: {getattr(m, 'content', m)}" for m in prompt)
+
+
+class Cassette:
+    """
+    Prompt-hash -> response store with record and replay modes.
+
+    Entries are appended to a JSONL file (later entries win), so recording
+    sessions can be interrupted and resumed and the file diffs cleanly.
+    Each entry keeps the call's latency and time to first token; replay
+    waits that long times latency_scale (0 = instant).
+    """
+
+    def __init__(self, path: str, mode: str = "replay", latency_scale: float = 1.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Cassette mode must be 'record' or 'replay', got '{mode}'")
+        if latency_scale < 0:
+            raise ValueError("latency_scale cannot be negative")
+
+        self.path = Path(path)
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.entries: Dict[str, dict] = {}
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> Optional["Cassette"]:
+        """Build from .env settings; None when LLM_CASSETTE is off (the default)"""
+        mode = settings.get('LLM_CASSETTE', "off").lower()
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"LLM_CASSETTE must be one of {CASSETTE_MODES}, got '{mode}'")
+        if mode == "off":
+            return None
+        return cls(
+            settings.get('LLM_CASSETTE_PATH', "cassettes/llm_calls.jsonl"),
+            mode,
+            latency_scale=float(settings.get('LLM_CASSETTE_LATENCY_SCALE', 1.0))
+        )
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.entries[entry['key']] = entry
+
+    @staticmethod
+    def key(namespace: str, payload: str) -> str:
+        return hashlib.sha256(f"{namespace}\n{payload}".encode('utf-8')).hexdigest()
+
+    def lookup(self, namespace: str, key: str) -> dict:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            raise CassetteMiss(namespace, key)
+        self.hits += 1
+        return entry
+
+    def record(self, namespace: str, key: str, text: str, latency: float,
+               first_token: Optional[float] = None) -> dict:
+        entry = {
+            'key': key,
+            'namespace': namespace,
+            'text': text,
+            'latency_seconds': round(latency, 4),
+            'first_token_seconds': round(first_token, 4) if first_token is not None else None,
+            'recorded_at': datetime.now().isoformat()
+        }
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.entries[key] = entry
+            self.recorded += 1
+        return entry
+
+    def delays(self, entry: dict):
+        """(seconds before the first token, seconds for the rest) for a replayed entry"""
+        total = entry['latency_seconds'] * self.latency_scale
+        first = entry.get('first_token_seconds')
+        first = total if first is None else min(first * self.latency_scale, total)
+        return first, total - first
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "path": str(self.path),
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "recorded": self.recorded,
+            "latency_scale": self.latency_scale
+        }
+
+    def wrap(self, llm, namespace: str) -> "CassetteLLM":
+        return CassetteLLM(llm, self, namespace)
+
+    def wrap_anthropic(self, client) -> "CassetteAnthropic":
+        return CassetteAnthropic(client, self)
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Chat model that answers from a Cassette.
+
+    It is a real LangChain chat model, so replayed tokens go through the
+    normal callbacks, and LangGraph's "messages" stream mode (SSE) sees them
+    like live ones. Callers pass cassette_key and namespace as call kwargs.
+    """
+
+    cassette: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette-replay"
+
+    def _entry(self, kwargs) -> dict:
+        return self.cassette.lookup(kwargs["namespace"], kwargs["cassette_key"])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        entry = self._entry(kwargs)
+        time.sleep(sum(self.cassette.delays(entry)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=entry['text']))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        entry = self._entry(kwargs)
+        await asyncio.sleep(sum(self.cassette.delays(entry)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=entry['text']))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        entry = self._entry(kwargs)
+        first, rest = self.cassette.delays(entry)
+        await asyncio.sleep(first)
+        words = entry['text'].split(" ")
+        for i, word in enumerate(words):
+            if i and rest:
+                await asyncio.sleep(rest / len(words))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+
+
+class CassetteLLM:
+    """
+    Wraps a LangChain chat model (invoke, ainvoke, astream) with a Cassette.
+
+    Record mode calls the real model and saves what it returned; replay
+    mode never touches it. namespace separates backends, so one prompt
+    recorded against Claude and against LM Studio gives two entries.
+    """
+
+    def __init__(self, llm, cassette: Cassette, namespace: str):
+        self.llm = llm
+        self.cassette = cassette
+        self.namespace = namespace
+        self._replay = ReplayChatModel(cassette=cassette)
+
+    def _replay_kwargs(self, prompt) -> dict:
+        return {"namespace": self.namespace,
+                "cassette_key": self.cassette.key(self.namespace, _prompt_text(prompt))}
+
+    def invoke(self, prompt, *args, **kwargs):
+        if self.cassette.mode == "replay":
+            return self._replay.invoke(prompt, **self._replay_kwargs(prompt))
+
+        start = time.perf_counter()
+        response = self.llm.invoke(prompt, *args, **kwargs)
+        self._save(prompt, response.content, time.perf_counter() - start)
+        return response
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        if self.cassette.mode == "replay":
+            return await self._replay.ainvoke(prompt, **self._replay_kwargs(prompt))
+
+        start = time.perf_counter()
+        response = await self.llm.ainvoke(prompt, *args, **kwargs)
+        self._save(prompt, response.content, time.perf_counter() - start)
+        return response
+
+    async def astream(self, prompt, *args, **kwargs):
+        if self.cassette.mode == "replay":
+            async for chunk in self._replay.astream(prompt, **self._replay_kwargs(prompt)):
+                yield chunk
+            return
+
+        start = time.perf_counter()
+        first_token = None
+        message = None
+        async for chunk in self.llm.astream(prompt, *args, **kwargs):
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            message = chunk if message is None else message + chunk
+            yield chunk
+        text = message.text if message is not None else ""
+        self._save(prompt, text, time.perf_counter() - start, first_token)
+
+    def _save(self, prompt, text, latency: float, first_token: Optional[float] = None):
+        if not isinstance(text, str):
+            text = AIMessage(content=text).text
+        key = self.cassette.key(self.namespace, _prompt_text(prompt))
+        self.cassette.record(self.namespace, key, text, latency, first_token)
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+
+class CassetteAnthropic:
+    """
+    Wraps an anthropic.Anthropic client's messages.create with a Cassette
+    (for interactive_narrative.py, which uses the SDK directly). Replayed
+    responses expose .content[0].text like the SDK's Message.
+    """
+
+    namespace = "anthropic"
+
+    def __init__(self, client, cassette: Cassette):
+        self.client = client
+        self.cassette = cassette
+        self.messages = SimpleNamespace(create=self._create)
+
+    def _create(self, **kwargs):
+        payload = json.dumps(
+            {k: kwargs.get(k) for k in ("model", "system", "messages", "max_tokens")},
+            sort_keys=True, ensure_ascii=False
+        )
+        key = self.cassette.key(self.namespace, payload)
+        if self.cassette.mode == "replay":
+            entry = self.cassette.lookup(self.namespace, key)
+            time.sleep(sum(self.cassette.delays(entry)))
+            return SimpleNamespace(
+                content=[SimpleNamespace(type="text", text=entry['text'])],
+                model=kwargs.get("model"), stop_reason="end_turn"
+            )
+
+        start = time.perf_counter()
+        message = self.client.messages.create(**kwargs)
+        text = "".join(block.text for block in message.content if block.type == "text")
+        self.cassette.record(self.namespace, key, text, time.perf_counter() - start)
+        return message
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
@@ -0,0 +1,129 @@
+"""
+DOAMMO LLM Concurrency Limiter
+Bounds simultaneous calls per LLM backend and rejects work when the wait queue is full
+"""
+
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
+
+
+class BackendSaturated(Exception):
+    """Raised when a backend's wait queue is full; carries a Retry-After hint in seconds"""
+
+    def __init__(self, backend: str, retry_after: int):
+        super().__init__(f"LLM backend '{backend}' is at capacity, retry in {retry_after}s")
+        self.backend = backend
+        self.retry_after = retry_after
+
+
+class BackendLimiter:
+    """
+    Concurrency limit plus bounded wait queue for one LLM backend.
+
+    Up to max_concurrency calls run at once, up to max_queue more wait for a
+    slot, and anything beyond that fails immediately with BackendSaturated
+    instead of piling up behind a rate-limited or overloaded provider.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if max_queue < 0:
+            raise ValueError("max_queue cannot be negative")
+
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        self.in_flight = 0
+        self.queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.avg_call_seconds = 0.0  # Exponentially weighted, drives Retry-After
+
+    def is_saturated(self) -> bool:
+        """True if a new call would be rejected right now"""
+        return self.in_flight >= self.max_concurrency and self.queued >= self.max_queue
+
+    def retry_after(self) -> int:
+        """Rough seconds until a queue slot frees up"""
+        waves = (self.queued + 1) / self.max_concurrency
+        return max(1, math.ceil(self.avg_call_seconds * waves))
+
+    def admit(self):
+        """Fail fast with BackendSaturated before starting work that needs this backend"""
+        if self.is_saturated():
+            self.rejected += 1
+            raise BackendSaturated(self.name, self.retry_after())
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of the backend's call slots for the duration of the block"""
+        self.admit()
+
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            yield
+            self.completed += 1
+        except BaseException:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            elapsed = time.perf_counter() - start
+            if self.avg_call_seconds:
+                self.avg_call_seconds = 0.8 * self.avg_call_seconds + 0.2 * elapsed
+            else:
+                self.avg_call_seconds = elapsed
+
+    def stats(self) -> Dict:
+        """Gauges and counters for diagnostics"""
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_call_seconds": round(self.avg_call_seconds, 3)
+        }
+
+
+class LimitedLLM:
+    """
+    Wraps a LangChain chat model so every call goes through a BackendLimiter.
+
+    ainvoke and astream are limited (that's what the agents use); other
+    attributes are passed through to the wrapped model.
+    """
+
+    def __init__(self, llm, limiter: BackendLimiter):
+        self.llm = llm
+        self.limiter = limiter
+
+    async def ainvoke(self, *args, **kwargs):
+        async with self.limiter.slot():
+            return await self.llm.ainvoke(*args, **kwargs)
+
+    async def astream(self, *args, **kwargs):
+        # The slot is held until the stream ends (or is cancelled)
+        async with self.limiter.slot():
+            async for chunk in self.llm.astream(*args, **kwargs):
+                yield chunk
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
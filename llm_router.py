@@ -0,0 +1,409 @@
+"""
+DOAMMO LLM Router
+Picks an LLM backend per turn from rolling latency/error stats, health probes and a routing policy
+"""
+
+import asyncio
+import time
+from collections import deque
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from context_packer import estimate_tokens
+from metrics import LLM_CALLS, LLM_PROMPT_TOKENS, LLM_RESPONSE_TOKENS
+
+ROUTING_POLICIES = ("claude", "prefer_local", "cheapest", "fastest")
+
+
+def route_override(user_input: str) -> Optional[str]:
+    """
+    Explicit backend chosen by the player, if any.
+
+    Rule: a message starting with 'lmstudio' (case-insensitive) always goes
+    to LM Studio, whatever the policy or health stats say.
+    """
+    if user_input.strip().lower().startswith("lmstudio"):
+        return "lmstudio"
+    return None
+
+
+def _percentile(samples, pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class BackendStats:
+    """Rolling latency and error tracking for one backend"""
+
+    def __init__(self, name: str, window: int = 50, failure_threshold: int = 3,
+                 cooldown_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._latencies = deque(maxlen=window)
+        self._first_tokens = deque(maxlen=window)  # Streaming time-to-first-token
+        self._outcomes = deque(maxlen=window)  # True = success
+        self.calls = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.last_failure = 0.0
+        # Active health probe result (None = never probed)
+        self.probe_ok: Optional[bool] = None
+        self.last_probe: Optional[str] = None
+        self.last_probe_error: Optional[str] = None
+
+    def record(self, seconds: float, ok: bool):
+        self.calls += 1
+        self._outcomes.append(ok)
+        if ok:
+            self._latencies.append(seconds)
+            self.consecutive_failures = 0
+        else:
+            self.errors += 1
+            self.consecutive_failures += 1
+            self.last_failure = time.monotonic()
+
+    def record_first_token(self, seconds: float):
+        self._first_tokens.append(seconds)
+
+    def record_probe(self, ok: bool, error: Optional[str] = None):
+        self.probe_ok = ok
+        self.last_probe = datetime.now().isoformat()
+        self.last_probe_error = error
+        if ok:
+            # A passing probe ends any failure cooldown early
+            self.consecutive_failures = 0
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Full-call latency percentile (None until there are samples)"""
+        return _percentile(self._latencies, pct)
+
+    def first_token_percentile(self, pct: float) -> Optional[float]:
+        """Time-to-first-token percentile for streamed calls"""
+        return _percentile(self._first_tokens, pct)
+
+    def error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return 1 - sum(self._outcomes) / len(self._outcomes)
+
+    def is_healthy(self) -> bool:
+        """Probe passing (or never probed) and not in a failure cooldown"""
+        if self.probe_ok is False:
+            return False
+        if self.consecutive_failures >= self.failure_threshold:
+            return time.monotonic() - self.last_failure > self.cooldown_seconds
+        return True
+
+    def snapshot(self) -> Dict:
+        p50 = self.percentile(50)
+        p95 = self.percentile(95)
+        ttft_p95 = self.first_token_percentile(95)
+        return {
+            "healthy": self.is_healthy(),
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": round(self.error_rate(), 3),
+            "consecutive_failures": self.consecutive_failures,
+            "p50_seconds": round(p50, 3) if p50 is not None else None,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+            "first_token_p95_seconds": round(ttft_p95, 3) if ttft_p95 is not None else None,
+            "probe_ok": self.probe_ok,
+            "last_probe": self.last_probe,
+            "last_probe_error": self.last_probe_error
+        }
+
+
+def _prompt_text(prompt) -> str:
+    if isinstance(prompt, str):
+        return prompt
+    # A message list
+    return "\n".join(str(getattr(m, "content", m)) for m in prompt)
+
+
+class TrackedLLM:
+    """
+    Wraps a chat model so each call's latency and outcome land in
+    BackendStats, and call counts and prompt/response sizes are exported
+    as metrics. clock is the latency timer (a fake one in tests).
+    """
+
+    def __init__(self, llm, stats: BackendStats, clock: Callable[[], float] = time.perf_counter):
+        self.llm = llm
+        self.stats = stats
+        self.clock = clock
+
+    def _observe_prompt(self, prompt):
+        LLM_PROMPT_TOKENS.observe(estimate_tokens(_prompt_text(prompt)), backend=self.stats.name)
+
+    def _finish(self, outcome: str, seconds: float, response_text: str = ""):
+        LLM_CALLS.inc(backend=self.stats.name, outcome=outcome)
+        if outcome == "cancelled":
+            return
+        self.stats.record(seconds, ok=outcome == "ok")
+        if outcome == "ok":
+            LLM_RESPONSE_TOKENS.observe(estimate_tokens(response_text), backend=self.stats.name)
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        self._observe_prompt(prompt)
+        start = self.clock()
+        try:
+            response = await self.llm.ainvoke(prompt, *args, **kwargs)
+        except asyncio.CancelledError:
+            self._finish("cancelled", self.clock() - start)
+            raise
+        except Exception:
+            self._finish("error", self.clock() - start)
+            raise
+        self._finish("ok", self.clock() - start, str(getattr(response, "content", response)))
+        return response
+
+    async def astream(self, prompt, *args, **kwargs):
+        self._observe_prompt(prompt)
+        start = self.clock()
+        first = True
+        text = []
+        try:
+            async for chunk in self.llm.astream(prompt, *args, **kwargs):
+                if first:
+                    self.stats.record_first_token(self.clock() - start)
+                    first = False
+                text.append(str(getattr(chunk, "text", chunk)))
+                yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            self._finish("cancelled", self.clock() - start)
+            raise
+        except Exception:
+            self._finish("error", self.clock() - start)
+            raise
+        self._finish("ok", self.clock() - start, "".join(text))
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+
+class LLMRouter:
+    """
+    Chooses which backend serves a turn.
+
+    Policies:
+    - claude: always Claude (only the 'lmstudio' prefix overrides)
+    - prefer_local: LM Studio while it is healthy, otherwise Claude
+    - cheapest: lowest cost rank among healthy backends
+    - fastest: lowest rolling p50 latency among healthy backends
+      (backends without samples yet are tried first)
+
+    Backends whose limiter queue is full are skipped when another is free.
+    """
+
+    def __init__(self, policy: str = "claude", fallback: str = "claude",
+                 limiters: Optional[Dict] = None, decision_log: int = 50):
+        if policy not in ROUTING_POLICIES:
+            raise ValueError(f"Routing policy must be one of {ROUTING_POLICIES}, got '{policy}'")
+        self.policy = policy
+        self.fallback = fallback
+        self.limiters = limiters or {}
+        self.stats: Dict[str, BackendStats] = {}
+        self.cost_rank: Dict[str, int] = {}
+        self.local: Dict[str, bool] = {}
+        self.decisions = deque(maxlen=decision_log)
+        self._probe_tasks: List[asyncio.Task] = []
+
+    def add_backend(self, name: str, cost_rank: int, local: bool = False) -> BackendStats:
+        self.stats[name] = BackendStats(name)
+        self.cost_rank[name] = cost_rank
+        self.local[name] = local
+        return self.stats[name]
+
+    def _available(self, name: str) -> bool:
+        limiter = self.limiters.get(name)
+        return self.stats[name].is_healthy() and not (limiter and limiter.is_saturated())
+
+    def _rank(self, candidates: List[str]) -> List[str]:
+        if self.policy == "claude":
+            return [n for n in candidates if n == "claude"]
+        if self.policy == "prefer_local":
+            return sorted(candidates, key=lambda n: (not self.local[n], self.cost_rank[n]))
+        if self.policy == "cheapest":
+            return sorted(candidates, key=lambda n: self.cost_rank[n])
+        # fastest
+        return sorted(candidates, key=lambda n: self.stats[n].percentile(50) or 0.0)
+
+    def choose(self, user_input: str, session_id: Optional[str] = None) -> str:
+        """Pick the backend for a turn and log the decision"""
+        override = route_override(user_input)
+        if override and override in self.stats:
+            return self._decide(override, "explicit prefix", session_id)
+
+        ranked = self._rank(list(self.stats))
+        for name in ranked:
+            if self._available(name):
+                reason = f"policy {self.policy}"
+                if name != ranked[0]:
+                    reason += f" ({ranked[0]} unavailable)"
+                return self._decide(name, reason, session_id)
+
+        return self._decide(self.fallback, "no healthy backend, using fallback", session_id)
+
+    def _decide(self, backend: str, reason: str, session_id: Optional[str]) -> str:
+        self.decisions.append({
+            "timestamp": datetime.now().isoformat(),
+            "session_id": session_id,
+            "backend": backend,
+            "reason": reason
+        })
+        return backend
+
+    # ------------------------------------------------------------------------
+    # Active health checks
+    # ------------------------------------------------------------------------
+
+    async def probe_once(self, name: str, probe: Callable[[], Awaitable[None]]):
+        """Run one probe; any exception marks the backend unhealthy"""
+        try:
+            await probe()
+            self.stats[name].record_probe(True)
+        except Exception as e:
+            self.stats[name].record_probe(False, str(e) or type(e).__name__)
+
+    def start_health_checks(self, name: str, probe: Callable[[], Awaitable[None]], interval: float):
+        """Probe a backend now and then every interval seconds until stop()"""
+        async def loop():
+            while True:
+                await self.probe_once(name, probe)
+                await asyncio.sleep(interval)
+
+        self._probe_tasks.append(asyncio.create_task(loop()))
+
+    def stop(self):
+        for task in self._probe_tasks:
+            task.cancel()
+        self._probe_tasks.clear()
+
+    def diagnostics(self) -> Dict:
+        return {
+            "policy": self.policy,
+            "fallback": self.fallback,
+            "backends": {name: stats.snapshot() for name, stats in self.stats.items()},
+            "recent_decisions": list(self.decisions)
+        }
+
+
+class HedgedCaller:
+    """
+    Per-turn deadline plus hedging between two backends.
+
+    The prompt goes to the primary backend first. If it hasn't produced a
+    token within its hedge delay (a percentile of its recent
+    time-to-first-token, clamped to [min_delay, deadline]), or fails before
+    streaming anything, the same prompt is fired at the secondary. The
+    first backend to produce a token wins - so streamed output never mixes
+    two backends - and the other call is cancelled. If nothing completes
+    within the deadline, asyncio.TimeoutError is raised.
+
+    Both calls run with their LangChain callbacks switched off, so a losing
+    backend's tokens can't reach a token stream before it is cancelled;
+    the winner's chunks, its first included, are handed to on_token.
+    """
+
+    def __init__(self, router: LLMRouter, llms: Dict, percentile: float = 95,
+                 min_delay: float = 1.0, default_delay: float = 8.0, deadline: float = 90.0):
+        self.router = router
+        self.llms = llms  # backend name -> streaming chat model
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.default_delay = default_delay
+        self.deadline = deadline
+        self.calls = 0
+        self.hedges_fired = 0
+        self.secondary_wins = 0
+        self.timeouts = 0
+
+    def hedge_delay(self, backend: str) -> float:
+        observed = self.router.stats[backend].first_token_percentile(self.percentile)
+        delay = observed if observed is not None else self.default_delay
+        return min(max(delay, self.min_delay), self.deadline)
+
+    def secondary_for(self, primary: str) -> Optional[str]:
+        """Healthy backend to hedge to, if any"""
+        for name in self.llms:
+            if name != primary and self.router._available(name):
+                return name
+        return None
+
+    async def call(self, prompt: str, primary: str, on_token: Optional[Callable[[str], None]] = None):
+        """
+        Returns (content, winning backend, whether a hedge was fired).
+        on_token receives the winner's text as it streams.
+        """
+        self.calls += 1
+        try:
+            return await asyncio.wait_for(self._race(prompt, primary, on_token), timeout=self.deadline)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise asyncio.TimeoutError(f"No LLM backend finished within {self.deadline:g}s") from None
+
+    async def _race(self, prompt: str, primary: str, on_token: Optional[Callable[[str], None]]):
+        tasks: Dict[str, asyncio.Task] = {}
+        winner = {"name": None}
+
+        async def stream(name: str) -> str:
+            message = None
+            # No callbacks: the turn's token stream only hears the winner, through on_token
+            async for chunk in self.llms[name].astream(prompt, config={"callbacks": []}):
+                if winner["name"] is None:
+                    # First token anywhere claims the turn; stop the other call
+                    winner["name"] = name
+                    for other, task in tasks.items():
+                        if other != name:
+                            task.cancel()
+                elif winner["name"] != name:
+                    return ""  # Lost the race; the cancellation is on its way
+                if on_token is not None and chunk.text:
+                    on_token(chunk.text)
+                message = chunk if message is None else message + chunk
+            return message.text if message is not None else ""
+
+        def start(name: str):
+            tasks[name] = asyncio.create_task(stream(name))
+
+        hedged = False
+        secondary = self.secondary_for(primary)
+        start(primary)
+        try:
+            done, _ = await asyncio.wait({tasks[primary]}, timeout=self.hedge_delay(primary))
+            primary_failed = bool(done) and tasks[primary].exception() is not None
+            if secondary and winner["name"] is None and (not done or primary_failed):
+                hedged = True
+                self.hedges_fired += 1
+                start(secondary)
+
+            pending = {t for t in tasks.values() if not t.done()}
+            while True:
+                for name, task in tasks.items():
+                    if task.done() and not task.cancelled() and task.exception() is None:
+                        if name != primary:
+                            self.secondary_wins += 1
+                        return task.result(), name, hedged
+                if not pending:
+                    # Everything failed: surface the primary's error
+                    failed = [t for t in tasks.values() if not t.cancelled()]
+                    raise failed[0].exception()
+                _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+    def snapshot(self) -> Dict:
+        return {
+            "percentile": self.percentile,
+            "deadline_seconds": self.deadline,
+            "hedge_delay_seconds": {name: round(self.hedge_delay(name), 3) for name in self.llms},
+            "calls": self.calls,
+            "hedges_fired": self.hedges_fired,
+            "secondary_wins": self.secondary_wins,
+            "timeouts": self.timeouts
+        }
@@ -0,0 +1,94 @@
+"""
+DOAMMO LLM Transport
+One pooled httpx client shared by every LLM client (keep-alive, optional HTTP/2, warm-up)
+"""
+
+import asyncio
+import importlib.util
+from functools import cached_property
+from typing import Any, Dict, List, Optional
+
+import anthropic
+import httpx
+from langchain_anthropic import ChatAnthropic
+from pydantic import Field
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (pip install httpx[http2])"""
+    return importlib.util.find_spec("h2") is not None
+
+
+def build_async_client(max_connections: int = 20, max_keepalive: int = 10,
+                       keepalive_expiry: float = 30.0, http2: Optional[bool] = None,
+                       connect_timeout: float = 10.0) -> httpx.AsyncClient:
+    """
+    Create the shared connection pool.
+
+    No base_url is set: the Anthropic and OpenAI SDKs send absolute URLs, so
+    one pool can serve every backend and keeps idle connections per host.
+
+    Args:
+        max_connections: Upper bound on open connections across all hosts
+        max_keepalive: Idle connections kept open for reuse
+        keepalive_expiry: Seconds an idle connection is kept
+        http2: Negotiate HTTP/2 (None = use it if h2 is installed)
+        connect_timeout: Seconds to establish a connection; reads use the
+            per-request timeouts set by the SDKs
+    """
+    if http2 is None:
+        http2 = http2_available()
+    elif http2 and not http2_available():
+        raise RuntimeError("HTTP/2 requested but the 'h2' package is not installed")
+
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        ),
+        timeout=httpx.Timeout(600.0, connect=connect_timeout)
+    )
+
+
+async def warm_up(client: httpx.AsyncClient, urls: List[str], connections: int = 2,
+                  timeout: float = 5.0) -> Dict[str, int]:
+    """
+    Open connections ahead of the first turn so it doesn't pay for DNS,
+    TCP and TLS setup.
+
+    Sends `connections` concurrent HEAD requests to each URL. Any HTTP
+    status counts as success, since only the connection matters.
+
+    Returns the number of successful requests per URL.
+    """
+    async def touch(url: str) -> bool:
+        try:
+            await client.head(url, timeout=timeout)
+            return True
+        except httpx.HTTPError:
+            return False
+
+    results = {}
+    for url in urls:
+        outcomes = await asyncio.gather(*[touch(url) for _ in range(connections)])
+        results[url] = sum(outcomes)
+    return results
+
+
+class PooledChatAnthropic(ChatAnthropic):
+    """
+    ChatAnthropic that sends async requests through a shared httpx client.
+
+    ChatAnthropic normally builds its own pool internally. ChatOpenAI
+    already accepts one through http_async_client.
+    """
+
+    http_async_client: Optional[Any] = Field(default=None, exclude=True)
+
+    @cached_property
+    def _async_client(self) -> anthropic.AsyncClient:
+        if self.http_async_client is None:
+            return super()._async_client
+        return anthropic.AsyncClient(**self._client_params, http_client=self.http_async_client)
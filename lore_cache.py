@@ -0,0 +1,169 @@
+"""
+DOAMMO Lore Cache
+Two-level LRU cache for lore retrieval: query text -> embedding, query -> top-k results
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from metrics import LORE_CACHE_LOOKUPS
+
+_SPACE_RE = re.compile(r"\s+")
+
+_MISSING = object()
+
+# Chroma query() keys that hold one entry per query
+_ROW_KEYS = ("ids", "documents", "metadatas", "distances", "embeddings", "uris", "data")
+
+
+def normalize_query(text: str) -> str:
+    """Case, whitespace and trailing punctuation don't change what a player asked for"""
+    return _SPACE_RE.sub(" ", text).strip().rstrip(".!?").strip().lower()
+
+
+def split_rows(results: Dict) -> List[Dict]:
+    """One single-query result per row of a batched Chroma query() result"""
+    rows = []
+    for row in range(len(results["ids"])):
+        single = dict(results)
+        for key in _ROW_KEYS:
+            if results.get(key) is not None:
+                single[key] = [results[key][row]]
+        rows.append(single)
+    return rows
+
+
+class LRUCache:
+    """Size-bounded mapping that evicts the least recently used entry"""
+
+    def __init__(self, name: str, maxsize: int):
+        if maxsize < 0:
+            raise ValueError("maxsize cannot be negative")
+        self.name = name
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        LORE_CACHE_LOOKUPS.inc(level=self.name, outcome="miss" if value is _MISSING else "hit")
+        return default if value is _MISSING else value
+
+    def put(self, key: Hashable, value: Any):
+        if self.maxsize == 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None
+        }
+
+
+class LoreQueryCache:
+    """
+    Caches a Chroma collection's query path for repeated player inputs.
+
+    Level 1 maps normalized query text to its embedding, so a repeated
+    phrase is never embedded twice. Level 2 maps (query, n_results) to the
+    query's results. Results are also keyed by the collection version
+    (bumped by LoreIndexer whenever a sync writes or deletes vectors), so
+    ingestion makes every cached result stale at once; stale entries are
+    never served and age out through LRU eviction. Embeddings only depend
+    on the embedding model, so they survive content updates and are
+    dropped only by clear().
+
+    The cached results are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, embedding_size: int = 1024, result_size: int = 256,
+                 version: Optional[Callable[[], int]] = None):
+        self.embeddings = LRUCache("embedding", embedding_size)
+        self.results = LRUCache("result", result_size)
+        self.version = version or (lambda: 0)
+
+    def _result_key(self, text: str, n_results: int) -> tuple:
+        return (self.version(), normalize_query(text), n_results)
+
+    def cached(self, text: str, n_results: int) -> Optional[Dict]:
+        """Results for the query if cached (cheap: safe to call on the event loop)"""
+        return self.results.get(self._result_key(text, n_results))
+
+    def fetch(self, collection, text: str, n_results: int) -> Dict:
+        """
+        Query the collection after a result miss and cache the results
+        (blocking: embeds the text unless level 1 has it, then searches).
+        """
+        return self.fetch_many(collection, [text], n_results)[0]
+
+    def fetch_many(self, collection, texts: List[str], n_results: int) -> List[Dict]:
+        """
+        Like fetch() for several result misses at once: the texts level 1
+        doesn't have are embedded together and all are searched in one
+        batched query. Each row is cached as its own query's results.
+        """
+        keys = [self._result_key(text, n_results) for text in texts]
+        # Chroma's own query-embedding step (the one query_texts= goes through)
+        embed = getattr(collection, "_embed", None)
+        if embed is None:
+            # Nothing to embed with client-side: only results are cached
+            results = collection.query(query_texts=list(texts), n_results=n_results)
+        else:
+            normalized = [key[1] for key in keys]
+            embeddings = [self.embeddings.get(text) for text in normalized]
+            missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+            if missing:
+                for i, embedding in zip(missing, embed(input=[normalized[i] for i in missing], is_query=True)):
+                    embeddings[i] = embedding
+                    self.embeddings.put(normalized[i], embedding)
+            results = collection.query(query_embeddings=embeddings, n_results=n_results)
+
+        rows = split_rows(results) if len(texts) > 1 else [results]
+        for key, row in zip(keys, rows):
+            self.results.put(key, row)
+        return rows
+
+    def query(self, collection, text: str, n_results: int) -> Dict:
+        """Cached results, or fetch them"""
+        results = self.cached(text, n_results)
+        return results if results is not None else self.fetch(collection, text, n_results)
+
+    def clear(self):
+        self.embeddings.clear()
+        self.results.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "collection_version": self.version(),
+            "embedding": self.embeddings.stats(),
+            "result": self.results.stats()
+        }
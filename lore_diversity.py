@@ -0,0 +1,143 @@
+"""
+DOAMMO Lore Diversity
+Maximal marginal relevance reranking of retrieved lore chunks
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from vector_index import NumpyVectorIndex
+
+
+def relevance_scores(results: Dict, rrf_k: int = 60) -> np.ndarray:
+    """
+    How well each retrieved chunk matches, relative to the best one (= 1).
+
+    Uses the retrieval's own signal - fused scores, else distances
+    (weighted 1 / (1 + distance) like the packer does), else the rank as
+    reciprocal rank fusion would score it - rather than re-embedding the
+    player's input: with hybrid or multi-query retrieval the order
+    already reflects more than one query.
+    """
+    count = len(results["ids"][0])
+    if results.get("scores"):
+        values = np.asarray(results["scores"][0], dtype=np.float64)
+    elif results.get("distances"):
+        values = 1.0 / (1.0 + np.maximum(np.asarray(results["distances"][0], dtype=np.float64), 0.0))
+    else:
+        values = 1.0 / (rrf_k + 1 + np.arange(count, dtype=np.float64))
+    best = values.max() if count else 0.0
+    return values / best if best > 0 else np.ones(count)
+
+
+def mmr_select(relevance: np.ndarray, vectors: np.ndarray, k: int, lambda_mult: float = 0.5) -> List[int]:
+    """
+    Indices of k candidates picked by maximal marginal relevance.
+
+    Each step takes the candidate with the best
+    lambda * relevance - (1 - lambda) * (cosine similarity to the closest pick).
+    The pairwise similarities come from one matrix product; each step only
+    updates the running "closest pick" vector. Zero rows (no embedding)
+    count as similar to nothing.
+    """
+    count = len(relevance)
+    k = min(k, count)
+    if k <= 0:
+        return []
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = np.divide(vectors, norms, out=np.zeros_like(vectors, dtype=np.float32), where=norms > 0)
+    similarity = unit @ unit.T
+
+    gain = lambda_mult * relevance
+    penalty = 1.0 - lambda_mult
+    first = int(np.argmax(relevance))
+    selected = [first]
+    closest = similarity[first].copy()
+    available = np.ones(count, dtype=bool)
+    available[first] = False
+    for _ in range(k - 1):
+        scores = np.where(available, gain - penalty * closest, -np.inf)
+        pick = int(np.argmax(scores))
+        selected.append(pick)
+        available[pick] = False
+        np.maximum(closest, similarity[pick], out=closest)
+    return selected
+
+
+class MMRReranker:
+    """
+    Keeps k diverse chunks out of an over-fetched candidate set.
+
+    Retrieval fetches fetch_k candidates; their embeddings come back from
+    the collection in one get(include=["embeddings"]) and mmr_select()
+    keeps k of them. lambda_mult = 1 is plain relevance order, lower
+    values trade relevance for covering more distinct lore. Candidates the
+    collection doesn't hold (wiki pages, BM25-only hits from another
+    snapshot) have no vector and are never counted as duplicates. Given a
+    NumpyVectorIndex in place of the collection, the vectors come from its
+    in-memory (or memory-mapped) snapshot instead.
+    """
+
+    def __init__(self, collection, lambda_mult: float = 0.5, k: int = 8, fetch_k: int = 32):
+        self.collection = collection
+        self.lambda_mult = lambda_mult
+        self.k = k
+        self.fetch_k = max(fetch_k, k)
+        self.reranks = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def embeddings(self, ids: List[str]) -> Optional[np.ndarray]:
+        """float32 (len(ids), dim) matrix in ids order, zero rows for unknown ids"""
+        if isinstance(self.collection, NumpyVectorIndex):
+            return self.collection.embeddings(ids)
+        found = self.collection.get(ids=list(ids), include=["embeddings"])
+        if found["embeddings"] is None or not len(found["embeddings"]):
+            return None
+        stored = np.asarray(found["embeddings"], dtype=np.float32)
+        rows = {doc_id: row for row, doc_id in enumerate(found["ids"])}
+        vectors = np.zeros((len(ids), stored.shape[1]), dtype=np.float32)
+        for position, doc_id in enumerate(ids):
+            row = rows.get(doc_id)
+            if row is not None:
+                vectors[position] = stored[row]
+        return vectors
+
+    def rerank(self, results: Dict) -> Dict:
+        """Single-query results cut to k chunks in MMR order (blocking)"""
+        ids = results["ids"][0]
+        if len(ids) <= self.k:
+            return results
+
+        start = time.perf_counter()
+        vectors = self.embeddings(ids)
+        if vectors is None:
+            order = list(range(self.k))
+        else:
+            order = mmr_select(relevance_scores(results), vectors, self.k, self.lambda_mult)
+
+        reranked = {
+            "ids": [[ids[i] for i in order]],
+            "documents": [[results["documents"][0][i] for i in order]],
+            "metadatas": [[results["metadatas"][0][i] for i in order]],
+            "distances": [[results["distances"][0][i] for i in order]] if results.get("distances") else None
+        }
+        if results.get("scores"):
+            reranked["scores"] = [[results["scores"][0][i] for i in order]]
+        with self._lock:
+            self.reranks += 1
+            self.seconds += time.perf_counter() - start
+        return reranked
+
+    def stats(self) -> Dict:
+        return {
+            "lambda": self.lambda_mult,
+            "k": self.k,
+            "fetch_k": self.fetch_k,
+            "reranks": self.reranks,
+            "mean_ms": round(self.seconds / self.reranks * 1000, 3) if self.reranks else None
+        }
@@ -0,0 +1,706 @@
+"""
+DOAMMO Lore Ingestion
+Splits vault markdown into heading-aware overlapping chunks and indexes them in Chroma
+
+Run: python lore_ingest.py [--vault PATH] [--rebuild] [--workers N] [--no-vector-store]
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from context_packer import estimate_tokens, split_sentences
+
+_HEADING_LINE_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+
+COLLECTION_NAME = "doammo_lore"
+MANIFEST_NAME = "lore_manifest.json"
+MANIFEST_VERSION = 1
+
+# Syncs touching fewer files embed in-process: starting worker processes
+# (each loading the embedding model) costs more than it saves
+PARALLEL_MIN_FILES = 32
+
+
+def split_sections(text: str) -> List[Tuple[List[str], str, str]]:
+    """
+    Split markdown into sections on headings.
+
+    Returns (heading path, heading line, body) per section, where the path
+    holds the titles of the enclosing headings ("Lyssia", "Skyship"). Text
+    before the first heading has an empty path.
+    """
+    sections = []
+    stack: List[Tuple[int, str]] = []
+    heading_line = ""
+    body: List[str] = []
+
+    def flush():
+        if heading_line or "".join(body).strip():
+            sections.append(([title for _, title in stack], heading_line, "\n".join(body).strip()))
+
+    in_code = False
+    for line in text.splitlines():
+        if line.lstrip().startswith("```"):
+            in_code = not in_code
+        match = None if in_code else _HEADING_LINE_RE.match(line)
+        if not match:
+            body.append(line)
+            continue
+
+        flush()
+        level, title = len(match.group(1)), match.group(2)
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        stack.append((level, title))
+        heading_line = line.strip()
+        body = []
+    flush()
+    return sections
+
+
+def _pieces(body: str, max_tokens: int) -> List[str]:
+    """Paragraphs, with any paragraph over max_tokens broken into sentence groups"""
+    pieces = []
+    for paragraph in [p.strip() for p in re.split(r"\n\s*\n", body) if p.strip()]:
+        if estimate_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+            continue
+        group, used = [], 0
+        for sentence in split_sentences(paragraph):
+            cost = estimate_tokens(sentence)
+            if group and used + cost > max_tokens:
+                pieces.append(" ".join(group))
+                group, used = [], 0
+            group.append(sentence)
+            used += cost
+        if group:
+            pieces.append(" ".join(group))
+    return pieces
+
+
+def _tail(text: str, budget: int) -> str:
+    """Trailing whole sentences of text within budget (the overlap carried forward)"""
+    kept, used = [], 0
+    for sentence in reversed(split_sentences(text.replace("\n", " "))):
+        cost = estimate_tokens(sentence)
+        if used + cost > budget:
+            break
+        kept.append(sentence)
+        used += cost
+    return " ".join(reversed(kept))
+
+
+def chunk_markdown(text: str, relative_path: str, max_tokens: int = 220,
+                   overlap_tokens: int = 40) -> List[Dict]:
+    """
+    Chunk one markdown file for embedding.
+
+    Chunks never cross a section boundary. Within a section, paragraphs
+    are packed up to max_tokens, and each continuation chunk starts with
+    the last sentences (up to overlap_tokens) of the chunk before it. The
+    stored document is "<file title> > <section path>" followed by the
+    chunk text, so every embedding carries its context.
+
+    Returns [{"id", "document", "metadata"}] in file order.
+    """
+    filename = Path(relative_path).name
+    title = Path(relative_path).stem
+    chunks = []
+
+    for path, heading_line, body in split_sections(text):
+        breadcrumb = " > ".join([title] + [p for p in path if p != title])
+        # A heading with no text of its own (straight into a subheading)
+        # yields nothing; its title lives on in the subsections' breadcrumbs
+        pieces = _pieces(body, max_tokens)
+
+        current: List[str] = []
+        used = 0
+        overlap = ""
+        section_chunks = []
+
+        def emit():
+            body_text = "\n\n".join(current)
+            if overlap:
+                body_text = f"{overlap} {body_text}"
+            section_chunks.append((body_text, len(overlap) + 1 if overlap else 0))
+
+        for piece in pieces:
+            cost = estimate_tokens(piece)
+            if current and used + cost > max_tokens:
+                emit()
+                overlap = _tail(current[-1], overlap_tokens) if overlap_tokens else ""
+                current, used = [], estimate_tokens(overlap)
+            current.append(piece)
+            used += cost
+        if current:
+            emit()
+
+        for position, (body_text, overlap_chars) in enumerate(section_chunks):
+            index = len(chunks)
+            chunks.append({
+                "id": f"{relative_path}#{index}",
+                "document": f"{breadcrumb}\n\n{body_text}",
+                "metadata": {
+                    "filename": filename,
+                    "filepath": relative_path,
+                    "section": " > ".join(path),
+                    "heading": heading_line,
+                    "breadcrumb": breadcrumb,
+                    "chunk_index": index,
+                    "section_position": position,
+                    "overlap_chars": overlap_chars,
+                    "type": "lore_chunk"
+                }
+            })
+    return chunks
+
+
+def chunk_body(document: str, metadata: Dict) -> str:
+    """The chunk text without its breadcrumb prefix"""
+    prefix = f"{metadata['breadcrumb']}\n\n"
+    return document[len(prefix):] if document.startswith(prefix) else document
+
+
+def stitch_chunks(documents: List[str], metadatas: List[Dict],
+                  distances: Optional[List[float]] = None) -> Tuple[List[Tuple[str, str]], Optional[List[float]]]:
+    """
+    Group retrieved chunks per source file and stitch each file's chunks
+    back together in file order.
+
+    Adjacent chunks drop their repeated overlap, a section's heading is
+    written once before its first chunk, and gaps between non-adjacent
+    chunks are marked with "...". Whole-file documents (no chunk_index)
+    pass through unchanged.
+
+    Returns ([(filename, text)] ordered by best match, best distance per file).
+    """
+    groups: Dict[str, List[Tuple[Dict, str]]] = {}
+    best: Dict[str, float] = {}
+    order: List[str] = []
+    for i, (document, metadata) in enumerate(zip(documents, metadatas)):
+        filename = metadata["filename"]
+        if filename not in groups:
+            groups[filename] = []
+            order.append(filename)
+        groups[filename].append((metadata, document))
+        if distances is not None:
+            best[filename] = min(best.get(filename, distances[i]), distances[i])
+
+    if distances is not None:
+        order.sort(key=lambda f: best[f])
+
+    stitched = []
+    for filename in order:
+        items = groups[filename]
+        if "chunk_index" not in items[0][0]:
+            stitched.append((filename, "\n\n".join(document for _, document in items)))
+            continue
+
+        items.sort(key=lambda item: item[0]["chunk_index"])
+        parts = []
+        previous = None
+        for metadata, document in items:
+            body = chunk_body(document, metadata)
+            adjacent = previous is not None and metadata["chunk_index"] == previous["chunk_index"] + 1
+            same_section = previous is not None and metadata["section"] == previous["section"]
+
+            if adjacent and same_section and metadata["overlap_chars"]:
+                body = body[metadata["overlap_chars"]:]
+            if previous is not None and not adjacent:
+                parts.append("...")
+            if metadata["heading"] and (not same_section or not adjacent):
+                body = f"{metadata['heading']}\n{body}"
+            parts.append(body)
+            previous = metadata
+        stitched.append((filename, "\n\n".join(p for p in parts if p)))
+
+    return stitched, ([best[f] for f in order] if distances is not None else None)
+
+
+def find_lore_files(lore_dir: Path) -> List[Path]:
+    return sorted(p for p in lore_dir.rglob("*.md") if not any(part.startswith(".") for part in p.parts))
+
+
+def lore_relative_path(lore_dir: Path, path) -> Optional[str]:
+    """
+    Lore-relative path of a .md file inside lore_dir, else None. Relative
+    paths are taken from lore_dir and resolved first, so ".." can't escape.
+    """
+    root = Path(lore_dir).resolve()
+    try:
+        relative = (root / path).resolve().relative_to(root)
+    except ValueError:
+        return None
+    if relative.suffix != ".md" or any(part.startswith(".") for part in relative.parts):
+        return None
+    return relative.as_posix()
+
+
+def ingest_files(collection, lore_dir: Path, files: List[Path], max_tokens: int = 220,
+                 overlap_tokens: int = 40, batch_size: int = 128) -> int:
+    """Chunk and upsert the given files; returns the number of chunks written"""
+    written = 0
+    batch = []
+
+    def flush():
+        collection.upsert(
+            ids=[c["id"] for c in batch],
+            documents=[c["document"] for c in batch],
+            metadatas=[c["metadata"] for c in batch]
+        )
+
+    for path in files:
+        relative_path = path.relative_to(lore_dir).as_posix()
+        text = path.read_text(encoding="utf-8")
+        for chunk in chunk_markdown(text, relative_path, max_tokens, overlap_tokens):
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                flush()
+                written += len(batch)
+                batch = []
+    if batch:
+        flush()
+        written += len(batch)
+    return written
+
+
+def manifest_fingerprint(manifest: Dict) -> str:
+    """
+    Hash of what a manifest says the collection holds: the chunking and
+    each file's content hash and chunk count. Equal fingerprints mean an
+    export of the collection's vectors is still current.
+    """
+    # list() copies the entries in one step, so a sync in another thread can't break the iteration
+    files = sorted((path, entry.get("sha256"), entry.get("chunks")) for path, entry in list(manifest["files"].items()))
+    content = {"chunking": manifest.get("chunking"), "complete": bool(manifest.get("complete")), "files": files}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def read_manifest_fingerprint(manifest_path: Path) -> Optional[str]:
+    """Fingerprint of the manifest on disk, or None if there is none"""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return manifest_fingerprint(json.load(f))
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def chunk_ids(relative_path: str, start: int, stop: int) -> List[str]:
+    return [f"{relative_path}#{i}" for i in range(start, stop)]
+
+
+_worker_embedding_function = None
+
+
+def _init_embedding_worker(embedding_function):
+    global _worker_embedding_function
+    _worker_embedding_function = embedding_function
+
+
+def _embed_documents(documents: List[str]) -> np.ndarray:
+    return np.asarray(_worker_embedding_function(documents), dtype=np.float32)
+
+
+class ParallelEmbedder:
+    """
+    Embeds chunk batches in worker processes, one batch per task.
+
+    map() keeps at most two batches per worker in flight and yields them
+    back in submission order, so memory stays bounded however large the
+    vault is, and batches are written in the order they were read.
+    Workers are spawned (not forked) so they don't inherit the parent's
+    Chroma and ONNX threads.
+    """
+
+    def __init__(self, embedding_function, workers: int):
+        self.embedding_function = embedding_function
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> "ParallelEmbedder":
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_embedding_worker,
+            initargs=(self.embedding_function,)
+        )
+        return self
+
+    def __exit__(self, *exc_info):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def map(self, batches: Iterator[Dict]) -> Iterator[Tuple[Dict, np.ndarray]]:
+        """(batch, embeddings of its chunks) for each batch, in order"""
+        pending = deque()
+        for batch in batches:
+            documents = [chunk["document"] for chunk in batch["chunks"]]
+            pending.append((batch, self._pool.submit(_embed_documents, documents) if documents else None))
+            if len(pending) >= 2 * self.workers:
+                batch, future = pending.popleft()
+                yield batch, future.result() if future else None
+        while pending:
+            batch, future = pending.popleft()
+            yield batch, future.result() if future else None
+
+
+class LoreIndexer:
+    """
+    Keeps a Chroma collection in step with a lore folder, touching only
+    what changed.
+
+    A JSON manifest records each file's content hash, mtime, size and chunk
+    count. A sync re-embeds new and changed files and deletes the vectors
+    of removed files. A file whose mtime and size are unchanged is not read
+    at all. Updates are applied in place: a changed file's new chunks are
+    upserted before its leftover chunks are deleted, so queries running
+    meanwhile always find some version of every file.
+
+    A sync streams: files are read and chunked one at a time into batches
+    of batch_size chunks, which are embedded (across `workers` processes
+    for large syncs) and upserted as they come, so memory doesn't grow
+    with the vault. A file enters the manifest once its last chunk is
+    written, and the manifest is checkpointed every checkpoint_seconds,
+    so an interrupted sync resumes where it stopped.
+    """
+
+    def __init__(self, collection, lore_dir: Path, manifest_path: Path, max_tokens: int = 220,
+                 overlap_tokens: int = 40, batch_size: int = 128, workers: int = 1,
+                 checkpoint_seconds: float = 10.0, embedding_function=None):
+        self.collection = collection
+        self.lore_dir = Path(lore_dir)
+        self.manifest_path = Path(manifest_path)
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.batch_size = batch_size
+        self.workers = workers
+        self.checkpoint_seconds = checkpoint_seconds
+        # What the workers embed with (default: the collection's own function)
+        self.embedding_function = embedding_function or getattr(collection, "_embedding_function", None)
+        self.last_sync = None  # Report of the most recent sync
+        self.progress = None  # Progress of the sync in flight, if any
+        self.version = 0  # Bumped whenever a sync changes the collection (cache invalidation)
+        # Called with no arguments, on the syncing thread, after a sync changes the collection
+        self.sync_listeners: List[Callable[[], None]] = []
+        self._lock = threading.Lock()  # One sync at a time (CLI, endpoint or watcher)
+        self.manifest = self._load_manifest()
+
+    def _chunking(self) -> Dict:
+        return {"max_tokens": self.max_tokens, "overlap_tokens": self.overlap_tokens}
+
+    def _load_manifest(self) -> Dict:
+        empty = {"version": MANIFEST_VERSION, "chunking": self._chunking(), "files": {}, "complete": False}
+        if not self.manifest_path.exists():
+            return empty
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("chunking") != self._chunking():
+            # Different chunking means different chunks: every file must be redone,
+            # but the old chunk counts are still needed to delete leftovers
+            manifest["files"] = {path: dict(entry, sha256=None) for path, entry in manifest.get("files", {}).items()}
+            manifest.update(version=MANIFEST_VERSION, chunking=self._chunking())
+        return manifest
+
+    def _save_manifest(self):
+        self.manifest["updated"] = datetime.now().isoformat()
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so a crash never leaves a half-written manifest
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def fingerprint(self) -> str:
+        return manifest_fingerprint(self.manifest)
+
+    @staticmethod
+    def file_hash(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def check_paths(self, paths: List[str]) -> List[str]:
+        """Normalised lore-relative paths; ValueError for any outside the lore folder or not a .md file"""
+        checked = []
+        for path in paths:
+            relative_path = lore_relative_path(self.lore_dir, path) if isinstance(path, str) else None
+            if relative_path is None:
+                raise ValueError(f"Not a lore file inside {self.lore_dir}: {path!r}")
+            checked.append(relative_path)
+        return checked
+
+    def plan(self, paths: Optional[List[str]] = None) -> Dict[str, List[str]]:
+        """
+        Classify files as added, changed, removed or unchanged.
+
+        paths limits the check to those relative paths (e.g. ones a watcher
+        saw change); by default the whole lore folder is scanned.
+        """
+        known = self.manifest["files"]
+        if paths is None:
+            candidates = {p.relative_to(self.lore_dir).as_posix() for p in find_lore_files(self.lore_dir)}
+            candidates |= set(known)
+        else:
+            candidates = set(self.check_paths(paths))
+
+        plan = {"added": [], "changed": [], "removed": [], "unchanged": []}
+        for relative_path in sorted(candidates):
+            path = self.lore_dir / relative_path
+            entry = known.get(relative_path)
+            if not path.is_file():
+                if entry is not None:
+                    plan["removed"].append(relative_path)
+                continue
+            if entry is None:
+                plan["added"].append(relative_path)
+                continue
+            stat = path.stat()
+            if entry["sha256"] and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                plan["unchanged"].append(relative_path)
+            elif entry["sha256"] == self.file_hash(path.read_bytes()):
+                # Touched but identical: remember the new mtime, skip the embedding
+                entry["mtime"] = stat.st_mtime
+                plan["unchanged"].append(relative_path)
+            else:
+                plan["changed"].append(relative_path)
+        return plan
+
+    def _batches(self, relative_paths: List[str]) -> Iterator[Dict]:
+        """
+        Stream the files' chunks in batches of batch_size. Each batch also
+        lists the files whose last chunk it holds ("done"): their manifest
+        entries and the ids of chunks they no longer have.
+        """
+        known = self.manifest["files"]
+        batch = {"chunks": [], "done": []}
+        for relative_path in relative_paths:
+            path = self.lore_dir / relative_path
+            data = path.read_bytes()
+            stat = path.stat()
+            chunks = chunk_markdown(data.decode("utf-8"), relative_path, self.max_tokens, self.overlap_tokens)
+            for chunk in chunks:
+                # A full batch goes out once more chunks follow, so it still
+                # records the file its last chunk completed
+                if len(batch["chunks"]) >= self.batch_size:
+                    yield batch
+                    batch = {"chunks": [], "done": []}
+                batch["chunks"].append(chunk)
+            entry = {"sha256": self.file_hash(data), "mtime": stat.st_mtime, "size": stat.st_size,
+                     "chunks": len(chunks)}
+            previous = known.get(relative_path, {}).get("chunks", 0)
+            batch["done"].append((relative_path, entry, chunk_ids(relative_path, len(chunks), previous)))
+        if batch["chunks"] or batch["done"]:
+            yield batch
+
+    def _write(self, batch: Dict, embeddings: Optional[np.ndarray]):
+        """Upsert a batch, then drop the finished files' leftover chunks and record them"""
+        chunks = batch["chunks"]
+        if chunks:
+            self.collection.upsert(
+                ids=[c["id"] for c in chunks],
+                documents=[c["document"] for c in chunks],
+                metadatas=[c["metadata"] for c in chunks],
+                **({"embeddings": embeddings} if embeddings is not None else {})
+            )
+        # Only after the new chunks are in, drop the ones they replace
+        stale = [doc_id for _, _, ids in batch["done"] for doc_id in ids]
+        if stale:
+            self.collection.delete(ids=stale)
+        for relative_path, entry, _ in batch["done"]:
+            self.manifest["files"][relative_path] = entry
+
+    def sync(self, paths: Optional[List[str]] = None,
+             progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Bring the collection up to date and return a report of what was done.
+
+        progress, if given, is called after every written batch with the
+        files and chunks done so far and the throughput.
+        """
+        with self._lock:
+            start = time.perf_counter()
+            plan = self.plan(paths)
+            known = self.manifest["files"]
+            to_embed = plan["added"] + plan["changed"]
+            workers = self.workers if len(to_embed) >= PARALLEL_MIN_FILES and self.embedding_function else 1
+            written = 0
+            files_done = 0
+            last_checkpoint = time.monotonic()
+
+            try:
+                batches = self._batches(to_embed)
+                with (ParallelEmbedder(self.embedding_function, workers) if workers > 1 else nullcontext()) as embedder:
+                    # In-process, Chroma embeds each batch inside upsert()
+                    embedded = embedder.map(batches) if embedder else ((batch, None) for batch in batches)
+                    for batch, embeddings in embedded:
+                        self._write(batch, embeddings)
+                        written += len(batch["chunks"])
+                        files_done += len(batch["done"])
+                        elapsed = time.perf_counter() - start
+                        self.progress = {"files_done": files_done, "files_total": len(to_embed),
+                                         "chunks_written": written,
+                                         "chunks_per_second": round(written / elapsed, 1) if elapsed else None}
+                        if progress:
+                            progress(self.progress)
+                        if time.monotonic() - last_checkpoint >= self.checkpoint_seconds:
+                            self._save_manifest()
+                            last_checkpoint = time.monotonic()
+
+                removed = [doc_id for relative_path in plan["removed"]
+                           for doc_id in chunk_ids(relative_path, 0, known[relative_path]["chunks"])]
+                for i in range(0, len(removed), self.batch_size):
+                    self.collection.delete(ids=removed[i:i + self.batch_size])
+                for relative_path in plan["removed"]:
+                    del known[relative_path]
+            finally:
+                # Interrupted or not, keep every file that was fully written
+                self.progress = None
+                self._save_manifest()
+
+            # The first full sync adopts whatever an older setup script left in
+            # the collection (e.g. one document per file) and removes it
+            adopted = 0
+            if paths is None and not self.manifest.get("complete"):
+                wanted = {i for p, entry in known.items() for i in chunk_ids(p, 0, entry["chunks"])}
+                leftovers = [i for i in self.collection.get(include=[])["ids"] if i not in wanted]
+                for i in range(0, len(leftovers), self.batch_size):
+                    self.collection.delete(ids=leftovers[i:i + self.batch_size])
+                adopted = len(leftovers)
+                self.manifest["complete"] = True
+                self._save_manifest()
+
+            changed = bool(written or plan["removed"] or plan["changed"] or adopted)
+            if changed:
+                self.version += 1
+            seconds = time.perf_counter() - start
+            self.last_sync = {
+                "added": len(plan["added"]),
+                "changed": len(plan["changed"]),
+                "removed": len(plan["removed"]),
+                "unchanged": len(plan["unchanged"]),
+                "chunks_written": written,
+                "leftovers_removed": adopted,
+                "workers": workers,
+                "seconds": round(seconds, 3),
+                "chunks_per_second": round(written / seconds, 1) if written and seconds else None,
+                "finished": datetime.now().isoformat()
+            }
+            if changed:
+                for listener in self.sync_listeners:
+                    listener()
+            return self.last_sync
+
+    def status(self) -> Dict:
+        return {
+            "lore_dir": str(self.lore_dir),
+            "files": len(self.manifest["files"]),
+            "chunks": sum(entry["chunks"] for entry in self.manifest["files"].values()),
+            "syncing": self.progress,
+            "last_sync": self.last_sync
+        }
+
+
+def open_collection(client, collection_name: str = COLLECTION_NAME):
+    return client.get_or_create_collection(
+        name=collection_name,
+        metadata={"description": "DOAMMO universe lore, chunked by heading"}
+    )
+
+
+def main():
+    import chromadb
+    from chromadb.config import Settings
+
+    settings = {}
+    if os.path.exists(".env"):
+        with open(".env", 'r') as f:
+            for line in f:
+                line = line.strip()
+                if '=' in line and not line.startswith('#'):
+                    key, value = line.split('=', 1)
+                    settings[key.strip()] = value.strip()
+
+    parser = argparse.ArgumentParser(description="Chunk and index the lore vault into ChromaDB")
+    parser.add_argument("--vault", default=settings.get('VAULT_PATH'), help="Vault root (default: VAULT_PATH)")
+    parser.add_argument("--lore-dir", default=settings.get('LORE_DIR', "_Lore"), help="Lore folder inside the vault")
+    parser.add_argument("--chroma", default=settings.get('CHROMA_PATH', "chroma_data"))
+    parser.add_argument("--max-tokens", type=int, default=220, help="Target chunk size (estimated tokens)")
+    parser.add_argument("--overlap-tokens", type=int, default=40, help="Overlap carried between chunks")
+    parser.add_argument("--rebuild", action="store_true", help="Drop the collection and re-embed everything")
+    parser.add_argument("--workers", type=int, default=int(settings.get('LORE_INGEST_WORKERS', 1)),
+                        help="Embedding processes for large syncs (default: LORE_INGEST_WORKERS or 1)")
+    parser.add_argument("--batch-size", type=int, default=512, help="Chunks embedded and upserted per batch")
+    parser.add_argument("--no-vector-store", action="store_true",
+                        help="Don't export the memory-mapped vector store the CLIs and LORE_VECTOR_STORE load")
+    parser.add_argument("--api", metavar="URL",
+                        help="Ask a running api_server (e.g. http://localhost:8000) to sync instead")
+    args = parser.parse_args()
+
+    if args.api:
+        # The server owns the Chroma files while it runs; let it apply the update
+        import httpx
+        response = httpx.post(f"{args.api.rstrip('/')}/lore/reindex", timeout=None)
+        response.raise_for_status()
+        print(json.dumps(response.json(), indent=2))
+        return
+
+    if not args.vault:
+        parser.error("no vault path: pass --vault or set VAULT_PATH in .env")
+    lore_dir = Path(args.vault) / args.lore_dir
+    if not lore_dir.is_dir():
+        parser.error(f"lore folder not found: {lore_dir}")
+
+    client = chromadb.PersistentClient(path=args.chroma, settings=Settings(anonymized_telemetry=False))
+    manifest_path = Path(args.chroma) / MANIFEST_NAME
+    if args.rebuild:
+        try:
+            client.delete_collection(name=COLLECTION_NAME)
+        except Exception:
+            pass
+        manifest_path.unlink(missing_ok=True)
+
+    collection = open_collection(client)
+    indexer = LoreIndexer(collection, lore_dir, manifest_path,
+                          max_tokens=args.max_tokens, overlap_tokens=args.overlap_tokens,
+                          batch_size=args.batch_size, workers=args.workers)
+
+    def show_progress(state):
+        print(f"\r{state['files_done']}/{state['files_total']} files, {state['chunks_written']} chunks, "
+              f"{state['chunks_per_second']} chunks/s", end="", file=sys.stderr, flush=True)
+
+    try:
+        report = indexer.sync(progress=show_progress)
+    except KeyboardInterrupt:
+        print(f"\nInterrupted: {len(indexer.manifest['files'])} files are indexed; run again to resume",
+              file=sys.stderr)
+        sys.exit(130)
+    print(file=sys.stderr)
+    print(f"{report['added']} added, {report['changed']} changed, {report['removed']} removed, "
+          f"{report['unchanged']} unchanged: {report['chunks_written']} chunks embedded in {report['seconds']:.1f}s "
+          f"({report['chunks_per_second'] or 0} chunks/s, {report['workers']} worker(s))")
+    if report['leftovers_removed']:
+        print(f"Removed {report['leftovers_removed']} documents from an earlier, unchunked index")
+
+    if not args.no_vector_store:
+        from vector_index import STORE_NAME, NumpyVectorIndex
+        store = NumpyVectorIndex(collection, store_path=Path(args.chroma) / STORE_NAME, fingerprint=indexer.fingerprint)
+        store.load()
+        stats = store.stats()
+        print(f"Vector store {'already current' if stats['source'] == 'store' else 'exported'}: "
+              f"{stats['vectors']} x {stats['dimensions']} in {store.store_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+DOAMMO Lore Queries
+Conversation-aware sub-queries for lore retrieval, searched as one batch and merged
+"""
+
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+
+from context_packer import content_words, fit_sentences, split_sentences
+from lexical_index import reciprocal_rank_fusion
+from lore_cache import normalize_query
+
+# Capitalized runs like "Lyssia", "Gilded Anchor" or "Captain of the Guard"
+_NAME_RE = re.compile(r"\b[A-Z][\w'-]*(?:\s+(?:of\s+(?:the\s+)?)?[A-Z][\w'-]*)*")
+
+# Capitalized only because they start a sentence
+_OPENERS = {
+    "then", "there", "here", "now", "when", "while", "after", "before", "if", "so", "yet", "still",
+    "what", "who", "where", "why", "how", "yes", "no", "not", "all", "one", "some", "inside",
+    "outside", "behind", "above", "below", "beyond", "somewhere", "nothing", "something", "everyone",
+    "me", "him", "them", "us", "let", "once", "again", "perhaps", "maybe", "just", "only", "even"
+}
+
+
+def named_entities(text: str) -> List[str]:
+    """
+    Names in prose, most mentioned first (ties: latest mention first).
+
+    A capitalized word that opens a sentence only counts if it isn't a
+    common opener ("Then", "Inside", "Slowly") - names usually start
+    sentences too, so they can't simply be skipped there.
+    """
+    counts: Counter = Counter()
+    last_seen: Dict[str, int] = {}
+    position = 0
+    for sentence in split_sentences(text):
+        for match in _NAME_RE.finditer(sentence):
+            words = match.group(0).split()
+            at_start = match.start() == 0
+            # "The Gilded Anchor" -> "Gilded Anchor"
+            while words and not content_words(words[0]):
+                words.pop(0)
+                at_start = False
+            if not words:
+                continue
+            name = " ".join(words)
+            if at_start and len(words) == 1:
+                word = words[0].lower()
+                if word in _OPENERS or word.endswith("ly"):
+                    continue
+            counts[name] += 1
+            last_seen[name] = position
+            position += 1
+    return sorted(counts, key=lambda name: (-counts[name], -last_seen[name]))
+
+
+class SubQueryBuilder:
+    """
+    Builds the queries that retrieve lore for one turn.
+
+    The player's input alone often names nothing ("I follow her inside"):
+    the referent is in the narrator's last message. Besides the raw input
+    this adds the input behind the end of that message, and each name the
+    message mentions that the input doesn't. All of them go to the
+    collection in one batched query.
+    """
+
+    def __init__(self, context_tokens: int = 80, max_entities: int = 4):
+        self.context_tokens = context_tokens
+        self.max_entities = max_entities
+
+    def build(self, user_input: str, history: Optional[List[Dict]] = None) -> List[str]:
+        """Sub-queries for a turn, raw input first, without duplicates"""
+        queries = [user_input]
+        narrative = last_narrative(history or [])
+        if narrative:
+            context = fit_sentences(narrative, self.context_tokens, from_end=True)
+            if context:
+                queries.append(f"{context} {user_input}")
+
+            mentioned = user_input.lower()
+            names = [n for n in named_entities(narrative) if n.lower() not in mentioned]
+            queries += names[:self.max_entities]
+
+        unique, seen = [], set()
+        for query in queries:
+            key = normalize_query(query)
+            if key and key not in seen:
+                seen.add(key)
+                unique.append(query)
+        return unique
+
+
+def last_narrative(history: List[Dict]) -> str:
+    """The most recent narrator message"""
+    for message in reversed(history):
+        if message.get("role") == "assistant":
+            return message.get("content", "")
+    return ""
+
+
+def merge_rows(rows: List[Dict], n_results: int, rrf_k: int = 60) -> Dict:
+    """
+    Merge the results of several sub-queries into one result, each chunk
+    once, ranked by reciprocal rank fusion. Distances of different queries
+    aren't comparable, so the rank decides; a chunk keeps its smallest
+    distance for the packer.
+    """
+    if len(rows) == 1:
+        return rows[0]
+
+    entries: Dict[str, tuple] = {}
+    best: Dict[str, float] = {}
+    with_distances = all(row.get("distances") for row in rows)
+    for row in rows:
+        distances = row["distances"][0] if with_distances else [None] * len(row["ids"][0])
+        for doc_id, document, metadata, distance in zip(row["ids"][0], row["documents"][0],
+                                                        row["metadatas"][0], distances):
+            entries.setdefault(doc_id, (document, metadata))
+            if distance is not None:
+                best[doc_id] = min(distance, best.get(doc_id, distance))
+
+    fused = reciprocal_rank_fusion([row["ids"][0] for row in rows], rrf_k)[:n_results]
+    return {
+        "ids": [[doc_id for doc_id, _ in fused]],
+        "documents": [[entries[doc_id][0] for doc_id, _ in fused]],
+        "metadatas": [[entries[doc_id][1] for doc_id, _ in fused]],
+        "distances": [[best[doc_id] for doc_id, _ in fused]] if with_distances else None
+    }
+
+
+def merge_by_distance(results: List[Dict], n_results: int) -> Dict:
+    """
+    Merge single-query results from different collections embedded with
+    the same model: nearest chunks first, ties in the order given. Falls
+    back to rank fusion if any of them has no distances.
+    """
+    if len(results) == 1:
+        return results[0]
+    if any(not result.get("distances") for result in results):
+        return merge_rows(results, n_results)
+
+    entries = []
+    for result in results:
+        entries += zip(result["distances"][0], result["ids"][0], result["documents"][0], result["metadatas"][0])
+    entries.sort(key=lambda entry: entry[0])
+    entries = entries[:n_results]
+    return {
+        "ids": [[entry[1] for entry in entries]],
+        "documents": [[entry[2] for entry in entries]],
+        "metadatas": [[entry[3] for entry in entries]],
+        "distances": [[entry[0] for entry in entries]]
+    }
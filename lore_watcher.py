@@ -0,0 +1,181 @@
+"""
+DOAMMO Lore Watcher
+Background task that streams vault edits into the lore index (debounced, touched files only)
+"""
+
+import asyncio
+import importlib.util
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from lore_ingest import LoreIndexer, lore_relative_path
+
+WATCH_BACKENDS = ("auto", "watchfiles", "poll", "manual")
+
+
+def watchfiles_available() -> bool:
+    """Native file events need the optional watchfiles package (installed with uvicorn[standard])"""
+    return importlib.util.find_spec("watchfiles") is not None
+
+
+class VaultWatcher:
+    """
+    Watches the lore folder and re-indexes files as writers edit them.
+
+    Edits are collected as pending paths. A sync starts once no new edit
+    has arrived for `debounce` seconds, or `max_delay` seconds after the
+    oldest pending edit, whichever is sooner (so a writer saving every
+    second still sees updates). Each sync re-chunks and re-embeds only the
+    pending files, through the LoreIndexer's batched upserts. Edits made
+    while the server was down are picked up by a full sync at start.
+
+    Events come from watchfiles when it is installed. Otherwise the folder
+    is polled for mtime/size changes every `poll_interval` seconds. With
+    the "manual" backend nothing is watched and only notify() feeds it
+    (for folders that are only written through the API).
+    """
+
+    def __init__(self, indexer: LoreIndexer, debounce: float = 1.0, max_delay: float = 10.0,
+                 poll_interval: float = 2.0, backend: str = "auto"):
+        if backend not in WATCH_BACKENDS:
+            raise ValueError(f"Watch backend must be one of {WATCH_BACKENDS}, got '{backend}'")
+        if backend == "watchfiles" and not watchfiles_available():
+            raise RuntimeError("The watchfiles backend needs the watchfiles package (pip install watchfiles)")
+        if backend == "auto":
+            backend = "watchfiles" if watchfiles_available() else "poll"
+
+        self.indexer = indexer
+        self.root = Path(indexer.lore_dir).resolve()
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.backend = backend
+
+        self.pending: Dict[str, float] = {}  # relative path -> when the first unsynced edit was seen
+        self._in_flight: Dict[str, float] = {}
+        self._last_event = 0.0
+        self._wake = asyncio.Event()
+        self._tasks = []
+
+        self.initial_sync_done = False
+        self.syncs = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_report = None
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._watch()), asyncio.create_task(self._drain())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self, relative_paths: Iterable[str]):
+        """Mark files as edited (also usable directly, e.g. after the API writes to the vault)"""
+        now = time.monotonic()
+        added = False
+        for relative_path in relative_paths:
+            self.pending.setdefault(relative_path, now)
+            added = True
+        if added:
+            self._last_event = now
+            self._wake.set()
+
+    def _relative(self, path: str) -> Optional[str]:
+        """Lore-relative path of a .md file inside the folder, else None"""
+        return lore_relative_path(self.root, path)
+
+    async def _watch(self):
+        if self.backend == "manual":
+            return
+        if self.backend == "watchfiles":
+            from watchfiles import awatch
+
+            # watchfiles only groups events for a moment; the real debounce is ours
+            async for changes in awatch(self.root, debounce=50, step=50):
+                self.notify(p for p in (self._relative(path) for _, path in changes) if p)
+        else:
+            snapshot = await asyncio.to_thread(self._scan)
+            while True:
+                await asyncio.sleep(self.poll_interval)
+                current = await asyncio.to_thread(self._scan)
+                changed = [p for p in current.keys() | snapshot.keys() if current.get(p) != snapshot.get(p)]
+                snapshot = current
+                self.notify(changed)
+
+    def _scan(self) -> Dict[str, tuple]:
+        stats = {}
+        for directory, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for filename in filenames:
+                if filename.endswith(".md") and not filename.startswith("."):
+                    path = os.path.join(directory, filename)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue  # Deleted mid-scan; the next scan reports it
+                    stats[Path(path).relative_to(self.root).as_posix()] = (stat.st_mtime_ns, stat.st_size)
+        return stats
+
+    async def _drain(self):
+        # Catch up on edits made while the server was down (retried until it works)
+        while not await self._sync(None):
+            pass
+        self.initial_sync_done = True
+
+        while True:
+            await self._wake.wait()
+            while True:
+                now = time.monotonic()
+                due = self._last_event + self.debounce
+                if self.pending:
+                    due = min(due, min(self.pending.values()) + self.max_delay)
+                if due <= now:
+                    break
+                await asyncio.sleep(due - now)
+            self._wake.clear()
+
+            batch, self.pending = self.pending, {}
+            if batch:
+                await self._sync(batch)
+
+    async def _sync(self, batch: Optional[Dict[str, float]]) -> bool:
+        self._in_flight = batch or {}
+        try:
+            self.last_report = await asyncio.to_thread(self.indexer.sync, list(batch) if batch else None)
+            self.syncs += 1
+            return True
+        except Exception as e:
+            self.errors += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"Lore sync failed: {self.last_error}")
+            # Keep the files pending (with their original edit times) and retry later
+            await asyncio.sleep(self.max_delay)
+            for relative_path, seen in (batch or {}).items():
+                self.pending.setdefault(relative_path, seen)
+            if batch:
+                self._wake.set()
+            return False
+        finally:
+            self._in_flight = {}
+
+    def freshness(self) -> Dict:
+        """How far the index is behind the vault"""
+        waiting = {**self.pending, **self._in_flight}
+        lag = time.monotonic() - min(waiting.values()) if waiting else 0.0
+        return {
+            "watching": str(self.root),
+            "backend": self.backend,
+            "initial_sync_done": self.initial_sync_done,
+            "pending_files": len(self.pending),
+            "syncing_files": len(self._in_flight),
+            "lag_seconds": round(lag, 2),
+            "syncs": self.syncs,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_sync": self.last_report
+        }
@@ -0,0 +1,183 @@
+"""
+DOAMMO Metrics
+Labelled counters and histograms rendered in the Prometheus text exposition format
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    escaped = []
+    for key, value in pairs:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        escaped.append(f'{key}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                labels = _format_labels(list(zip(self.labelnames, key)))
+                lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label set"""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[tuple, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.setdefault(
+                key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            )
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the block (also recorded if it raises)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return series["count"] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                pairs = list(zip(self.labelnames, key))
+                for bound, count in zip(self.buckets, series["buckets"]):
+                    labels = _format_labels(pairs + [("le", _format_value(bound))])
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(pairs)
+                lines.append(f"{self.name}_sum{labels} {_format_value(series['sum'])}")
+                lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+AGENT_SECONDS = REGISTRY.histogram(
+    "doammo_agent_seconds", "Time spent in each workflow node or agent", ["agent", "outcome"]
+)
+LLM_CALLS = REGISTRY.counter(
+    "doammo_llm_calls_total", "LLM calls per backend", ["backend", "outcome"]
+)
+LLM_PROMPT_TOKENS = REGISTRY.histogram(
+    "doammo_llm_prompt_tokens", "Estimated prompt size per LLM call", ["backend"], SIZE_BUCKETS
+)
+LLM_RESPONSE_TOKENS = REGISTRY.histogram(
+    "doammo_llm_response_tokens", "Estimated response size per LLM call", ["backend"], SIZE_BUCKETS
+)
+DISK_WRITE_SECONDS = REGISTRY.histogram(
+    "doammo_disk_write_seconds", "Time spent writing session and wiki files", ["target"]
+)
+LORE_CACHE_LOOKUPS = REGISTRY.counter(
+    "doammo_lore_cache_lookups_total", "Lore cache lookups per level", ["level", "outcome"]
+)
+
+
+def timed(agent_name: str):
+    """
+    Decorator timing an async node/agent callable under agent_name.
+
+    Works on functions, methods and callable agent instances:
+    timed("narrator")(narrator_agent)
+    """
+    def decorate(func):
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                result = await func(*args, **kwargs)
+                outcome = "ok"
+                return result
+            finally:
+                AGENT_SECONDS.observe(time.perf_counter() - start, agent=agent_name, outcome=outcome)
+
+        wrapper.__name__ = getattr(func, "__name__", agent_name)
+        return wrapper
+    return decorate
@@ -0,0 +1,63 @@
+"""
+DOAMMO Session Turn Queue
+Serializes work on the same session while letting different sessions run in parallel
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict
+
+
+class SessionTurnQueue:
+    """
+    One FIFO lock per session.
+
+    Every request that reads-then-writes a ConversationManager (a narrative
+    turn, undo, edit, saving to a wiki) runs inside turn(session_id). Turns
+    on the same session execute one at a time in arrival order; turns on
+    different sessions never wait for each other.
+    """
+
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._depth: Dict[str, int] = {}  # queued + running, per session
+        self.turns_completed = 0
+        self.max_depth_seen = 0
+
+    @asynccontextmanager
+    async def turn(self, session_id: str):
+        """Wait for this session's earlier turns, then run exclusively"""
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+
+        depth = self._depth.get(session_id, 0) + 1
+        self._depth[session_id] = depth
+        self.max_depth_seen = max(self.max_depth_seen, depth)
+
+        try:
+            # asyncio.Lock wakes waiters in FIFO order, which keeps turns ordered
+            async with lock:
+                yield
+                self.turns_completed += 1
+        finally:
+            self._depth[session_id] -= 1
+            if self._depth[session_id] == 0:
+                # Drop idle sessions so the maps don't grow forever
+                del self._depth[session_id]
+                del self._locks[session_id]
+
+    def depth(self, session_id: str) -> int:
+        """Number of turns queued or running for a session"""
+        return self._depth.get(session_id, 0)
+
+    def stats(self) -> Dict:
+        """Queue depth snapshot for diagnostics"""
+        busy = dict(self._depth)
+        return {
+            "active_sessions": len(busy),
+            "queued_turns": sum(depth - 1 for depth in busy.values()),
+            "max_depth_seen": self.max_depth_seen,
+            "turns_completed": self.turns_completed,
+            "sessions": busy
+        }
@@ -49,6 +49,58 @@ function addMessage(content, isUser, loreUsed = []) {
     if (typeof lucide !== 'undefined') {
         lucide.createIcons();
     }
+
+    return messageDiv;
+}
+
+function appendToMessage(messageDiv, text) {
+    const chatContainer = document.getElementById('chatContainer');
+    const textEl = messageDiv.querySelector('.message-text');
+    textEl.textContent += text;
+
+    // Keep following the stream unless the user scrolled up to read
+    const isNearBottom = chatContainer.scrollHeight - chatContainer.scrollTop - chatContainer.clientHeight < 100;
+    if (isNearBottom) {
+        chatContainer.scrollTop = chatContainer.scrollHeight;
+    }
+}
+
+/* ============================================================================
+   Streaming (Server-Sent Events over fetch)
+   ============================================================================ */
+
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+
+        // Frames are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let eventName = 'message';
+            let data = '';
+            frame.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) {
+                    eventName = line.slice(7);
+                } else if (line.startsWith('data: ')) {
+                    data += line.slice(6);
+                }
+            });
+
+            if (data) {
+                onEvent(eventName, JSON.parse(data));
+            }
+        }
+    }
 }
 
 function showLoading() {
@@ -93,14 +145,15 @@ async function sendMessage() {
     showLoading();
 
     try {
-        const response = await fetch(`${API_URL}/narrative`, {
+        const response = await fetch(`${API_URL}/narrative/stream`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
             body: JSON.stringify({
                 user_input: message,
-                session_id: sessionId
+                session_id: sessionId,
+                wiki_name: currentWiki
             })
         });
 
@@ -108,16 +161,49 @@ async function sendMessage() {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
 
-        const data = await response.json();
+        let loreUsed = [];
+        let aiMessage = null;
+        let data = null;
+
+        await readEventStream(response, (event, payload) => {
+            if (event === 'lore') {
+                loreUsed = payload.lore_used;
+                // Update session ID as soon as the server assigns one
+                if (!sessionId) {
+                    sessionId = payload.session_id;
+                }
+            } else if (event === 'token') {
+                // First token replaces the loading indicator
+                if (!aiMessage) {
+                    hideLoading();
+                    aiMessage = addMessage('', false, loreUsed);
+                }
+                appendToMessage(aiMessage, payload.text);
+            } else if (event === 'quality') {
+                if (aiMessage) {
+                    aiMessage.dataset.qualityCheck = payload.quality_check;
+                }
+            } else if (event === 'done') {
+                data = payload;
+            } else if (event === 'error') {
+                // retry_after means the LLM backend was saturated mid-stream
+                const status = payload.retry_after ? 429 : 500;
+                throw new Error(`HTTP error! status: ${status} (${payload.detail})`);
+            }
+        });
 
-        // Update session ID if this is the first message
-        if (!sessionId) {
-            sessionId = data.session_id;
+        if (!data) {
+            throw new Error('Stream ended before the narrative was complete');
         }
 
-        // Hide loading and add AI response
+        // Backends that don't stream tokens only deliver the final narrative
         hideLoading();
-        addMessage(data.narrative, false, data.lore_used);
+        if (!aiMessage) {
+            aiMessage = addMessage(data.narrative, false, data.lore_used);
+        } else {
+            aiMessage.querySelector('.message-text').textContent = data.narrative;
+        }
+        aiMessage.dataset.qualityCheck = data.quality_check;
 
         // Auto-save to wiki if enabled
         if (typeof autoSaveToWiki === 'function') {
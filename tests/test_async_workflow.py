@@ -0,0 +1,141 @@
+"""
+Tests for the async LangGraph workflow.
+
+Uses fake LLM and Chroma backends with fixed latency so we can check that
+concurrent turns overlap instead of queueing behind each other.
+"""
+import asyncio
+import time
+
+import pytest
+
+from api_server import (
+    LoreKeeperAgent,
+    NarratorAgent,
+    QualityAgent,
+    build_workflow,
+)
+
+LLM_LATENCY = 0.2
+QUERY_LATENCY = 0.05
+
+
+class FakeMessage:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    """Async chat model stand-in that sleeps instead of calling an API."""
+
+    def __init__(self, reply="APPROVED: fine", latency=LLM_LATENCY):
+        self.reply = reply
+        self.latency = latency
+        self.calls = 0
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return FakeMessage(self.reply)
+
+
+class FakeCollection:
+    """Blocking Chroma collection stand-in (query runs in a worker thread)."""
+
+    def query(self, query_texts, n_results=3):
+        time.sleep(QUERY_LATENCY)
+        return {
+            "documents": [["Lyssia pilots the skyship."]],
+            "metadatas": [[{"filename": "Char_Aeth_Lyssia.md"}]],
+            "distances": [[0.1]],
+        }
+
+
+def make_state(session_id, user_input="I board the skyship"):
+    return {
+        "user_input": user_input,
+        "session_id": session_id,
+        "relevant_lore": [],
+        "lore_context": "",
+        "narrative": "",
+        "quality_check": "",
+        "final_output": "",
+        "use_lmstudio": False,
+    }
+
+
+@pytest.fixture
+def fake_workflow():
+    claude = FakeLLM(reply="The skyship lifts off.")
+    lmstudio = FakeLLM(reply="Local narrative.")
+    quality_llm = FakeLLM()
+    workflow = build_workflow(
+        LoreKeeperAgent(FakeCollection()),
+        NarratorAgent(claude, lmstudio, {}),
+        QualityAgent(quality_llm),
+    )
+    return workflow, claude, lmstudio, quality_llm
+
+
+@pytest.mark.unit
+class TestAsyncWorkflow:
+    """Test the workflow runs natively on the event loop."""
+
+    async def test_ainvoke_runs_all_agents(self, fake_workflow):
+        """Test a single turn flows through every node."""
+        workflow, claude, lmstudio, quality_llm = fake_workflow
+
+        result = await workflow.ainvoke(make_state("s1"))
+
+        assert result["relevant_lore"] == ["Char_Aeth_Lyssia.md"]
+        assert result["final_output"] == "The skyship lifts off."
+        assert result["quality_check"].startswith("APPROVED")
+        assert claude.calls == 1
+        assert lmstudio.calls == 0
+        assert quality_llm.calls == 1
+
+    async def test_lmstudio_flag_routes_narrator(self, fake_workflow):
+        """Test the router flag still selects the LM Studio model."""
+        workflow, claude, lmstudio, _ = fake_workflow
+        state = make_state("s1", "lmstudio I look around")
+        state["use_lmstudio"] = True
+
+        result = await workflow.ainvoke(state)
+
+        assert result["narrative"] == "Local narrative."
+        assert lmstudio.calls == 1
+        assert claude.calls == 0
+
+    async def test_workflow_without_quality(self):
+        """Test background quality mode's graph stops after the narrator."""
+        narrator_llm = FakeLLM(reply="The skyship lifts off.")
+        workflow = build_workflow(
+            LoreKeeperAgent(FakeCollection()),
+            NarratorAgent(narrator_llm, narrator_llm, {}),
+        )
+
+        result = await workflow.ainvoke(make_state("s1"))
+
+        assert result["final_output"] == "The skyship lifts off."
+        assert result["quality_check"] == ""
+
+    @pytest.mark.slow
+    async def test_concurrent_sessions_overlap(self, fake_workflow):
+        """Test N simultaneous sessions finish in roughly the time of one."""
+        workflow, _, _, _ = fake_workflow
+        sessions = 10
+
+        start = time.perf_counter()
+        await workflow.ainvoke(make_state("warmup"))
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            workflow.ainvoke(make_state(f"s{i}")) for i in range(sessions)
+        ])
+        concurrent = time.perf_counter() - start
+
+        print(f"\n  1 turn: {single:.3f}s, {sessions} concurrent turns: {concurrent:.3f}s")
+        assert len(results) == sessions
+        # Serial execution would take ~sessions * single
+        assert concurrent < single * 2.5
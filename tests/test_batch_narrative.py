@@ -0,0 +1,130 @@
+"""
+Tests for the batch narrative endpoint.
+"""
+import asyncio
+import time
+from unittest.mock import patch, AsyncMock
+
+import pytest
+
+TURN_LATENCY = 0.05
+
+
+async def slow_turn(state):
+    """Mocked workflow turn that takes TURN_LATENCY seconds."""
+    await asyncio.sleep(TURN_LATENCY)
+    if state["user_input"] == "explode":
+        raise RuntimeError("Workflow error")
+    reply = f"Reply to {state['user_input']}"
+    return {**state, "narrative": reply, "final_output": reply, "quality_check": "APPROVED"}
+
+
+@pytest.mark.api
+class TestBatchNarrative:
+    """Test POST /narrative/batch."""
+
+    @patch('api_server.workflow_app', new_callable=AsyncMock)
+    def test_batch_keeps_session_order(self, mock_workflow, client):
+        """Test turns within a session are applied in the order given."""
+        mock_workflow.ainvoke.side_effect = slow_turn
+        requests = []
+        for n in range(3):
+            requests.append({"user_input": f"A{n}", "session_id": "batch_a"})
+            requests.append({"user_input": f"B{n}", "session_id": "batch_b"})
+
+        response = client.post("/narrative/batch", json={"requests": requests})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["succeeded"] == 6
+        assert [r["index"] for r in data["results"]] == list(range(6))
+        assert data["results"][0]["result"]["narrative"] == "Reply to A0"
+
+        from api_server import conv_managers
+        history = conv_managers["batch_a"].conversation_history
+        assert [m["content"] for m in history if m["role"] == "user"] == ["A0", "A1", "A2"]
+
+    @patch('api_server.workflow_app', new_callable=AsyncMock)
+    def test_batch_reports_per_item_errors(self, mock_workflow, client):
+        """Test one failing item doesn't fail the batch."""
+        mock_workflow.ainvoke.side_effect = slow_turn
+
+        response = client.post("/narrative/batch", json={"requests": [
+            {"user_input": "fine"},
+            {"user_input": "explode"},
+        ]})
+
+        data = response.json()
+        assert data["succeeded"] == 1
+        assert data["failed"] == 1
+        assert data["results"][1]["status_code"] == 500
+        assert data["results"][1]["error"] == "Workflow error"
+        # Items without a session each start their own
+        assert data["results"][0]["session_id"] != data["results"][1]["session_id"]
+
+    @patch('api_server.workflow_app', new_callable=AsyncMock)
+    def test_batches_in_the_same_second_get_their_own_sessions(self, mock_workflow, client):
+        """Test session-less items of two back-to-back batches never share a session."""
+        mock_workflow.ainvoke.side_effect = slow_turn
+
+        first = client.post("/narrative/batch", json={"requests": [{"user_input": "first"}]}).json()
+        second = client.post("/narrative/batch", json={"requests": [{"user_input": "second"}]}).json()
+
+        first_id, second_id = first["results"][0]["session_id"], second["results"][0]["session_id"]
+        assert first_id != second_id
+
+        from api_server import conv_managers
+        assert [m["content"] for m in conv_managers[second_id].conversation_history] == ["second", "Reply to second"]
+
+    @patch('api_server.workflow_app', new_callable=AsyncMock)
+    def test_saturated_items_leave_no_orphan_input(self, mock_workflow, client):
+        """Test 429 batch items, rejected up front or by the limiter mid-turn, don't stay in the history."""
+        from api_server import ConversationManager, conv_managers
+        from llm_limiter import BackendLimiter, BackendSaturated
+
+        full = BackendLimiter("claude", max_concurrency=1, max_queue=0)
+        full.in_flight = 1
+        with patch('api_server.llm_limiters', {"claude": full}), \
+                patch('api_server.choose_backend', return_value="claude"):
+            data = client.post("/narrative/batch", json={"requests": [
+                {"user_input": "Hello", "session_id": "batch_busy"}]}).json()
+
+        assert data["results"][0]["status_code"] == 429
+        mock_workflow.ainvoke.assert_not_called()
+        assert "batch_busy" not in conv_managers or conv_managers["batch_busy"].conversation_history == []
+
+        mock_workflow.ainvoke.side_effect = BackendSaturated("claude", 2)
+        data = client.post("/narrative/batch", json={"requests": [
+            {"user_input": "Hello again", "session_id": "batch_busy"}]}).json()
+
+        assert data["results"][0]["status_code"] == 429
+        assert conv_managers["batch_busy"].conversation_history == []
+        assert ConversationManager("batch_busy").conversation_history == []
+
+    def test_batch_validation(self, client):
+        """Test empty and oversized batches are rejected."""
+        assert client.post("/narrative/batch", json={"requests": []}).status_code == 400
+
+        too_many = [{"user_input": "x"}] * 101
+        assert client.post("/narrative/batch", json={"requests": too_many}).status_code == 400
+
+    @pytest.mark.slow
+    @patch('api_server.workflow_app', new_callable=AsyncMock)
+    def test_batch_throughput_vs_single_requests(self, mock_workflow, client):
+        """Test a batch over many sessions beats one /narrative call per turn."""
+        mock_workflow.ainvoke.side_effect = slow_turn
+        items = [{"user_input": f"Turn {n}", "session_id": f"throughput_{n % 8}"} for n in range(32)]
+
+        start = time.perf_counter()
+        for item in items:
+            assert client.post("/narrative", json=item).status_code == 200
+        serial = time.perf_counter() - start
+
+        start = time.perf_counter()
+        response = client.post("/narrative/batch", json={"requests": items, "max_concurrency": 8})
+        batched = time.perf_counter() - start
+
+        assert response.json()["succeeded"] == 32
+        print(f"\n  32 turns / 8 sessions: serial {32 / serial:.1f} turns/s, "
+              f"batch {32 / batched:.1f} turns/s ({serial / batched:.1f}x)")
+        assert batched < serial / 3
@@ -0,0 +1,150 @@
+"""
+Smoke tests for the offline benchmark suite.
+"""
+import pytest
+
+from benchmarks import (lore_chunking, lore_ingestion, lore_mmr, lore_multi_query, lore_retrieval, vector_backends,
+                        vector_store)
+from benchmarks.api_throughput import SCENARIOS, compare, parse_args, run_benchmark
+from benchmarks.synthetic_lore import generate_vault
+
+
+@pytest.mark.unit
+class TestBenchmarkHelpers:
+    """Test synthetic data and the regression gate."""
+
+    def test_synthetic_vault_is_deterministic(self):
+        """Test the same seed always produces the same vault."""
+        assert generate_vault(20, seed=3) == generate_vault(20, seed=3)
+        assert len(generate_vault(20)) == 20
+
+    def test_compare_flags_regressions(self):
+        """Test p95 and throughput regressions beyond the tolerance are reported."""
+        baseline = {"narrative": {"p95_ms": 100.0, "throughput_rps": 50.0}}
+
+        assert compare({"narrative": {"p95_ms": 110.0, "throughput_rps": 48.0}}, baseline, 0.25) == []
+        failures = compare({"narrative": {"p95_ms": 200.0, "throughput_rps": 20.0}}, baseline, 0.25)
+        assert len(failures) == 2
+
+
+@pytest.mark.slow
+class TestApiThroughputBenchmark:
+    """Test a small offline run of every scenario."""
+
+    async def test_small_run(self):
+        """Test all scenarios complete without errors against the fake backends."""
+        options = parse_args(["--requests", "12", "--concurrency", "4", "--latency-ms", "5",
+                              "--lore-files", "20"])
+
+        results = await run_benchmark(options)
+
+        for name in SCENARIOS:
+            assert results[name]["errors"] == {}
+            assert results[name]["p50_ms"] <= results[name]["p95_ms"] <= results[name]["p99_ms"]
+            assert results[name]["throughput_rps"] > 0
+        assert results["llm_calls"] >= 12 * 2 + 12  # narrator + quality per turn, one per extraction
+
+
+@pytest.mark.slow
+class TestLoreChunkingBenchmark:
+    """Test a small run of the chunked vs whole-file retrieval comparison."""
+
+    async def test_chunking_finds_more_facts(self):
+        """Test chunked retrieval answers more planted facts per prompt token than whole files."""
+        options = lore_chunking.parse_args(["--files", "40", "--queries", "20"])
+
+        results = await lore_chunking.run_benchmark(options)
+
+        assert results["chunked"]["documents"] > results["whole_file"]["documents"]
+        assert results["chunked"]["fact_hit_rate"] > results["whole_file"]["fact_hit_rate"]
+
+
+@pytest.mark.slow
+class TestLoreRetrievalBenchmark:
+    """Test a small run of the vector-only vs hybrid comparison."""
+
+    def test_hybrid_finds_named_files(self):
+        """Test hybrid retrieval recalls named files at least as well as vector search alone."""
+        options = lore_retrieval.parse_args(["--files", "40", "--queries", "20"])
+
+        results = lore_retrieval.run_benchmark(options)
+
+        assert results["bm25"]["documents"] > 40
+        assert results["names"]["hybrid"]["recall_at_k"] >= results["names"]["vector"]["recall_at_k"]
+        assert results["names"]["hybrid"]["recall_at_k"] > 0.8
+
+
+@pytest.mark.slow
+class TestVectorBackendsBenchmark:
+    """Test a small run of the Chroma vs numpy index comparison."""
+
+    def test_numpy_index_is_exact_and_faster(self):
+        """Test the numpy index answers single and batched queries faster than Chroma."""
+        options = vector_backends.parse_args(["--files", "40", "--queries", "40", "--startup-runs", "1"])
+
+        results = vector_backends.run_benchmark(options)
+
+        assert results["index"]["vectors"] > 40
+        assert results["numpy"]["query"]["batched_ms_per_query"] < results["chroma"]["query"]["batched_ms_per_query"]
+        assert results["numpy"]["startup"]["median_seconds"] > 0
+
+
+@pytest.mark.slow
+class TestMultiQueryBenchmark:
+    """Test a small run of the single vs conversation-aware retrieval comparison."""
+
+    def test_sub_queries_find_referents(self):
+        """Test follow-up turns recall more target files with sub-queries, batched or not."""
+        options = lore_multi_query.parse_args(["--files", "40", "--turns", "30"])
+
+        results = lore_multi_query.run_benchmark(options)
+
+        assert results["multi_batched"]["recall_at_k"] > results["single"]["recall_at_k"]
+        assert results["multi_batched"]["recall_at_k"] == results["multi_sequential"]["recall_at_k"]
+        assert results["queries_per_turn"] > 1
+
+
+@pytest.mark.slow
+class TestMMRBenchmark:
+    """Test a small run of the plain top-k vs MMR comparison."""
+
+    def test_mmr_packs_more_distinct_lore(self):
+        """Test MMR keeps fewer near-duplicates and more distinct entities, in a few milliseconds."""
+        options = lore_mmr.parse_args(["--files", "40", "--queries", "20"])
+
+        results = lore_mmr.run_benchmark(options)
+
+        assert results["mmr"]["near_duplicate_pairs"] < results["top_k"]["near_duplicate_pairs"]
+        assert results["mmr"]["distinct_entities"] > results["top_k"]["distinct_entities"]
+        assert results["mmr"]["select_only_ms"] < 50
+
+
+@pytest.mark.slow
+class TestIngestionBenchmark:
+    """Test a small run of the ingestion strategies."""
+
+    def test_every_mode_writes_the_vault(self):
+        """Test all modes write the same chunks and a resumed run skips what was done."""
+        options = lore_ingestion.parse_args(["--files", "40", "--sections", "4", "--batch-size", "16"])
+
+        results = lore_ingestion.run_benchmark(options)
+
+        assert results["load_all"]["chunks"] == results["streaming"]["chunks"] == results["parallel"]["chunks"]
+        assert results["parallel"]["workers"] == 2
+        assert 0 < results["resume"]["resumed_chunks"] < results["resume"]["total_chunks"]
+        assert results["resume"]["total_chunks"] == results["streaming"]["chunks"]
+
+
+@pytest.mark.slow
+class TestVectorStoreBenchmark:
+    """Test a small run of the cold-start comparison."""
+
+    def test_mapped_store_answers_like_numpy(self):
+        """Test the memory-mapped store returns the in-memory index's results and opens faster."""
+        options = vector_store.parse_args(["--files", "40", "--sections", "4", "--queries", "10"])
+
+        results = vector_store.run_benchmark(options)
+
+        assert results["mapped_matches_numpy"]
+        assert results["build"]["chunks"] > 0
+        assert results["mapped"]["open_ms"] < results["numpy"]["open_ms"]
@@ -0,0 +1,119 @@
+"""
+Tests for token-budgeted prompt assembly.
+"""
+import pytest
+
+from context_packer import ContextPacker, estimate_tokens, split_paragraphs
+
+LYSSIA = """# Lyssia
+
+Lyssia is an Aeth pilot from the floating city of Veyra.
+
+## Skyship
+
+She flies the Windrunner, a skyship with silver sails. The ship was a gift from her mentor.
+
+## Rivals
+
+Her rival is Kormac, a smuggler who operates out of the Karveth ruins."""
+
+KARVETH = """# Karveth
+
+The ruins of Karveth lie deep in the southern desert.
+
+Smugglers use the ruins as a hideout, and sandstorms hide their camps."""
+
+
+@pytest.mark.unit
+class TestTokenEstimate:
+    """Test the local token approximation."""
+
+    def test_estimate_scales_with_length(self):
+        """Test longer text costs more tokens."""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("Lyssia flies north.") < estimate_tokens(LYSSIA)
+
+    def test_estimate_close_to_real_tokenizer(self):
+        """Test the estimate is within 35% of a real BPE tokenizer."""
+        tiktoken = pytest.importorskip("tiktoken")
+        try:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            pytest.skip("tokenizer data not available offline")
+
+        text = LYSSIA + "\n\n" + KARVETH
+        actual = len(encoding.encode(text))
+        assert abs(estimate_tokens(text) - actual) / actual < 0.35
+
+
+@pytest.mark.unit
+class TestContextPacker:
+    """Test lore, history and input packing."""
+
+    def test_headings_stay_with_their_paragraph(self):
+        """Test a heading is never split from its section text."""
+        paragraphs = split_paragraphs(LYSSIA)
+
+        assert paragraphs[0].startswith("# Lyssia\nLyssia is")
+        assert paragraphs[1].startswith("## Skyship\nShe flies")
+
+    def test_lore_respects_budget_with_whole_paragraphs(self):
+        """Test packed lore stays in budget and keeps paragraphs intact."""
+        packer = ContextPacker(lore_tokens=60)
+
+        context, sources = packer.pack_lore("Lyssia skyship", [("Lyssia.md", LYSSIA), ("Karveth.md", KARVETH)])
+
+        assert estimate_tokens(context) <= 60
+        for paragraph in split_paragraphs(LYSSIA):
+            if paragraph.splitlines()[-1] in context:
+                assert paragraph in context
+        assert "Windrunner" in context
+        assert sources[0] == "Lyssia.md"
+
+    def test_lore_prefers_relevant_paragraph_deep_in_file(self):
+        """Test a matching section late in a file beats earlier filler."""
+        packer = ContextPacker(lore_tokens=45)
+
+        context, _ = packer.pack_lore("Who is Kormac the smuggler?", [("Lyssia.md", LYSSIA)])
+
+        assert "Kormac" in context
+
+    def test_lore_everything_fits(self):
+        """Test small lore sets are included in full, grouped per source."""
+        packer = ContextPacker(lore_tokens=1000)
+
+        context, sources = packer.pack_lore("desert", [("Lyssia.md", LYSSIA), ("Karveth.md", KARVETH)])
+
+        assert sources == ["Lyssia.md", "Karveth.md"]
+        assert context.index("--- Lyssia.md ---") < context.index("--- Karveth.md ---")
+        assert "sandstorms hide their camps." in context
+
+    def test_history_keeps_newest_messages(self):
+        """Test history packing drops the oldest messages first."""
+        packer = ContextPacker(history_tokens=30)
+        messages = [{"role": "user", "content": f"Message number {n} about the journey."} for n in range(10)]
+
+        kept = packer.pack_history(messages)
+
+        assert kept == messages[-len(kept):]
+        assert 0 < len(kept) < 10
+        assert sum(estimate_tokens(m["content"]) + 2 for m in kept) <= 30
+
+    def test_history_long_latest_message_keeps_ending(self):
+        """Test an oversized latest message keeps its last whole sentences."""
+        packer = ContextPacker(history_tokens=12)
+        long_message = {"role": "assistant", "content": "First sentence here. " * 10 + "The final line."}
+
+        kept = packer.pack_history([long_message])
+
+        assert len(kept) == 1
+        assert kept[0]["content"].endswith("The final line.")
+
+    def test_input_trimmed_to_sentences(self):
+        """Test oversized input is cut on a sentence boundary."""
+        packer = ContextPacker(input_tokens=10)
+
+        text = packer.pack_input("I walk north. Then I climb the tower. Then I look around the valley below.")
+
+        assert text == "I walk north."
+        assert packer.pack_input("I wait.") == "I wait."
@@ -0,0 +1,216 @@
+"""
+Tests for hedged narrator calls and the per-turn deadline.
+"""
+import asyncio
+from unittest.mock import patch, AsyncMock
+
+import pytest
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from api_server import LoreKeeperAgent, NarratorAgent, build_workflow, narrator_token
+from llm_router import LLMRouter, TrackedLLM, HedgedCaller
+
+
+class StreamingLLM:
+    """Streams a fixed reply after a delay, optionally failing instead"""
+
+    def __init__(self, reply, first_token_delay=0.0, fail=False):
+        self.reply = reply
+        self.first_token_delay = first_token_delay
+        self.fail = fail
+        self.started = 0
+        self.cancelled = 0
+
+    async def astream(self, prompt, config=None):
+        self.started += 1
+        try:
+            await asyncio.sleep(self.first_token_delay)
+            if self.fail:
+                raise ConnectionError("backend failed")
+            for word in self.reply.split(" "):
+                yield AIMessageChunk(content=word + " ")
+                await asyncio.sleep(0)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+class GatedChatModel(BaseChatModel):
+    """Chat model whose stream waits on a shared gate, so two backends can start emitting together"""
+
+    reply: str
+    gate: asyncio.Event
+
+    @property
+    def _llm_type(self):
+        return "gated"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await self.gate.wait()
+        for word in self.reply.split(" "):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+
+class YieldingTracer(AsyncCallbackHandler):
+    """Async handler that yields to the event loop on every token, as a remote tracer would"""
+
+    async def on_llm_new_token(self, token, **kwargs):
+        await asyncio.sleep(0)
+
+
+class QuietCollection:
+    def query(self, query_texts, n_results=3):
+        return {"documents": [[]], "metadatas": [[]], "distances": [[]]}
+
+
+def make_hedger(claude, lmstudio, **kwargs):
+    router = LLMRouter("claude")
+    claude_stats = router.add_backend("claude", cost_rank=1)
+    lmstudio_stats = router.add_backend("lmstudio", cost_rank=0, local=True)
+    llms = {"claude": TrackedLLM(claude, claude_stats), "lmstudio": TrackedLLM(lmstudio, lmstudio_stats)}
+    options = {"min_delay": 0.05, "default_delay": 0.05, "deadline": 1.0}
+    options.update(kwargs)
+    return HedgedCaller(router, llms, **options)
+
+
+@pytest.mark.unit
+class TestHedgedCaller:
+    """Test hedging, fallback and deadlines between backends."""
+
+    async def test_fast_primary_is_not_hedged(self):
+        """Test a primary that answers promptly never touches the secondary."""
+        claude = StreamingLLM("Claude narrates")
+        lmstudio = StreamingLLM("Local narrates")
+        hedger = make_hedger(claude, lmstudio)
+
+        content, backend, hedged = await hedger.call("prompt", "lmstudio")
+
+        assert content.strip() == "Local narrates"
+        assert (backend, hedged) == ("lmstudio", False)
+        assert claude.started == 0
+
+    async def test_stalled_primary_is_hedged_and_cancelled(self):
+        """Test a stalled primary is raced and cancelled once the secondary answers."""
+        claude = StreamingLLM("Claude narrates")
+        lmstudio = StreamingLLM("Local narrates", first_token_delay=10)
+        hedger = make_hedger(claude, lmstudio)
+
+        content, backend, hedged = await hedger.call("prompt", "lmstudio")
+
+        assert content.strip() == "Claude narrates"
+        assert (backend, hedged) == ("claude", True)
+        assert lmstudio.cancelled == 1
+        assert hedger.snapshot()["secondary_wins"] == 1
+
+    async def test_primary_error_falls_back_immediately(self):
+        """Test a primary that fails before its first token falls back without waiting."""
+        claude = StreamingLLM("Claude narrates")
+        lmstudio = StreamingLLM("", fail=True)
+        hedger = make_hedger(claude, lmstudio, min_delay=5, default_delay=5, deadline=10)
+
+        content, backend, _ = await asyncio.wait_for(hedger.call("prompt", "lmstudio"), timeout=1)
+
+        assert backend == "claude"
+
+    async def test_hedge_delay_tracks_first_token_percentile(self):
+        """Test the hedge threshold follows observed time-to-first-token."""
+        hedger = make_hedger(StreamingLLM("a"), StreamingLLM("b"), min_delay=0.5, deadline=30)
+        for seconds in [1.0] * 18 + [20.0] * 2:
+            hedger.router.stats["lmstudio"].record_first_token(seconds)
+
+        assert hedger.hedge_delay("lmstudio") == 20.0
+        hedger.percentile = 50
+        assert hedger.hedge_delay("lmstudio") == 1.0
+        assert hedger.hedge_delay("claude") == 0.5  # No data: default, clamped to the minimum
+
+    async def test_unhealthy_secondary_is_not_used(self):
+        """Test hedging never fires at a backend that is failing its probes."""
+        claude = StreamingLLM("Claude narrates", first_token_delay=0.15)
+        lmstudio = StreamingLLM("Local narrates")
+        hedger = make_hedger(claude, lmstudio)
+        hedger.router.stats["lmstudio"].record_probe(False, "connection refused")
+
+        _, backend, hedged = await hedger.call("prompt", "claude")
+
+        assert (backend, hedged) == ("claude", False)
+        assert lmstudio.started == 0
+
+    async def test_deadline_raises_timeout(self):
+        """Test a turn fails at the deadline when no backend answers."""
+        claude = StreamingLLM("", first_token_delay=10)
+        lmstudio = StreamingLLM("", first_token_delay=10)
+        hedger = make_hedger(claude, lmstudio, deadline=0.2)
+
+        with pytest.raises(asyncio.TimeoutError):
+            await hedger.call("prompt", "claude")
+
+        assert claude.cancelled == lmstudio.cancelled == 1
+        assert hedger.timeouts == 1
+
+
+@pytest.mark.unit
+class TestHedgedStreaming:
+    """Test only the winning backend's tokens reach the narrative stream."""
+
+    async def test_losing_backend_tokens_are_not_streamed(self):
+        """Test both backends emitting before the loser is cancelled still streams one backend."""
+        gate = asyncio.Event()
+        claude = GatedChatModel(reply="Claude narrates", gate=gate)
+        lmstudio = GatedChatModel(reply="Local narrates", gate=gate)
+        hedger = make_hedger(claude, lmstudio)
+        workflow = build_workflow(LoreKeeperAgent(QuietCollection()), NarratorAgent(claude, lmstudio, {}, hedger=hedger))
+        state = {"user_input": "I look around", "session_id": "s1", "relevant_lore": [], "lore_context": "",
+                 "narrative": "", "quality_check": "", "final_output": "", "use_lmstudio": True}
+
+        async def open_gate():
+            await asyncio.sleep(0.1)  # Past the hedge delay: both calls are waiting
+            gate.set()
+
+        opener = asyncio.create_task(open_gate())
+        tokens, result = [], {}
+        async for mode, payload in workflow.astream(state, config={"callbacks": [YieldingTracer()]},
+                                                    stream_mode=["updates", "messages", "custom"]):
+            if mode == "updates":
+                result.update(payload.get("narrator", {}))
+            elif narrator_token(mode, payload):
+                tokens.append(narrator_token(mode, payload))
+        await opener
+
+        assert result["hedged"] is True
+        assert "".join(tokens) == result["narrative"]
+        assert "".join(tokens).strip() in ("Claude narrates", "Local narrates")
+
+
+@pytest.mark.api
+class TestHedgedNarrativeAPI:
+    """Test the winning backend is reported and deadlines map to 504."""
+
+    @patch('api_server.workflow_app', new_callable=AsyncMock)
+    def test_response_records_winning_backend(self, mock_workflow, client):
+        """Test the narrative response says which backend narrated."""
+        mock_workflow.ainvoke.return_value = {
+            "narrative": "The camp is quiet.", "final_output": "The camp is quiet.",
+            "relevant_lore": [], "quality_check": "APPROVED", "backend_used": "claude", "hedged": True
+        }
+
+        response = client.post("/narrative", json={"user_input": "lmstudio I look around"})
+
+        assert response.status_code == 200
+        assert response.json()["backend"] == "claude"
+        assert response.json()["hedged"] is True
+
+    @patch('api_server.workflow_app', new_callable=AsyncMock)
+    def test_deadline_returns_504(self, mock_workflow, client):
+        """Test a turn that hits the narration deadline returns 504."""
+        mock_workflow.ainvoke.side_effect = asyncio.TimeoutError("No LLM backend finished within 90s")
+
+        response = client.post("/narrative", json={"user_input": "I look around"})
+
+        assert response.status_code == 504
+        assert "90s" in response.json()["detail"]
@@ -0,0 +1,124 @@
+"""
+Tests for the BM25 index and hybrid retrieval.
+"""
+import pytest
+
+from lexical_index import BM25Index, HybridRetriever, lexical_terms, reciprocal_rank_fusion
+
+DOCS = {
+    "lyssia#0": ("Lyssia flies the Windrunner, a skyship with silver sails.", "Char_Aeth_Lyssia.md"),
+    "kormac#0": ("Kormac smuggles relics out of the desert ruins.", "Char_Kormac.md"),
+    "karveth#0": ("The ruins of Karveth lie in the southern desert. Kormac hides there.", "Loc_Karveth.md"),
+    "veyra#0": ("Veyra is a floating city. Its pilots are the best in the sky.", "Loc_Veyra.md"),
+}
+
+
+def make_index(**options) -> BM25Index:
+    ids = list(DOCS)
+    return BM25Index(ids, [DOCS[i][0] for i in ids], [{"filename": DOCS[i][1]} for i in ids], **options)
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = dict(docs)
+        self.gets = 0
+
+    def get(self, include=None, limit=None, offset=0):
+        self.gets += 1
+        ids = list(self.docs)[offset:offset + limit]
+        return {"ids": ids, "documents": [self.docs[i][0] for i in ids],
+                "metadatas": [{"filename": self.docs[i][1]} for i in ids]}
+
+
+def vector_results(*ids):
+    return {"ids": [list(ids)], "documents": [[DOCS[i][0] for i in ids]],
+            "metadatas": [[{"filename": DOCS[i][1]} for i in ids]], "distances": [[0.5] * len(ids)]}
+
+
+@pytest.mark.unit
+class TestBM25:
+    """Test tokenization and ranking."""
+
+    def test_terms_drop_possessives_and_stopwords(self):
+        """Test "Lyssia's" matches "Lyssia" and filler words are ignored."""
+        assert lexical_terms("Where is Lyssia's ship?") == ["where", "lyssia", "ship"]
+
+    def test_filename_words_count(self):
+        """Test a name that only appears in the filename is still found."""
+        results = make_index().search("Tell me about Aeth", 3)
+        assert [number for number, _ in results] == [0]
+
+    def test_rarer_and_repeated_terms_rank_higher(self):
+        """Test the document naming Kormac in its file and text ranks first."""
+        ranked = [make_index().ids[number] for number, _ in make_index().search("Kormac in the desert", 4)]
+        assert ranked[0] == "kormac#0"
+        assert set(ranked) == {"kormac#0", "karveth#0"}
+
+    def test_no_match_and_top_k(self):
+        """Test unknown words return nothing and n_results bounds the output."""
+        index = make_index()
+        assert index.search("zzz qqq", 3) == []
+        assert len(index.search("ruins desert city sky silver", 2)) == 2
+        assert index.stats()["documents"] == 4
+
+
+@pytest.mark.unit
+class TestFusion:
+    """Test reciprocal rank fusion and the hybrid retriever."""
+
+    def test_rrf_rewards_agreement(self):
+        """Test an id ranked by both lists beats ids ranked first by only one."""
+        fused = reciprocal_rank_fusion([["a", "b"], ["c", "b"]], k=60)
+        assert fused[0][0] == "b"
+        assert fused[0][1] == pytest.approx(2 / 62)
+
+    def test_lexical_hits_join_vector_results(self):
+        """Test a name the vector search missed is added, with its text and metadata."""
+        hybrid = HybridRetriever(FakeCollection(DOCS), index=make_index())
+
+        results = hybrid.fuse("What is Kormac smuggling?", vector_results("veyra#0", "lyssia#0"), 3)
+
+        position = results["ids"][0].index("kormac#0")
+        assert results["ids"][0][:position] == ["veyra#0"]  # ties at rank 1 keep vector order
+        assert results["metadatas"][0][position]["filename"] == "Char_Kormac.md"
+        assert results["documents"][0][position].startswith("Kormac smuggles")
+        assert len(results["ids"][0]) == 3
+        assert results["distances"] is None
+
+    def test_rebuilds_when_version_changes(self):
+        """Test the BM25 index follows the collection after a sync."""
+        collection = FakeCollection(DOCS)
+        version = {"value": 0}
+        hybrid = HybridRetriever(collection, version=lambda: version["value"])
+
+        hybrid.fuse("Kormac", vector_results("veyra#0"), 3)
+        hybrid.fuse("Kormac", vector_results("veyra#0"), 3)
+        assert hybrid.rebuilds == 1
+
+        collection.docs["orrin#0"] = ("Orrin draws the maps for the Windrunner crew.", "Char_Orrin.md")
+        version["value"] += 1
+        results = hybrid.fuse("Orrin", vector_results("veyra#0"), 3)
+
+        assert hybrid.rebuilds == 2
+        assert "orrin#0" in results["ids"][0]
+
+
+@pytest.mark.unit
+class TestLoreKeeperHybrid:
+    """Test LoreKeeperAgent in hybrid mode."""
+
+    async def test_agent_packs_fused_results(self):
+        """Test the file found only lexically reaches the lore context."""
+        from api_server import LoreKeeperAgent
+
+        class VectorOnly(FakeCollection):
+            def query(self, query_texts, n_results):
+                return vector_results("veyra#0")
+
+        collection = VectorOnly(DOCS)
+        agent = LoreKeeperAgent(collection, hybrid=HybridRetriever(collection, index=make_index()))
+
+        state = await agent({"user_input": "I look for Kormac"})
+
+        assert "Char_Kormac.md" in state["relevant_lore"]
+        assert "Kormac smuggles" in state["lore_context"]
@@ -0,0 +1,131 @@
+"""
+Tests for the LLM record/replay cassette layer.
+"""
+import time
+from types import SimpleNamespace
+from typing import TypedDict
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langgraph.graph import StateGraph, END
+
+from llm_cassette import Cassette, CassetteMiss
+
+
+class BrokenLLM:
+    """Fails if replay ever reaches the real model"""
+
+    async def ainvoke(self, prompt):
+        raise AssertionError("replay called the real model")
+
+    async def astream(self, prompt):
+        raise AssertionError("replay called the real model")
+        yield
+
+
+def record_one(path, prompt="Describe Karveth", reply="Sand and ruins."):
+    cassette = Cassette(path, "record")
+    llm = cassette.wrap(GenericFakeChatModel(messages=iter([AIMessage(content=reply)])), "claude")
+    return cassette, llm, prompt
+
+
+@pytest.mark.unit
+class TestCassette:
+    """Test recording, replaying and latency scaling."""
+
+    async def test_record_then_replay(self, tmp_path):
+        """Test a recorded response is served back without calling the model."""
+        path = tmp_path / "calls.jsonl"
+        cassette, llm, prompt = record_one(path)
+        assert (await llm.ainvoke(prompt)).content == "Sand and ruins."
+        assert cassette.recorded == 1
+
+        replay = Cassette(path, "replay", latency_scale=0)
+        response = await replay.wrap(BrokenLLM(), "claude").ainvoke(prompt)
+
+        assert response.content == "Sand and ruins."
+        assert replay.hits == 1
+
+    async def test_namespaces_and_misses(self, tmp_path):
+        """Test unknown prompts and other backends' recordings are misses."""
+        path = tmp_path / "calls.jsonl"
+        _, llm, prompt = record_one(path)
+        await llm.ainvoke(prompt)
+
+        replay = Cassette(path, "replay", latency_scale=0)
+        with pytest.raises(CassetteMiss):
+            await replay.wrap(BrokenLLM(), "claude").ainvoke("Something new")
+        with pytest.raises(CassetteMiss):
+            await replay.wrap(BrokenLLM(), "lmstudio").ainvoke(prompt)
+
+    async def test_latency_is_scaled(self, tmp_path):
+        """Test replay waits the recorded latency times the scale."""
+        cassette = Cassette(tmp_path / "calls.jsonl", "replay", latency_scale=0.5)
+        key = cassette.key("claude", "prompt")
+        cassette.entries[key] = {"key": key, "text": "Hi.", "latency_seconds": 0.4, "first_token_seconds": None}
+
+        start = time.perf_counter()
+        await cassette.wrap(BrokenLLM(), "claude").ainvoke("prompt")
+        elapsed = time.perf_counter() - start
+
+        assert 0.18 < elapsed < 0.35
+
+    async def test_replayed_stream_reaches_langgraph(self, tmp_path):
+        """Test replayed tokens show up in LangGraph's messages stream, like live ones."""
+        path = tmp_path / "calls.jsonl"
+        _, llm, prompt = record_one(path, reply="The wind howls tonight.")
+        async for _ in llm.astream(prompt):
+            pass
+
+        replay = Cassette(path, "replay", latency_scale=0).wrap(BrokenLLM(), "claude")
+
+        class State(TypedDict):
+            text: str
+
+        async def narrator(state):
+            text = ""
+            async for chunk in replay.astream(prompt):
+                text += chunk.text
+            return {"text": text}
+
+        graph = StateGraph(State)
+        graph.add_node("narrator", narrator)
+        graph.set_entry_point("narrator")
+        graph.add_edge("narrator", END)
+
+        tokens = [chunk.text async for chunk, _ in graph.compile().astream({"text": ""}, stream_mode="messages")]
+
+        assert "".join(tokens) == "The wind howls tonight."
+        assert len(tokens) > 1
+
+    def test_anthropic_client_wrapper(self, tmp_path):
+        """Test the raw SDK wrapper used by interactive_narrative.py."""
+        calls = []
+
+        def create(**kwargs):
+            calls.append(kwargs)
+            return SimpleNamespace(content=[SimpleNamespace(type="text", text="A storm rises.")])
+
+        client = SimpleNamespace(messages=SimpleNamespace(create=create))
+        path = tmp_path / "calls.jsonl"
+        request = {"model": "claude", "max_tokens": 600, "messages": [{"role": "user", "content": "Go"}]}
+
+        Cassette(path, "record").wrap_anthropic(client).messages.create(**request)
+        replayed = Cassette(path, "replay", latency_scale=0).wrap_anthropic(client).messages.create(**request)
+
+        assert replayed.content[0].text == "A storm rises."
+        assert len(calls) == 1
+
+    def test_from_settings(self, tmp_path):
+        """Test .env selection of the cassette mode."""
+        assert Cassette.from_settings({}) is None
+        assert Cassette.from_settings({"LLM_CASSETTE": "off"}) is None
+
+        cassette = Cassette.from_settings({"LLM_CASSETTE": "replay",
+                                           "LLM_CASSETTE_PATH": str(tmp_path / "c.jsonl"),
+                                           "LLM_CASSETTE_LATENCY_SCALE": "0.25"})
+        assert (cassette.mode, cassette.latency_scale) == ("replay", 0.25)
+
+        with pytest.raises(ValueError):
+            Cassette.from_settings({"LLM_CASSETTE": "rewind"})
@@ -0,0 +1,139 @@
+"""
+Tests for per-backend LLM concurrency limits and admission control.
+"""
+import asyncio
+from unittest.mock import patch, AsyncMock
+
+import pytest
+
+from llm_limiter import BackendLimiter, BackendSaturated, LimitedLLM
+
+
+class SlowLLM:
+    """Chat model stand-in that records its peak concurrency."""
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.active = 0
+        self.peak = 0
+
+    async def ainvoke(self, prompt):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.latency)
+        self.active -= 1
+        return prompt
+
+
+@pytest.mark.unit
+class TestBackendLimiter:
+    """Test the bounded concurrency and wait queue."""
+
+    async def test_concurrency_is_bounded(self):
+        """Test no more than max_concurrency calls run at once."""
+        llm = SlowLLM()
+        limited = LimitedLLM(llm, BackendLimiter("claude", max_concurrency=2, max_queue=10))
+
+        results = await asyncio.gather(*[limited.ainvoke(f"p{n}") for n in range(6)])
+
+        assert results == [f"p{n}" for n in range(6)]
+        assert llm.peak == 2
+
+    async def test_full_queue_rejects_fast(self):
+        """Test calls beyond the wait queue fail immediately with a Retry-After hint."""
+        limiter = BackendLimiter("lmstudio", max_concurrency=1, max_queue=1)
+        limited = LimitedLLM(SlowLLM(latency=0.2), limiter)
+
+        running = [asyncio.create_task(limited.ainvoke("p")) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        assert limiter.is_saturated()
+
+        with pytest.raises(BackendSaturated) as exc_info:
+            await limited.ainvoke("overflow")
+        assert exc_info.value.retry_after >= 1
+
+        await asyncio.gather(*running)
+        stats = limiter.stats()
+        assert stats["rejected"] == 1
+        assert stats["completed"] == 2
+        assert stats["in_flight"] == 0
+        assert stats["queued"] == 0
+
+    async def test_failed_call_releases_slot(self):
+        """Test an erroring call frees its slot and is counted."""
+        limiter = BackendLimiter("claude", max_concurrency=1, max_queue=0)
+
+        with pytest.raises(RuntimeError):
+            async with limiter.slot():
+                raise RuntimeError("provider error")
+
+        async with limiter.slot():
+            pass
+        assert limiter.stats()["failed"] == 1
+        assert limiter.stats()["completed"] == 1
+
+    def test_invalid_limits(self):
+        """Test nonsensical limits are rejected."""
+        with pytest.raises(ValueError):
+            BackendLimiter("claude", max_concurrency=0, max_queue=1)
+
+
+@pytest.mark.api
+class TestAdmissionControlAPI:
+    """Test saturated backends surface as 429 responses."""
+
+    def saturated_limiters(self):
+        limiter = BackendLimiter("claude", max_concurrency=1, max_queue=0)
+        limiter.in_flight = 1
+        limiter.avg_call_seconds = 3.0
+        return {"claude": limiter}
+
+    @patch('api_server.workflow_app', new_callable=AsyncMock)
+    def test_narrative_rejected_with_retry_after(self, mock_workflow, client):
+        """Test /narrative fails fast with 429 and doesn't touch the session."""
+        with patch('api_server.llm_limiters', self.saturated_limiters()):
+            response = client.post("/narrative", json={"user_input": "Hello", "session_id": "busy_session"})
+
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "3"
+        mock_workflow.ainvoke.assert_not_called()
+        assert client.get("/session/busy_session").status_code == 404
+
+    @patch('api_server.workflow_app', new_callable=AsyncMock)
+    def test_inline_quality_needs_claude_too(self, mock_workflow, client):
+        """Test an LM Studio turn is rejected up front when Claude can't take its quality review."""
+        limiters = dict(self.saturated_limiters(), lmstudio=BackendLimiter("lmstudio", max_concurrency=1, max_queue=0))
+        with patch('api_server.llm_limiters', limiters), patch('api_server.quality_mode', "inline"), \
+                patch('api_server.choose_backend', return_value="lmstudio"):
+            response = client.post("/narrative", json={"user_input": "Hello", "session_id": "busy_session"})
+
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "3"
+        mock_workflow.ainvoke.assert_not_called()
+
+    def test_background_quality_needs_only_the_narrator(self):
+        """Test a background-quality LM Studio turn is admitted while Claude is saturated."""
+        from api_server import admit, turn_backends
+
+        limiters = dict(self.saturated_limiters(), lmstudio=BackendLimiter("lmstudio", max_concurrency=1, max_queue=0))
+        with patch('api_server.llm_limiters', limiters), patch('api_server.quality_mode', "background"):
+            admit(*turn_backends("lmstudio"))
+
+        assert limiters["claude"].rejected == 0
+
+    def test_lore_extract_rejected(self, client):
+        """Test lore extraction is admission-controlled too."""
+        with patch('api_server.llm_limiters', self.saturated_limiters()):
+            response = client.post("/lore/extract", json={"narrative": "Lyssia flies north."})
+
+        assert response.status_code == 429
+
+    def test_limits_endpoint(self, client):
+        """Test per-backend gauges are exposed."""
+        response = client.get("/llm/limits")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert set(data) == {"claude", "lmstudio"}
+        assert data["claude"]["in_flight"] == 0
+        assert "queued" in data["lmstudio"]
@@ -0,0 +1,146 @@
+"""
+Tests for latency-aware LLM routing and health checks.
+"""
+import asyncio
+from unittest.mock import patch, AsyncMock
+
+import pytest
+
+from llm_limiter import BackendLimiter
+from llm_router import LLMRouter, TrackedLLM, BackendStats
+
+
+def make_router(policy, limiters=None):
+    router = LLMRouter(policy, limiters=limiters)
+    router.add_backend("claude", cost_rank=1)
+    router.add_backend("lmstudio", cost_rank=0, local=True)
+    return router
+
+
+class FlakyLLM:
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    async def ainvoke(self, prompt):
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise ConnectionError("LM Studio is down")
+        return prompt
+
+
+@pytest.mark.unit
+class TestLLMRouter:
+    """Test routing policies and backend health tracking."""
+
+    def test_prefix_overrides_policy(self):
+        """Test the 'lmstudio' prefix still forces LM Studio."""
+        router = make_router("claude")
+        router.stats["lmstudio"].record_probe(False, "connection refused")
+
+        assert router.choose("LMStudio describe the camp") == "lmstudio"
+        assert router.decisions[-1]["reason"] == "explicit prefix"
+
+    def test_claude_policy_keeps_old_behaviour(self):
+        """Test the default policy always narrates with Claude."""
+        router = make_router("claude")
+
+        assert router.choose("I look around") == "claude"
+
+    def test_prefer_local_falls_back_when_probe_fails(self):
+        """Test prefer_local uses LM Studio only while it is healthy."""
+        router = make_router("prefer_local")
+        assert router.choose("I look around") == "lmstudio"
+
+        router.stats["lmstudio"].record_probe(False, "connection refused")
+        assert router.choose("I look around") == "claude"
+        assert "lmstudio unavailable" in router.decisions[-1]["reason"]
+
+    def test_fastest_uses_rolling_latency(self):
+        """Test fastest picks the backend with the lower median latency."""
+        router = make_router("fastest")
+        for _ in range(5):
+            router.stats["claude"].record(1.5, ok=True)
+            router.stats["lmstudio"].record(4.0, ok=True)
+
+        assert router.choose("I look around") == "claude"
+
+    def test_saturated_backend_is_skipped(self):
+        """Test a full limiter queue spills turns to the other backend."""
+        lmstudio_limiter = BackendLimiter("lmstudio", max_concurrency=1, max_queue=0)
+        lmstudio_limiter.in_flight = 1
+        router = make_router("cheapest", limiters={"lmstudio": lmstudio_limiter})
+
+        assert router.choose("I look around") == "claude"
+
+    def test_consecutive_failures_trigger_cooldown(self):
+        """Test repeated call errors take a backend out of rotation."""
+        stats = BackendStats("lmstudio", failure_threshold=3, cooldown_seconds=60)
+        for _ in range(3):
+            stats.record(0.1, ok=False)
+
+        assert not stats.is_healthy()
+        assert stats.snapshot()["error_rate"] == 1.0
+
+        stats.record_probe(True)
+        assert stats.is_healthy()
+
+    async def test_tracked_llm_records_outcomes(self):
+        """Test wrapped calls feed latency and errors into the stats."""
+        stats = BackendStats("lmstudio")
+        ticks = iter([10.0, 10.25, 20.0, 20.5])  # start/finish of each call
+
+        def clock():
+            return next(ticks)
+
+        await TrackedLLM(FlakyLLM(), stats, clock=clock).ainvoke("hello")
+        with pytest.raises(ConnectionError):
+            await TrackedLLM(FlakyLLM(fail=True), stats, clock=clock).ainvoke("hello")
+
+        snapshot = stats.snapshot()
+        assert snapshot["calls"] == 2
+        assert snapshot["errors"] == 1
+        assert snapshot["p50_seconds"] == pytest.approx(0.25)  # only the successful call has a latency
+
+    async def test_health_probe_marks_backend(self):
+        """Test failed and passing probes update health."""
+        router = make_router("prefer_local")
+
+        async def refused():
+            raise ConnectionError("refused")
+
+        async def ok():
+            return None
+
+        await router.probe_once("lmstudio", refused)
+        assert router.diagnostics()["backends"]["lmstudio"]["probe_ok"] is False
+        assert router.choose("I wait") == "claude"
+
+        await router.probe_once("lmstudio", ok)
+        assert router.choose("I wait") == "lmstudio"
+
+    def test_unknown_policy_rejected(self):
+        """Test typos in the policy fail at startup."""
+        with pytest.raises(ValueError):
+            LLMRouter("quickest")
+
+
+@pytest.mark.api
+class TestRouterDiagnosticsAPI:
+    """Test the router diagnostics endpoint."""
+
+    @patch('api_server.workflow_app', new_callable=AsyncMock)
+    def test_decisions_visible(self, mock_workflow, client):
+        """Test a routed turn shows up in the diagnostics."""
+        mock_workflow.ainvoke.side_effect = lambda state: {
+            **state, "final_output": "ok", "narrative": "ok", "quality_check": "APPROVED"
+        }
+        client.post("/narrative", json={"user_input": "lmstudio hello", "session_id": "router_session"})
+
+        response = client.get("/llm/router")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert set(data["backends"]) == {"claude", "lmstudio"}
+        decision = data["recent_decisions"][-1]
+        assert decision == {**decision, "session_id": "router_session", "backend": "lmstudio"}
+        assert mock_workflow.ainvoke.call_args[0][0]["use_lmstudio"] is True
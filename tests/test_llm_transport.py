@@ -0,0 +1,145 @@
+"""
+Tests for the shared pooled LLM HTTP transport.
+"""
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from langchain_openai import ChatOpenAI
+
+from llm_transport import PooledChatAnthropic, build_async_client, warm_up, http2_available
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI/Anthropic-style endpoint that counts new connections"""
+    protocol_version = "HTTP/1.1"  # Keep-alive
+
+    def setup(self):
+        super().setup()
+        # Like real servers: don't let Nagle delay the body behind the headers
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.connections += 1
+
+    def _reply(self, body: dict):
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.endswith("/messages"):
+            self._reply({
+                "id": "msg_1", "type": "message", "role": "assistant", "model": "stub",
+                "content": [{"type": "text", "text": "The wind howls."}],
+                "stop_reason": "end_turn", "stop_sequence": None,
+                "usage": {"input_tokens": 5, "output_tokens": 3}
+            })
+        else:
+            self._reply({
+                "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "stub",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "The wind howls."}}],
+                "usage": {"prompt_tokens": 5, "completion_tokens": 3, "total_tokens": 8}
+            })
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.connections = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.unit
+class TestLLMTransport:
+    """Test one pool serves every LLM client and reuses connections."""
+
+    def test_http2_requires_h2(self):
+        """Test forcing HTTP/2 without h2 fails loudly instead of silently downgrading."""
+        if http2_available():
+            pytest.skip("h2 is installed")
+        with pytest.raises(RuntimeError):
+            build_async_client(http2=True)
+
+    async def test_clients_share_one_pool(self, stub_server):
+        """Test Claude and LM Studio calls reuse the same keep-alive connection."""
+        server, url = stub_server
+        client = build_async_client(http2=False)
+        claude = PooledChatAnthropic(model="stub", api_key="test", base_url=url,
+                                     max_tokens=50, http_async_client=client)
+        lmstudio = ChatOpenAI(base_url=f"{url}/v1", api_key="lm-studio", model="stub",
+                              http_async_client=client)
+
+        for _ in range(3):
+            assert (await claude.ainvoke("Describe the wind")).content == "The wind howls."
+            assert (await lmstudio.ainvoke("Describe the wind")).content == "The wind howls."
+
+        assert server.connections == 1
+        await client.aclose()
+
+    async def test_warm_up_opens_connections(self, stub_server):
+        """Test warm-up opens connections the first real call reuses."""
+        server, url = stub_server
+        client = build_async_client(http2=False)
+
+        results = await warm_up(client, [url, "http://127.0.0.1:9/"], connections=2, timeout=1)
+        warmed = server.connections
+        await client.post(f"{url}/v1/chat/completions", json={})
+
+        assert results[url] == 2
+        assert results["http://127.0.0.1:9/"] == 0
+        assert server.connections == warmed
+        await client.aclose()
+
+    @pytest.mark.slow
+    async def test_pooled_calls_reuse_one_connection(self, stub_server):
+        """Test pooled calls share one connection; the per-call timings are reported, not asserted."""
+        server, url = stub_server
+        calls = 200
+
+        async def run(client):
+            llm = ChatOpenAI(base_url=f"{url}/v1", api_key="lm-studio", model="stub",
+                             http_async_client=client)
+            await llm.ainvoke("warm")
+            start = time.perf_counter()
+            for _ in range(calls):
+                await llm.ainvoke("Describe the wind")
+            return (time.perf_counter() - start) / calls
+
+        pooled_client = build_async_client(http2=False)
+        server.connections = 0
+        pooled = await run(pooled_client)
+        pooled_connections = server.connections
+
+        # No idle connections kept: every call opens a new one
+        fresh_client = httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=0))
+        server.connections = 0
+        fresh = await run(fresh_client)
+        fresh_connections = server.connections
+
+        await pooled_client.aclose()
+        await fresh_client.aclose()
+
+        print(f"\n  {calls} calls: pooled {pooled * 1000:.2f} ms/call ({pooled_connections} connections), "
+              f"no keep-alive {fresh * 1000:.2f} ms/call ({fresh_connections} connections)")
+        assert pooled_connections == 1
+        assert fresh_connections >= calls
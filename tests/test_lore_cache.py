@@ -0,0 +1,149 @@
+"""
+Tests for the lore query embedding/result cache.
+"""
+import pytest
+
+from lore_cache import LRUCache, LoreQueryCache, normalize_query
+
+
+class CountingCollection:
+    """Collection that embeds client-side (like Chroma's), counting the work done"""
+
+    def __init__(self):
+        self.embedded = []
+        self.queries = 0
+        self._embed = self.embed
+
+    def embed(self, input, is_query=False):
+        self.embedded.extend(input)
+        return [[float(len(t)), 1.0] for t in input]
+
+    def query(self, query_embeddings=None, query_texts=None, n_results=5):
+        self.queries += 1
+        return {"documents": [[f"doc for {query_embeddings or query_texts}"]],
+                "metadatas": [[{"filename": "Karveth.md"}]], "distances": [[0.2]]}
+
+
+@pytest.mark.unit
+class TestLRUCache:
+    """Test eviction order and stats."""
+
+    def test_least_recently_used_is_evicted(self):
+        """Test a read refreshes an entry so the older one is evicted instead."""
+        cache = LRUCache("test", 2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1
+        cache.put("c", 3)
+
+        assert cache.get("b") is None
+        assert (cache.get("a"), cache.get("c")) == (1, 3)
+        stats = cache.stats()
+        assert (stats["size"], stats["evictions"], stats["hits"], stats["misses"]) == (2, 1, 3, 1)
+        assert stats["hit_rate"] == 0.75
+
+    def test_zero_size_disables(self):
+        """Test a zero-size level stores nothing."""
+        cache = LRUCache("test", 0)
+        cache.put("a", 1)
+        assert cache.get("a") is None and len(cache) == 0
+
+
+@pytest.mark.unit
+class TestLoreQueryCache:
+    """Test the two cache levels and version invalidation."""
+
+    def test_normalization(self):
+        """Test trivial rephrasings share a key."""
+        assert normalize_query("  I walk  to Karveth. ") == normalize_query("i walk to karveth!") == "i walk to karveth"
+
+    def test_repeat_query_is_served_from_results(self):
+        """Test a repeated (normalized) query neither embeds nor searches again."""
+        collection = CountingCollection()
+        cache = LoreQueryCache()
+
+        first = cache.query(collection, "I walk to Karveth", 12)
+        second = cache.query(collection, "i walk to karveth.", 12)
+
+        assert second is first
+        assert (len(collection.embedded), collection.queries) == (1, 1)
+        assert cache.stats()["result"]["hits"] == 1
+
+    def test_version_bump_reuses_embedding(self):
+        """Test ingestion retires cached results but the query embedding is reused."""
+        collection = CountingCollection()
+        version = {"value": 0}
+        cache = LoreQueryCache(version=lambda: version["value"])
+
+        cache.query(collection, "I walk to Karveth", 12)
+        version["value"] += 1
+        cache.query(collection, "I walk to Karveth", 12)
+
+        assert collection.queries == 2
+        assert len(collection.embedded) == 1
+        assert cache.stats()["embedding"]["hits"] == 1
+
+    def test_n_results_is_part_of_the_key(self):
+        """Test different top-k requests don't share results."""
+        collection = CountingCollection()
+        cache = LoreQueryCache()
+        cache.query(collection, "Karveth", 5)
+        cache.query(collection, "Karveth", 12)
+        assert collection.queries == 2
+
+    def test_collection_without_client_embedding(self):
+        """Test collections without a client-side embedding step still get result caching."""
+        collection = CountingCollection()
+        collection._embed = None
+        cache = LoreQueryCache()
+
+        cache.query(collection, "Karveth", 5)
+        cache.query(collection, "Karveth", 5)
+
+        assert collection.queries == 1 and collection.embedded == []
+
+
+@pytest.mark.unit
+class TestChromaIntegration:
+    """Test the embedding level against a real Chroma collection."""
+
+    def test_cached_path_matches_plain_query(self, tmp_path):
+        """Test querying by cached embedding returns what query_texts= would."""
+        import chromadb
+        from chromadb.api.client import SharedSystemClient
+        from chromadb.config import Settings
+        from benchmarks.hashing_embeddings import HashingEmbeddingFunction
+        from benchmarks.synthetic_lore import generate_vault, seed_collection
+
+        client = chromadb.PersistentClient(path=str(tmp_path / "chroma"), settings=Settings(anonymized_telemetry=False))
+        try:
+            collection = client.create_collection("lore", embedding_function=HashingEmbeddingFunction())
+            seed_collection(collection, generate_vault(30))
+            cache = LoreQueryCache()
+
+            cached = cache.query(collection, "the silver skyship", 5)
+            plain = collection.query(query_texts=["the silver skyship"], n_results=5)
+
+            assert cached["ids"] == plain["ids"]
+            assert cache.stats()["embedding"]["size"] == 1
+        finally:
+            SharedSystemClient.clear_system_cache()
+
+
+@pytest.mark.unit
+class TestLoreKeeperCaching:
+    """Test LoreKeeperAgent goes through the cache."""
+
+    async def test_agent_uses_cache(self):
+        """Test two turns with the same input search once."""
+        from api_server import LoreKeeperAgent
+
+        collection = CountingCollection()
+        agent = LoreKeeperAgent(collection, cache=LoreQueryCache())
+
+        first = await agent({"user_input": "I walk to Karveth"})
+        second = await agent({"user_input": "I walk to Karveth!"})
+
+        assert collection.queries == 1
+        assert first["lore_context"] == second["lore_context"]
+        assert second["relevant_lore"] == ["Karveth.md"]
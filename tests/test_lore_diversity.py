@@ -0,0 +1,164 @@
+"""
+Tests for maximal marginal relevance reranking.
+"""
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from lore_diversity import MMRReranker, mmr_select, relevance_scores
+
+# Three near-identical Karveth chunks, then two distinct files
+VECTORS = {
+    "karveth#0": [1.0, 0.0, 0.0],
+    "karveth_notes#0": [0.99, 0.05, 0.0],
+    "karveth_draft#0": [0.98, 0.0, 0.05],
+    "veyra#0": [0.3, 1.0, 0.0],
+    "windrunner#0": [0.3, 0.0, 1.0],
+}
+
+
+class EmbeddingCollection:
+    """Collection stand-in that serves stored embeddings by id and answers queries in VECTORS order"""
+
+    def __init__(self, vectors):
+        self.vectors = dict(vectors)
+        self.queries = []
+
+    def get(self, ids=None, include=None):
+        found = [i for i in ids if i in self.vectors]
+        return {"ids": found, "embeddings": np.array([self.vectors[i] for i in found]) if found else None}
+
+    def query(self, query_texts, n_results):
+        self.queries.append(n_results)
+        ids = list(self.vectors)[:n_results]
+        return {"ids": [ids], "documents": [[f"About {i}." for i in ids]],
+                "metadatas": [[{"filename": i.split("#")[0] + ".md"} for i in ids]],
+                "distances": [[0.1 * (rank + 1) for rank in range(len(ids))]]}
+
+
+class PagedCollection(EmbeddingCollection):
+    """Also pages out everything, as NumpyVectorIndex.load() reads it; counts by-id lookups"""
+
+    def __init__(self, vectors):
+        super().__init__(vectors)
+        self.lookups = 0
+
+    def get(self, ids=None, include=None, limit=None, offset=0):
+        if ids is not None:
+            self.lookups += 1
+            return super().get(ids=ids, include=include)
+        page = list(self.vectors)[offset:offset + limit]
+        return {"ids": page, "embeddings": np.array([self.vectors[i] for i in page]),
+                "documents": [f"About {i}." for i in page],
+                "metadatas": [{"filename": i.split("#")[0] + ".md"} for i in page]}
+
+
+def results_for(ids, distances=None):
+    return {"ids": [list(ids)], "documents": [[f"About {i}." for i in ids]],
+            "metadatas": [[{"filename": i.split("#")[0] + ".md"} for i in ids]],
+            "distances": [distances or [0.1 * (rank + 1) for rank in range(len(ids))]]}
+
+
+@pytest.mark.unit
+class TestMMRSelect:
+    """Test the greedy selection."""
+
+    def test_skips_near_duplicates(self):
+        """Test the distinct files are picked before more copies of the best one."""
+        vectors = np.array(list(VECTORS.values()), dtype=np.float32)
+        relevance = np.array([1.0, 0.95, 0.9, 0.6, 0.5])
+
+        assert mmr_select(relevance, vectors, 3, 0.5) == [0, 3, 4]
+
+    def test_lambda_one_is_relevance_order(self):
+        """Test lambda 1 ignores redundancy."""
+        vectors = np.array(list(VECTORS.values()), dtype=np.float32)
+        relevance = np.array([1.0, 0.95, 0.9, 0.6, 0.5])
+
+        assert mmr_select(relevance, vectors, 3, 1.0) == [0, 1, 2]
+
+    def test_missing_vectors_are_never_duplicates(self):
+        """Test a zero row keeps its relevance and k is capped by the candidates."""
+        vectors = np.array([[1.0, 0.0], [1.0, 0.0], [0.0, 0.0]], dtype=np.float32)
+
+        assert mmr_select(np.array([1.0, 0.9, 0.8]), vectors, 5, 0.5) == [0, 2, 1]
+
+    def test_relevance_scores(self):
+        """Test fused scores win over distances, and ranks are the fallback."""
+        assert relevance_scores(results_for(["a", "b"], [0.2, 0.5])) == pytest.approx([1.0, 0.8])
+        fused = dict(results_for(["a", "b"]), distances=None, scores=[[0.04, 0.01]])
+        assert relevance_scores(fused) == pytest.approx([1.0, 0.25])
+        ranked = dict(results_for(["a", "b"]), distances=None)
+        assert relevance_scores(ranked, rrf_k=1) == pytest.approx([1.0, 2 / 3])
+
+
+@pytest.mark.unit
+class TestMMRReranker:
+    """Test reranking retrieved results."""
+
+    def test_keeps_k_diverse_chunks(self):
+        """Test the result is cut to k, in MMR order, with each chunk's documents and distance."""
+        reranker = MMRReranker(EmbeddingCollection(VECTORS), lambda_mult=0.5, k=3, fetch_k=5)
+
+        reranked = reranker.rerank(results_for(VECTORS))
+
+        assert reranked["ids"][0] == ["karveth#0", "veyra#0", "windrunner#0"]
+        assert reranked["documents"][0][1] == "About veyra#0."
+        assert reranked["distances"][0] == pytest.approx([0.1, 0.4, 0.5])
+        assert reranker.stats()["reranks"] == 1
+
+    def test_unknown_ids_and_short_results(self):
+        """Test chunks the collection lacks stay eligible, and k or fewer results pass through."""
+        reranker = MMRReranker(EmbeddingCollection(VECTORS), k=2, fetch_k=4)
+        results = results_for(["karveth#0", "karveth_notes#0", "wiki:sky/lyssia.md#0"])
+
+        assert reranker.rerank(results)["ids"][0] == ["karveth#0", "wiki:sky/lyssia.md#0"]
+        assert reranker.rerank(results_for(["karveth#0"])) is not None
+        assert reranker.rerank(results_for(["a", "b"]))["ids"][0] == ["a", "b"]
+
+
+    def test_vectors_from_the_numpy_index(self):
+        """Test an active NumpyVectorIndex serves the vectors, so reranking makes no Chroma lookup."""
+        from vector_index import NumpyVectorIndex
+
+        collection = PagedCollection(VECTORS)
+        reranker = MMRReranker(NumpyVectorIndex(collection), lambda_mult=0.5, k=3, fetch_k=5)
+
+        reranked = reranker.rerank(results_for(VECTORS))
+        vectors = reranker.embeddings(["veyra#0", "wiki:sky/lyssia.md#0"])
+
+        assert reranked["ids"][0] == ["karveth#0", "veyra#0", "windrunner#0"]
+        assert vectors[0] == pytest.approx(VECTORS["veyra#0"]) and not vectors[1].any()
+        assert reranker.embeddings(["wiki:sky/lyssia.md#0"]) is None
+        assert collection.lookups == 0
+
+
+@pytest.mark.unit
+class TestLoreKeeperMMR:
+    """Test LoreKeeperAgent over-fetches and reranks."""
+
+    async def test_agent_packs_distinct_files(self):
+        """Test fetch_k candidates are retrieved and only the diverse k reach the packer."""
+        from api_server import LoreKeeperAgent
+
+        collection = EmbeddingCollection(VECTORS)
+        agent = LoreKeeperAgent(collection, n_results=3, mmr=MMRReranker(collection, k=3, fetch_k=5))
+
+        state = await agent({"user_input": "Tell me about Karveth", "session_id": "s1"})
+
+        assert collection.queries == [5]
+        assert state["relevant_lore"] == ["karveth.md", "veyra.md", "windrunner.md"]
+
+
+@pytest.mark.api
+class TestRetrievalStats:
+    """Test MMR shows up in the retrieval stats."""
+
+    def test_mmr_stats(self, client):
+        """Test /lore/retrieval reports the reranker's settings and timing."""
+        reranker = MMRReranker(EmbeddingCollection(VECTORS), lambda_mult=0.3, k=4, fetch_k=16)
+        with patch('api_server.lore_mmr', reranker):
+            stats = client.get("/lore/retrieval").json()
+
+        assert stats["mmr"] == {"lambda": 0.3, "k": 4, "fetch_k": 16, "reranks": 0, "mean_ms": None}
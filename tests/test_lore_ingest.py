@@ -0,0 +1,383 @@
+"""
+Tests for heading-aware lore chunking, chunk stitching and incremental indexing.
+"""
+import os
+from unittest.mock import patch
+
+import pytest
+
+from context_packer import estimate_tokens
+from lore_ingest import (LoreIndexer, chunk_markdown, ingest_files, read_manifest_fingerprint, split_sections,
+                         stitch_chunks)
+
+LYSSIA = """# Lyssia
+
+Lyssia is an Aeth pilot from the floating city of Veyra.
+
+## Skyship
+
+She flies the Windrunner, a skyship with silver sails. The ship was a gift from her mentor.
+
+### Crew
+
+Two deckhands and a cartographer named Orrin.
+
+```
+# not a heading
+```
+
+## Rivals
+
+Her rival is Kormac, a smuggler who operates out of the Karveth ruins."""
+
+
+def long_section(sentences: int = 40) -> str:
+    body = " ".join(f"Sentence {i} tells of the desert wind and the buried reactor." for i in range(sentences))
+    return f"# Karveth\n\n## History\n\n{body}\n"
+
+
+@pytest.mark.unit
+class TestChunking:
+    """Test markdown is split on headings with breadcrumbs and overlap."""
+
+    def test_sections_follow_heading_levels(self):
+        """Test each section knows the headings it sits under, and code blocks are not headings."""
+        paths = [path for path, _, _ in split_sections(LYSSIA)]
+
+        assert paths == [["Lyssia"], ["Lyssia", "Skyship"], ["Lyssia", "Skyship", "Crew"], ["Lyssia", "Rivals"]]
+        assert "# not a heading" in split_sections(LYSSIA)[2][2]
+
+    def test_chunks_carry_file_and_section_metadata(self):
+        """Test short sections become one chunk each, prefixed with their breadcrumb."""
+        chunks = chunk_markdown(LYSSIA, "characters/Lyssia.md")
+
+        assert [c["id"] for c in chunks] == [f"characters/Lyssia.md#{i}" for i in range(4)]
+        crew = chunks[2]
+        assert crew["document"].startswith("Lyssia > Skyship > Crew\n\n")
+        assert crew["metadata"]["filename"] == "Lyssia.md"
+        assert crew["metadata"]["filepath"] == "characters/Lyssia.md"
+        assert crew["metadata"]["heading"] == "### Crew"
+
+    def test_long_sections_split_with_overlap(self):
+        """Test chunks stay near the budget and repeat the previous chunk's last sentences."""
+        chunks = chunk_markdown(long_section(), "Karveth.md", max_tokens=80, overlap_tokens=20)
+
+        assert len(chunks) > 3
+        for chunk in chunks:
+            assert estimate_tokens(chunk["document"]) <= 80 + 20 + 10
+        second = chunks[1]
+        overlap = second["document"].split("\n\n", 1)[1][:second["metadata"]["overlap_chars"]].strip()
+        assert overlap and overlap in chunks[0]["document"]
+
+
+@pytest.mark.unit
+class TestStitching:
+    """Test retrieved chunks are regrouped per file."""
+
+    def test_adjacent_chunks_rejoin_without_repeating_overlap(self):
+        """Test stitching all chunks of a file gives back each sentence exactly once."""
+        chunks = chunk_markdown(long_section(), "Karveth.md", max_tokens=80, overlap_tokens=20)
+        shuffled = list(reversed(chunks))
+
+        documents, _ = stitch_chunks([c["document"] for c in shuffled], [c["metadata"] for c in shuffled])
+
+        assert [source for source, _ in documents] == ["Karveth.md"]
+        text = documents[0][1]
+        assert text.startswith("## History")
+        for i in range(40):
+            assert text.count(f"Sentence {i} tells") == 1
+
+    def test_files_ordered_by_best_chunk(self):
+        """Test files rank by their closest chunk, gaps are marked and whole-file documents pass through."""
+        chunks = chunk_markdown(LYSSIA, "Lyssia.md")
+        picked = [chunks[3], {"document": "Karveth lies in the desert.", "metadata": {"filename": "Karveth.md"}},
+                  chunks[0]]
+
+        documents, distances = stitch_chunks([c["document"] for c in picked], [c["metadata"] for c in picked],
+                                             [0.6, 0.4, 0.9])
+
+        assert [source for source, _ in documents] == ["Karveth.md", "Lyssia.md"]
+        assert distances == [0.4, 0.6]
+        assert documents[0][1] == "Karveth lies in the desert."
+        lyssia = documents[1][1]
+        assert "\n\n...\n\n## Rivals\n" in lyssia
+        assert lyssia.index("Aeth pilot") < lyssia.index("Kormac")
+
+
+class FakeCollection:
+    def __init__(self):
+        self.rows = {}
+        self.upserted = []
+
+    def upsert(self, ids, documents, metadatas):
+        self.upserted.extend(ids)
+        self.rows.update({i: (d, m) for i, d, m in zip(ids, documents, metadatas)})
+
+    def delete(self, ids):
+        for i in ids:
+            self.rows.pop(i, None)
+
+    def get(self, include=None):
+        return {"ids": list(self.rows)}
+
+
+@pytest.mark.unit
+class TestIngest:
+    """Test vault files are chunked into a collection."""
+
+    def test_ingest_files_batches_all_chunks(self, tmp_path):
+        """Test every chunk of every file is written, across batch boundaries."""
+        (tmp_path / "characters").mkdir()
+        (tmp_path / "characters" / "Lyssia.md").write_text(LYSSIA, encoding="utf-8")
+        (tmp_path / "Karveth.md").write_text(long_section(), encoding="utf-8")
+        collection = FakeCollection()
+
+        written = ingest_files(collection, tmp_path, sorted(tmp_path.rglob("*.md")),
+                               max_tokens=80, overlap_tokens=20, batch_size=3)
+
+        assert written == len(collection.rows) > 4
+        assert "characters/Lyssia.md#0" in collection.rows
+
+
+@pytest.fixture
+def vault(tmp_path):
+    lore_dir = tmp_path / "_Lore"
+    (lore_dir / "characters").mkdir(parents=True)
+    (lore_dir / "characters" / "Lyssia.md").write_text(LYSSIA, encoding="utf-8")
+    (lore_dir / "Karveth.md").write_text(long_section(), encoding="utf-8")
+    return lore_dir
+
+
+def make_indexer(vault, collection, **options):
+    return LoreIndexer(collection, vault, vault.parent / "chroma" / "lore_manifest.json",
+                       max_tokens=80, overlap_tokens=20, **options)
+
+
+@pytest.mark.unit
+class TestIncrementalIndex:
+    """Test the manifest-driven sync only re-embeds what changed."""
+
+    def test_second_sync_embeds_nothing(self, vault):
+        """Test an unchanged vault (even with a fresh indexer) causes no embedding."""
+        collection = FakeCollection()
+        first = make_indexer(vault, collection).sync()
+        collection.upserted.clear()
+
+        second = make_indexer(vault, collection).sync()
+
+        assert first["added"] == 2
+        assert (second["unchanged"], second["chunks_written"]) == (2, 0)
+        assert collection.upserted == []
+
+    def test_listeners_hear_syncs_that_change_the_collection(self, vault):
+        """Test sync listeners run after a sync that wrote something, and not after a no-op."""
+        indexer = make_indexer(vault, FakeCollection())
+        calls = []
+        indexer.sync_listeners.append(lambda: calls.append(indexer.version))
+
+        indexer.sync()
+        indexer.sync()
+        (vault / "Karveth.md").write_text("# Karveth\n\nOnly sand remains.\n", encoding="utf-8")
+        indexer.sync(["Karveth.md"])
+
+        assert calls == [1, 2]
+
+    def test_changed_file_shrinks_in_place(self, vault):
+        """Test a shortened file is re-embedded and its leftover chunks deleted."""
+        collection = FakeCollection()
+        indexer = make_indexer(vault, collection)
+        indexer.sync()
+        before = [i for i in collection.rows if i.startswith("Karveth.md#")]
+
+        (vault / "Karveth.md").write_text("# Karveth\n\nOnly sand remains.\n", encoding="utf-8")
+        collection.upserted.clear()
+        report = indexer.sync()
+
+        assert report["changed"] == 1 and report["unchanged"] == 1
+        assert collection.upserted == ["Karveth.md#0"]
+        assert [i for i in collection.rows if i.startswith("Karveth.md#")] == ["Karveth.md#0"]
+        assert len(before) > 1
+
+    def test_touched_but_identical_file_is_skipped(self, vault):
+        """Test an mtime-only change is resolved by the content hash."""
+        collection = FakeCollection()
+        indexer = make_indexer(vault, collection)
+        indexer.sync()
+        path = vault / "characters" / "Lyssia.md"
+        os.utime(path, (path.stat().st_atime, path.stat().st_mtime + 60))
+        collection.upserted.clear()
+
+        assert indexer.sync()["chunks_written"] == 0
+        assert indexer.manifest["files"]["characters/Lyssia.md"]["mtime"] == path.stat().st_mtime
+
+    def test_fingerprint_follows_content(self, vault):
+        """Test the fingerprint matches the saved manifest and changes only when a file's content does."""
+        indexer = make_indexer(vault, FakeCollection())
+        indexer.sync()
+        first = indexer.fingerprint()
+        assert read_manifest_fingerprint(indexer.manifest_path) == first
+
+        path = vault / "Karveth.md"
+        os.utime(path, (path.stat().st_atime, path.stat().st_mtime + 60))
+        indexer.sync()
+        assert indexer.fingerprint() == first
+
+        path.write_text("# Karveth\n\nOnly sand remains.\n", encoding="utf-8")
+        indexer.sync()
+        assert indexer.fingerprint() != first
+        assert read_manifest_fingerprint(vault / "missing.json") is None
+
+    def test_removed_file_and_old_whole_file_documents_are_deleted(self, vault):
+        """Test deleted files lose their vectors and a first sync clears an older unchunked index."""
+        collection = FakeCollection()
+        collection.upsert(ids=["Lyssia"], documents=[LYSSIA], metadatas=[{"filename": "Lyssia.md"}])
+        indexer = make_indexer(vault, collection)
+
+        assert indexer.sync()["leftovers_removed"] == 1
+        (vault / "Karveth.md").unlink()
+        report = indexer.sync()
+
+        assert report["removed"] == 1
+        assert all(i.startswith("characters/Lyssia.md#") for i in collection.rows)
+        assert "Karveth.md" not in indexer.manifest["files"]
+
+    def test_path_subset_and_chunking_change(self, vault):
+        """Test a sync limited to given paths, and that new chunk settings redo every file."""
+        collection = FakeCollection()
+        make_indexer(vault, collection).sync()
+        (vault / "New.md").write_text("# New\n\nA fresh page.\n", encoding="utf-8")
+
+        report = make_indexer(vault, collection).sync(["New.md"])
+        assert (report["added"], report["unchanged"]) == (1, 0)
+
+        rechunked = LoreIndexer(collection, vault, vault.parent / "chroma" / "lore_manifest.json",
+                                max_tokens=400, overlap_tokens=0).sync()
+        assert rechunked["changed"] == 3
+        expected = len(chunk_markdown(long_section(), "Karveth.md", max_tokens=400, overlap_tokens=0))
+        assert len([i for i in collection.rows if i.startswith("Karveth.md#")]) == expected
+
+    def test_paths_outside_the_vault_are_rejected(self, vault):
+        """Test a sync limited to paths refuses anything outside the lore folder or not markdown."""
+        (vault.parent / "secret").mkdir()
+        (vault.parent / "secret" / ".env").write_text("ANTHROPIC_API_KEY=sk-secret-123\n", encoding="utf-8")
+        (vault.parent / "Outside.md").write_text("# Outside\n\nNot lore.\n", encoding="utf-8")
+        (vault / "notes.txt").write_text("Scratch notes.\n", encoding="utf-8")
+        collection = FakeCollection()
+        indexer = make_indexer(vault, collection)
+
+        for path in ["../secret/.env", "../Outside.md", str(vault.parent / "Outside.md"), "notes.txt"]:
+            with pytest.raises(ValueError):
+                indexer.sync([path])
+
+        assert collection.rows == {} and indexer.manifest["files"] == {}
+        assert indexer.check_paths(["characters/../Karveth.md"]) == ["Karveth.md"]
+
+
+class FailingCollection(FakeCollection):
+    """Stops working after a number of upserts, like an interrupted ingestion"""
+
+    def __init__(self, upserts: int):
+        super().__init__()
+        self.batches = []
+        self.remaining = upserts
+
+    def upsert(self, ids, documents, metadatas):
+        if self.remaining == 0:
+            raise KeyboardInterrupt
+        self.remaining -= 1
+        self.batches.append(len(ids))
+        super().upsert(ids, documents, metadatas)
+
+
+@pytest.mark.unit
+class TestStreamingSync:
+    """Test fixed-size batches, progress, checkpoints and parallel embedding."""
+
+    def test_fixed_batches_and_progress(self, vault):
+        """Test chunks are written in batch_size batches and progress is reported per batch."""
+        collection = FailingCollection(upserts=-1)
+        updates = []
+
+        report = make_indexer(vault, collection, batch_size=3).sync(progress=updates.append)
+
+        assert set(collection.batches[:-1]) == {3} and collection.batches[-1] <= 3
+        assert updates[-1]["files_done"] == updates[-1]["files_total"] == 2
+        assert updates[-1]["chunks_written"] == report["chunks_written"] == len(collection.rows)
+        assert report["chunks_per_second"] > 0
+
+    def test_interrupted_sync_resumes(self, vault):
+        """Test files written before an interruption are kept; the next sync embeds only the rest."""
+        (vault / "Aeth.md").write_text("# Aeth\n\nThe Aeth live in floating cities.\n", encoding="utf-8")
+        collection = FailingCollection(upserts=1)
+
+        with pytest.raises(KeyboardInterrupt):
+            make_indexer(vault, collection, batch_size=1, checkpoint_seconds=0).sync()
+
+        # Aeth.md was written whole; the others never finished
+        resumed = make_indexer(vault, FakeCollection())
+        assert list(resumed.manifest["files"]) == ["Aeth.md"]
+        report = resumed.sync()
+        assert (report["added"], report["unchanged"]) == (2, 1)
+
+    @pytest.mark.slow
+    def test_parallel_embeddings_match(self, vault, tmp_path):
+        """Test worker processes produce the same vectors Chroma would have computed."""
+        import chromadb
+        import numpy as np
+        from chromadb.api.client import SharedSystemClient
+        from chromadb.config import Settings
+        from benchmarks.hashing_embeddings import HashingEmbeddingFunction
+
+        client = chromadb.PersistentClient(path=str(tmp_path / "chroma_data"),
+                                           settings=Settings(anonymized_telemetry=False))
+        try:
+            collection = client.create_collection(name="doammo_lore", embedding_function=HashingEmbeddingFunction())
+            with patch("lore_ingest.PARALLEL_MIN_FILES", 1):
+                report = make_indexer(vault, collection, batch_size=4, workers=2).sync()
+
+            stored = collection.get(include=["documents", "embeddings"])
+            expected = HashingEmbeddingFunction()(stored["documents"])
+            assert report["workers"] == 2
+            assert report["chunks_written"] == collection.count() > 4
+            assert np.allclose(stored["embeddings"], expected, atol=1e-6)
+        finally:
+            SharedSystemClient.clear_system_cache()
+
+
+@pytest.mark.api
+class TestReindexEndpoint:
+    """Test the in-place reindex endpoint on the running server."""
+
+    def test_reindex_without_vault(self, client):
+        """Test 503 when no vault is configured."""
+        with patch('api_server.lore_indexer', None):
+            assert client.post("/lore/reindex").status_code == 503
+
+    def test_reindex_reports_changes(self, client, vault):
+        """Test a sync through the API, then a path-limited one."""
+        indexer = make_indexer(vault, FakeCollection())
+
+        with patch('api_server.lore_indexer', indexer):
+            first = client.post("/lore/reindex").json()
+            (vault / "Karveth.md").write_text("# Karveth\n\nOnly sand remains.\n", encoding="utf-8")
+            second = client.post("/lore/reindex", json={"paths": ["Karveth.md"]}).json()
+            status = client.get("/lore/index").json()
+
+        assert first["sync"]["added"] == 2
+        assert (second["sync"]["changed"], second["sync"]["unchanged"]) == (1, 0)
+        assert status["files"] == 2 and status["last_sync"]["changed"] == 1
+
+    def test_reindex_rejects_paths_outside_the_vault(self, client, vault):
+        """Test 400 for a path that escapes the lore folder, with nothing indexed."""
+        (vault.parent / "secret").mkdir()
+        (vault.parent / "secret" / ".env").write_text("ANTHROPIC_API_KEY=sk-secret-123\n", encoding="utf-8")
+        collection = FakeCollection()
+        indexer = make_indexer(vault, collection)
+
+        with patch('api_server.lore_indexer', indexer):
+            response = client.post("/lore/reindex", json={"paths": ["../secret/.env"]})
+            not_a_list = client.post("/lore/reindex", json={"paths": "Karveth.md"})
+
+        assert response.status_code == 400
+        assert not_a_list.status_code == 400
+        assert collection.rows == {} and indexer.manifest["files"] == {}
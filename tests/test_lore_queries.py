@@ -0,0 +1,176 @@
+"""
+Tests for conversation-aware multi-query lore retrieval.
+"""
+import pytest
+
+from lore_cache import LoreQueryCache, split_rows
+from lore_queries import SubQueryBuilder, merge_rows, named_entities
+
+NARRATIVE = ("Lyssia waits by the door of the Gilded Anchor. Slowly, she glances back at you. "
+             "Inside, the Captain of the Guard counts coins. Lyssia slips past him.")
+HISTORY = [
+    {"role": "user", "content": "I walk to the harbour."},
+    {"role": "assistant", "content": NARRATIVE},
+    {"role": "user", "content": "I follow her inside."}
+]
+
+FILES = {"lyssia": "Lyssia.md", "gilded": "Gilded_Anchor.md", "guard": "Captain_of_the_Guard.md"}
+
+
+def row(*ids, distances=None):
+    return {"ids": [list(ids)], "documents": [[f"text of {i}" for i in ids]],
+            "metadatas": [[{"filename": f"{i}.md"} for i in ids]],
+            "distances": [distances or [0.5] * len(ids)]}
+
+
+class BatchCollection:
+    """Answers each query text with the file whose key it mentions, counting calls"""
+
+    def __init__(self):
+        self.calls = []
+        self.embedded = []
+
+    def _embed(self, input, is_query=False):
+        self.embedded.append(list(input))
+        return [[float(len(text))] for text in input]
+
+    def query(self, query_texts=None, query_embeddings=None, n_results=5):
+        texts = query_texts or [str(e) for e in query_embeddings]
+        self.calls.append(texts)
+        rows = []
+        for text in texts:
+            keys = [key for key in FILES if key in text.lower()] or ["noise"]
+            rows.append(keys[:n_results])
+        return {"ids": rows, "documents": [[f"About {k}." for k in r] for r in rows],
+                "metadatas": [[{"filename": FILES.get(k, "Noise.md")} for k in r] for r in rows],
+                "distances": [[0.4] * len(r) for r in rows], "included": ["documents", "metadatas", "distances"]}
+
+
+@pytest.mark.unit
+class TestSubQueries:
+    """Test entity extraction and sub-query building."""
+
+    def test_named_entities(self):
+        """Test names are found at sentence starts, openers and articles are not names."""
+        assert named_entities(NARRATIVE) == ["Lyssia", "Captain of the Guard", "Gilded Anchor"]
+
+    def test_build_from_history(self):
+        """Test the raw input comes first, then the context query, then the names."""
+        queries = SubQueryBuilder(context_tokens=20).build("I follow her inside.", HISTORY)
+
+        assert queries[0] == "I follow her inside."
+        assert queries[1].endswith("Lyssia slips past him. I follow her inside.")
+        assert "Lyssia waits" not in queries[1]  # only the end of the message fits
+        assert queries[2:] == ["Lyssia", "Captain of the Guard", "Gilded Anchor"]
+
+    def test_names_in_the_input_and_limits(self):
+        """Test names the player already used aren't repeated, and max_entities caps the rest."""
+        queries = SubQueryBuilder(max_entities=1).build("I ask Lyssia about it", HISTORY)
+        assert queries[2:] == ["Captain of the Guard"]
+
+    def test_no_history(self):
+        """Test the first turn of a session searches with the input alone."""
+        assert SubQueryBuilder().build("I wake up", []) == ["I wake up"]
+
+
+@pytest.mark.unit
+class TestMergeRows:
+    """Test merging the rows of a batched query."""
+
+    def test_split_rows(self):
+        """Test a batched result becomes one single-query result per row."""
+        first, second = split_rows({"ids": [["a"], ["b"]], "documents": [["A"], ["B"]],
+                                    "metadatas": [[{}], [{}]], "distances": [[0.1], [0.2]], "embeddings": None})
+        assert (first["ids"], second["documents"], second["distances"]) == ([["a"]], [["B"]], [[0.2]])
+        assert second["embeddings"] is None
+
+    def test_dedupes_and_fuses(self):
+        """Test a chunk found by several sub-queries appears once, ranked first, with its best distance."""
+        merged = merge_rows([row("noise", "lyssia", distances=[0.3, 0.9]),
+                             row("lyssia", "gilded", distances=[0.2, 0.6])], 3)
+
+        assert merged["ids"][0] == ["lyssia", "noise", "gilded"]
+        assert merged["distances"][0][0] == 0.2
+        assert merged["metadatas"][0][0] == {"filename": "lyssia.md"}
+
+    def test_single_row_passes_through(self):
+        """Test one query's results are returned as they are."""
+        results = row("lyssia")
+        assert merge_rows([results], 3) is results
+
+    def test_n_results_bounds_the_merge(self):
+        """Test the merged result is cut to n_results."""
+        assert len(merge_rows([row("a", "b"), row("c", "d")], 3)["ids"][0]) == 3
+
+
+@pytest.mark.unit
+class TestBatchedCache:
+    """Test LoreQueryCache.fetch_many."""
+
+    def test_one_embed_and_one_query_for_the_misses(self):
+        """Test uncached texts are embedded together and searched in one call; each row is cached."""
+        collection = BatchCollection()
+        cache = LoreQueryCache()
+        cache.query(collection, "Lyssia", 5)
+
+        rows = cache.fetch_many(collection, ["Lyssia", "Gilded Anchor", "Guard"], 5)
+
+        assert collection.embedded == [["lyssia"], ["gilded anchor", "guard"]]
+        assert len(collection.calls) == 2 and len(collection.calls[1]) == 3
+        assert len(rows) == 3
+        assert cache.cached("Guard", 5) is rows[2]
+
+
+@pytest.mark.unit
+class TestLoreKeeperMultiQuery:
+    """Test LoreKeeperAgent with conversation-aware sub-queries."""
+
+    async def test_follow_up_finds_the_referent(self):
+        """Test a pronoun-only input retrieves the file named in the narrator's last message."""
+        from api_server import LoreKeeperAgent
+
+        class Session:
+            conversation_history = HISTORY
+
+        collection = BatchCollection()
+        agent = LoreKeeperAgent(collection, query_builder=SubQueryBuilder(), conv_managers={"s1": Session()})
+
+        state = await agent({"user_input": "I follow her inside.", "session_id": "s1"})
+
+        assert len(collection.calls) == 1 and len(collection.calls[0]) == 5
+        assert "Lyssia.md" in state["relevant_lore"]
+        assert "About lyssia." in state["lore_context"]
+
+    async def test_without_builder_input_only(self):
+        """Test the default agent still searches with the player's input alone."""
+        from api_server import LoreKeeperAgent
+
+        collection = BatchCollection()
+        await LoreKeeperAgent(collection)({"user_input": "I follow her inside.", "session_id": "s1"})
+
+        assert collection.calls == [["I follow her inside."]]
+
+
+@pytest.mark.unit
+class TestMergeByDistance:
+    """Test merging results from different collections."""
+
+    def test_nearest_first(self):
+        """Test chunks from both collections interleave by distance."""
+        from lore_queries import merge_by_distance
+
+        merged = merge_by_distance([row("karveth", "veyra", distances=[0.3, 0.6]),
+                                    row("wiki:lyssia", distances=[0.4])], 3)
+
+        assert merged["ids"][0] == ["karveth", "wiki:lyssia", "veyra"]
+        assert merged["distances"][0] == [0.3, 0.4, 0.6]
+
+    def test_without_distances_falls_back_to_ranks(self):
+        """Test fused (distance-less) results are merged by rank."""
+        from lore_queries import merge_by_distance
+
+        fused = dict(row("karveth"), distances=None)
+        merged = merge_by_distance([fused, row("wiki:lyssia")], 3)
+
+        assert merged["ids"][0] == ["karveth", "wiki:lyssia"]
+        assert merged["distances"] is None
@@ -0,0 +1,157 @@
+"""
+Tests for the background vault watcher.
+"""
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from lore_ingest import LoreIndexer
+from lore_watcher import VaultWatcher, watchfiles_available
+
+
+class FakeCollection:
+    def __init__(self):
+        self.rows = {}
+
+    def upsert(self, ids, documents, metadatas):
+        self.rows.update(zip(ids, documents))
+
+    def delete(self, ids):
+        for i in ids:
+            self.rows.pop(i, None)
+
+    def get(self, include=None):
+        return {"ids": list(self.rows)}
+
+
+class RecordingIndexer:
+    """Stands in for LoreIndexer and records what each sync was asked to do"""
+
+    def __init__(self, lore_dir, failures: int = 0):
+        self.lore_dir = lore_dir
+        self.calls = []
+        self.failures = failures
+
+    def sync(self, paths=None):
+        self.calls.append(sorted(paths) if paths is not None else None)
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk busy")
+        return {"changed": len(paths or [])}
+
+
+@pytest.fixture
+def lore_dir(tmp_path):
+    path = tmp_path / "_Lore"
+    path.mkdir()
+    (path / "Karveth.md").write_text("# Karveth\n\nThe ruins lie in the desert.\n", encoding="utf-8")
+    return path
+
+
+async def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.02)
+
+
+def karveth_text(collection) -> str:
+    return "".join(doc for i, doc in collection.rows.items() if i.startswith("Karveth.md#"))
+
+
+@pytest.mark.unit
+class TestVaultWatcher:
+    """Test debouncing, freshness and end-to-end pickup of edits."""
+
+    async def test_burst_of_edits_is_one_sync(self, lore_dir):
+        """Test edits arriving within the debounce window are synced together."""
+        indexer = RecordingIndexer(lore_dir)
+        watcher = VaultWatcher(indexer, debounce=0.1, max_delay=5, poll_interval=60, backend="poll")
+        watcher.start()
+        try:
+            await wait_for(lambda: watcher.initial_sync_done)
+            for i in range(5):
+                watcher.notify([f"page_{i}.md"])
+                await asyncio.sleep(0.02)
+            assert watcher.freshness()["pending_files"] == 5
+            await wait_for(lambda: len(indexer.calls) == 2)
+        finally:
+            await watcher.stop()
+
+        assert indexer.calls == [None, [f"page_{i}.md" for i in range(5)]]
+        assert watcher.freshness()["lag_seconds"] == 0.0
+
+    async def test_max_delay_bounds_continuous_edits(self, lore_dir):
+        """Test a steady stream of edits still gets synced after max_delay."""
+        indexer = RecordingIndexer(lore_dir)
+        watcher = VaultWatcher(indexer, debounce=0.2, max_delay=0.3, poll_interval=60, backend="poll")
+        watcher.start()
+        try:
+            await wait_for(lambda: watcher.initial_sync_done)
+            start = time.monotonic()
+            while len(indexer.calls) < 2:
+                watcher.notify(["Karveth.md"])
+                await asyncio.sleep(0.05)
+                assert time.monotonic() - start < 2
+        finally:
+            await watcher.stop()
+
+    async def test_failed_sync_is_retried(self, lore_dir):
+        """Test a failed sync is retried and the error is reported."""
+        indexer = RecordingIndexer(lore_dir, failures=1)
+        watcher = VaultWatcher(indexer, debounce=0.05, max_delay=0.1, poll_interval=60, backend="poll")
+        watcher.start()
+        try:
+            await wait_for(lambda: watcher.initial_sync_done)  # The first attempt fails
+            watcher.notify(["Karveth.md"])
+            await wait_for(lambda: len(indexer.calls) == 3)
+        finally:
+            await watcher.stop()
+
+        assert indexer.calls == [None, None, ["Karveth.md"]]
+        assert watcher.errors == 1
+        assert "disk busy" in watcher.freshness()["last_error"]
+
+    @pytest.mark.parametrize("backend", [
+        "poll",
+        pytest.param("watchfiles", marks=pytest.mark.skipif(not watchfiles_available(),
+                                                            reason="watchfiles not installed"))
+    ])
+    async def test_edit_reaches_the_index(self, lore_dir, backend):
+        """Test editing, adding and deleting vault files updates the collection within seconds."""
+        collection = FakeCollection()
+        indexer = LoreIndexer(collection, lore_dir, lore_dir.parent / "manifest.json")
+        watcher = VaultWatcher(indexer, debounce=0.1, max_delay=1, poll_interval=0.1, backend=backend)
+        watcher.start()
+        try:
+            await wait_for(lambda: "ruins" in karveth_text(collection))
+            await asyncio.sleep(0.2)  # Let the watcher settle before editing
+
+            (lore_dir / "Karveth.md").write_text("# Karveth\n\nA sandstorm buried the ruins.\n", encoding="utf-8")
+            (lore_dir / "Lyssia.md").write_text("# Lyssia\n\nAn Aeth pilot.\n", encoding="utf-8")
+            await wait_for(lambda: "sandstorm" in karveth_text(collection) and "Lyssia.md#0" in collection.rows)
+
+            (lore_dir / "Lyssia.md").unlink()
+            await wait_for(lambda: "Lyssia.md#0" not in collection.rows)
+        finally:
+            await watcher.stop()
+
+        assert watcher.freshness()["pending_files"] == 0
+        assert watcher.errors == 0
+
+
+@pytest.mark.api
+class TestHealthFreshness:
+    """Test /health reports watcher freshness."""
+
+    def test_health_includes_lore_index(self, client, lore_dir):
+        """Test the lore_index block appears when a watcher is running."""
+        watcher = VaultWatcher(RecordingIndexer(lore_dir), backend="poll")
+        with patch('api_server.lore_watcher', watcher):
+            data = client.get("/health").json()
+
+        assert data["lore_index"]["backend"] == "poll"
+        assert data["lore_index"]["pending_files"] == 0
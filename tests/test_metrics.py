@@ -0,0 +1,88 @@
+"""
+Tests for workflow instrumentation and the /metrics endpoint.
+"""
+from unittest.mock import patch, AsyncMock
+
+import pytest
+
+from metrics import MetricsRegistry, AGENT_SECONDS, DISK_WRITE_SECONDS, LLM_CALLS, timed
+from llm_router import BackendStats, TrackedLLM
+
+
+class EchoLLM:
+    async def ainvoke(self, prompt):
+        return type("Response", (), {"content": f"Echo: {prompt}"})()
+
+
+@pytest.mark.unit
+class TestMetrics:
+    """Test histogram/counter maths and the exposition format."""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test each observation lands in every bucket at or above it."""
+        registry = MetricsRegistry()
+        histogram = registry.histogram("test_seconds", "Test", ["node"], buckets=(0.1, 1.0))
+
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value, node="narrator")
+
+        text = registry.render()
+        assert '# TYPE test_seconds histogram' in text
+        assert 'test_seconds_bucket{node="narrator",le="0.1"} 1' in text
+        assert 'test_seconds_bucket{node="narrator",le="1"} 2' in text
+        assert 'test_seconds_bucket{node="narrator",le="+Inf"} 3' in text
+        assert 'test_seconds_count{node="narrator"} 3' in text
+
+    def test_labels_must_match(self):
+        """Test observing with the wrong labels fails instead of mixing series."""
+        registry = MetricsRegistry()
+        counter = registry.counter("test_total", "Test", ["backend"])
+
+        with pytest.raises(ValueError):
+            counter.inc(node="narrator")
+
+    async def test_timed_records_outcome(self):
+        """Test wrapped agents are timed for both success and failure."""
+        @timed("test_agent")
+        async def flaky(fail):
+            if fail:
+                raise RuntimeError("boom")
+            return "ok"
+
+        before_ok = AGENT_SECONDS.count(agent="test_agent", outcome="ok")
+        assert await flaky(False) == "ok"
+        with pytest.raises(RuntimeError):
+            await flaky(True)
+
+        assert AGENT_SECONDS.count(agent="test_agent", outcome="ok") == before_ok + 1
+        assert AGENT_SECONDS.count(agent="test_agent", outcome="error") >= 1
+
+    async def test_tracked_llm_counts_calls(self):
+        """Test per-backend call counts and prompt sizes are recorded."""
+        llm = TrackedLLM(EchoLLM(), BackendStats("metrics_test"))
+
+        await llm.ainvoke("Describe the ruins of Karveth")
+
+        assert LLM_CALLS.value(backend="metrics_test", outcome="ok") == 1
+
+
+@pytest.mark.api
+class TestMetricsAPI:
+    """Test /metrics exposes workflow and disk timings."""
+
+    @patch('api_server.workflow_app', new_callable=AsyncMock)
+    def test_metrics_endpoint(self, mock_workflow, client):
+        """Test a turn's session write shows up in /metrics."""
+        mock_workflow.ainvoke.return_value = {
+            "narrative": "The camp is quiet.", "final_output": "The camp is quiet.",
+            "relevant_lore": [], "quality_check": "APPROVED"
+        }
+        before = DISK_WRITE_SECONDS.count(target="session")
+        client.post("/narrative", json={"user_input": "I look around", "session_id": "metrics_session"})
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "doammo_disk_write_seconds_bucket" in response.text
+        assert DISK_WRITE_SECONDS.count(target="session") > before
@@ -1,19 +1,23 @@
 """
 Tests for Narrative API endpoint.
 """
+import json
+import time
+
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
 
 
 @pytest.mark.api
 class TestNarrativeEndpoint:
     """Test narrative generation endpoint."""
 
-    @patch('api_server.workflow_app')
+    @patch('api_server.workflow_app', new_callable=AsyncMock)
     def test_narrative_generation_new_session(self, mock_workflow, client, sample_narrative_request):
         """Test narrative generation with new session."""
         # Mock the workflow response - must match NarrativeState structure
-        mock_workflow.invoke.return_value = {
+        mock_workflow.ainvoke.return_value = {
             "user_input": sample_narrative_request["user_input"],
             "session_id": "test_session",
             "relevant_lore": ["Ancient Ruins", "Northern Territory"],
@@ -40,10 +44,10 @@ class TestNarrativeEndpoint:
         # Verify session was created
         assert data["session_id"] is not None
 
-    @patch('api_server.workflow_app')
+    @patch('api_server.workflow_app', new_callable=AsyncMock)
     def test_narrative_generation_existing_session(self, mock_workflow, client):
         """Test narrative generation with existing session."""
-        mock_workflow.invoke.return_value = {
+        mock_workflow.ainvoke.return_value = {
             "user_input": "I continue forward",
             "session_id": "existing_session_123",
             "relevant_lore": [],
@@ -65,10 +69,10 @@ class TestNarrativeEndpoint:
         data = response.json()
         assert data["session_id"] == "existing_session_123"
 
-    @patch('api_server.workflow_app')
+    @patch('api_server.workflow_app', new_callable=AsyncMock)
     def test_narrative_empty_input(self, mock_workflow, client):
         """Test narrative generation with empty input."""
-        mock_workflow.invoke.return_value = {
+        mock_workflow.ainvoke.return_value = {
             "user_input": "",
             "session_id": "test_session",
             "relevant_lore": [],
@@ -83,17 +87,17 @@ class TestNarrativeEndpoint:
         # Should handle empty input gracefully
         assert response.status_code in [200, 400]
 
-    @patch('api_server.workflow_app')
+    @patch('api_server.workflow_app', new_callable=AsyncMock)
     def test_narrative_invalid_request(self, mock_workflow, client):
         """Test narrative generation with invalid request."""
         response = client.post("/narrative", json={})
 
         assert response.status_code == 422  # Validation error
 
-    @patch('api_server.workflow_app')
+    @patch('api_server.workflow_app', new_callable=AsyncMock)
     def test_narrative_with_lore_context(self, mock_workflow, client):
         """Test that narrative includes lore context."""
-        mock_workflow.invoke.return_value = {
+        mock_workflow.ainvoke.return_value = {
             "user_input": "I examine the inscriptions",
             "session_id": "test_session",
             "relevant_lore": ["Ancient Texts", "Historical Records"],
@@ -114,21 +118,21 @@ class TestNarrativeEndpoint:
         data = response.json()
         assert len(data["lore_used"]) > 0
 
-    @patch('api_server.workflow_app')
+    @patch('api_server.workflow_app', new_callable=AsyncMock)
     def test_narrative_workflow_error_handling(self, mock_workflow, client, sample_narrative_request):
         """Test narrative endpoint handles workflow errors gracefully."""
         # Mock workflow to raise an error
-        mock_workflow.invoke.side_effect = Exception("Workflow error")
+        mock_workflow.ainvoke.side_effect = Exception("Workflow error")
 
         response = client.post("/narrative", json=sample_narrative_request)
 
         # Should return error response
         assert response.status_code == 500
 
-    @patch('api_server.workflow_app')
+    @patch('api_server.workflow_app', new_callable=AsyncMock)
     def test_narrative_long_conversation(self, mock_workflow, client):
         """Test narrative generation in a long conversation."""
-        mock_workflow.invoke.return_value = {
+        mock_workflow.ainvoke.return_value = {
             "user_input": "Action",
             "session_id": "test_session",
             "relevant_lore": [],
@@ -157,6 +161,146 @@ class TestNarrativeEndpoint:
         assert session_id is not None
 
 
+def parse_sse(body):
+    """Split a text/event-stream body into (event, data) pairs."""
+    events = []
+    for frame in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in frame.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def make_stream_workflow(narrative="The ancient ruins loom before you.", quality="APPROVED: good"):
+    """Build the real workflow on fake streaming chat models."""
+    from api_server import LoreKeeperAgent, NarratorAgent, QualityAgent, build_workflow, conv_managers
+
+    collection = MagicMock()
+    collection.query.return_value = {
+        "documents": [["Ruins lore"]],
+        "metadatas": [[{"filename": "Ancient_Ruins.md"}]],
+    }
+    narrator_llm = GenericFakeChatModel(messages=iter([narrative]))
+    quality_llm = GenericFakeChatModel(messages=iter([quality]))
+    return build_workflow(
+        LoreKeeperAgent(collection),
+        NarratorAgent(narrator_llm, narrator_llm, conv_managers),
+        QualityAgent(quality_llm),
+    )
+
+
+@pytest.mark.api
+class TestNarrativeStreamEndpoint:
+    """Test the Server-Sent Events narrative endpoint."""
+
+    def test_stream_event_order(self, client, sample_narrative_request):
+        """Test lore arrives first, then tokens, then quality and done."""
+        with patch('api_server.workflow_app', make_stream_workflow()):
+            response = client.post("/narrative/stream", json=sample_narrative_request)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+
+        events = parse_sse(response.text)
+        names = [name for name, _ in events]
+        assert names[0] == "lore"
+        assert names[-2:] == ["quality", "done"]
+        assert names.count("token") > 1
+
+        assert events[0][1]["lore_used"] == ["Ancient_Ruins.md"]
+        streamed = "".join(data["text"] for name, data in events if name == "token")
+        done = events[-1][1]
+        assert streamed == done["narrative"] == "The ancient ruins loom before you."
+        assert done["quality_check"] == "APPROVED: good"
+
+    def test_stream_saves_history(self, client):
+        """Test the streamed narrative is recorded in the session."""
+        request_data = {"user_input": "I enter the ruins", "session_id": "stream_session"}
+        with patch('api_server.workflow_app', make_stream_workflow()):
+            client.post("/narrative/stream", json=request_data)
+
+        response = client.get("/session/stream_session")
+        assert response.json()["message_count"] == 2
+
+    @patch('api_server.workflow_app')
+    def test_stream_error_event(self, mock_workflow, client, sample_narrative_request):
+        """Test workflow failures are reported as an error event."""
+        mock_workflow.astream.side_effect = Exception("Workflow error")
+
+        response = client.post("/narrative/stream", json=sample_narrative_request)
+
+        events = parse_sse(response.text)
+        assert events == [("error", {"detail": "Workflow error"})]
+
+
+def workflow_result(session_id, narrative="You step into the ruins.", quality_check="APPROVED: good"):
+    """Workflow output for a mocked turn."""
+    return {
+        "user_input": "I enter",
+        "session_id": session_id,
+        "relevant_lore": [],
+        "lore_context": "",
+        "narrative": narrative,
+        "quality_check": quality_check,
+        "final_output": narrative,
+        "use_lmstudio": False
+    }
+
+
+@pytest.mark.api
+class TestQualityReview:
+    """Test quality verdicts stored on session messages."""
+
+    @patch('api_server.workflow_app', new_callable=AsyncMock)
+    def test_inline_verdict_stored(self, mock_workflow, client):
+        """Test inline mode stores the verdict returned with the response."""
+        mock_workflow.ainvoke.return_value = workflow_result("quality_inline")
+
+        response = client.post("/narrative", json={"user_input": "I enter", "session_id": "quality_inline"})
+        assert response.json()["quality_check"] == "APPROVED: good"
+
+        response = client.get("/session/quality_inline/quality/1")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "complete"
+        assert data["quality_check"] == "APPROVED: good"
+
+    @patch('api_server.quality_agent', new_callable=AsyncMock)
+    @patch('api_server.workflow_app', new_callable=AsyncMock)
+    def test_background_verdict_arrives_later(self, mock_workflow, mock_quality, client):
+        """Test background mode returns PENDING and stores the verdict afterwards."""
+        mock_workflow.ainvoke.return_value = workflow_result("quality_bg", quality_check="")
+        mock_quality.side_effect = lambda state: {**state, "quality_check": "NEEDS REVISION: too short"}
+
+        with patch('api_server.quality_mode', "background"):
+            response = client.post("/narrative", json={"user_input": "I enter", "session_id": "quality_bg"})
+        assert response.status_code == 200
+        assert response.json()["quality_check"] == "PENDING"
+
+        for _ in range(50):
+            data = client.get("/session/quality_bg/quality/1").json()
+            if data["status"] != "pending":
+                break
+            time.sleep(0.01)
+
+        assert data["status"] == "complete"
+        assert data["quality_check"] == "NEEDS REVISION: too short"
+        mock_quality.assert_awaited_once()
+
+    @patch('api_server.workflow_app', new_callable=AsyncMock)
+    def test_quality_invalid_index(self, mock_workflow, client):
+        """Test user messages and out-of-range indexes are rejected."""
+        mock_workflow.ainvoke.return_value = workflow_result("quality_index")
+        client.post("/narrative", json={"user_input": "I enter", "session_id": "quality_index"})
+
+        assert client.get("/session/quality_index/quality/0").status_code == 400
+        assert client.get("/session/quality_index/quality/5").status_code == 400
+
+    def test_quality_unknown_session(self, client):
+        """Test unknown sessions return 404."""
+        response = client.get("/session/no_such_session/quality/1")
+        assert response.status_code == 404
+
+
 @pytest.mark.api
 class TestHealthEndpoint:
     """Test health check endpoint."""
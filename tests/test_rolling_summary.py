@@ -0,0 +1,226 @@
+"""
+Tests for the per-session rolling summary memory.
+"""
+import time
+from unittest.mock import patch, AsyncMock
+
+import pytest
+
+from api_server import ConversationManager, NarratorAgent, SummaryAgent
+from context_packer import ContextPacker, estimate_tokens
+
+
+class FakeMessage:
+    def __init__(self, content):
+        self.content = content
+
+
+class RecordingLLM:
+    """Async chat model stand-in that remembers its prompts."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.prompts = []
+
+    async def ainvoke(self, prompt):
+        self.prompts.append(prompt)
+        return FakeMessage(self.reply)
+
+
+def fill_session(session_id, turns):
+    conv_manager = ConversationManager(session_id)
+    for n in range(turns):
+        conv_manager.add_message('user', f"I take step {n} along the canyon path.")
+        conv_manager.add_message('assistant', f"You reach waypoint {n} as the wind rises.")
+    return conv_manager
+
+
+@pytest.mark.unit
+class TestRollingSummary:
+    """Test summary bookkeeping on ConversationManager."""
+
+    def test_backlog_is_messages_outside_window(self):
+        """Test messages that leave the recent window are queued for folding."""
+        conv_manager = fill_session("summary_backlog", 5)
+        packer = ContextPacker(history_tokens=40)
+
+        start, end = conv_manager.summary_backlog(packer)
+        window = packer.pack_history(conv_manager.conversation_history)
+
+        assert start == 0
+        assert 0 < end <= len(conv_manager.conversation_history) - len(window)
+
+    def test_long_backlog_folds_a_window_at_a_time(self):
+        """Test a session with no summary yet folds at most one history budget per call."""
+        conv_manager = fill_session("summary_capped", 10)
+        packer = ContextPacker(history_tokens=40)
+        window_start = len(conv_manager.conversation_history) - len(packer.pack_history(conv_manager.conversation_history))
+
+        start, end = conv_manager.summary_backlog(packer)
+        fold = packer.pack_fold(conv_manager.conversation_history[start:end])
+        assert len(fold) == end - start < window_start
+        assert sum(estimate_tokens(m['content']) + 2 for m in fold) <= 40
+
+        conv_manager.apply_summary("The first steps.", end)
+        assert conv_manager.summary_backlog(packer)[0] == end  # the rest folds on later turns
+
+    def test_oversized_message_is_trimmed(self):
+        """Test a single message over the budget still folds, cut to whole sentences."""
+        long = {"role": "assistant", "content": "The wind howls. " * 50}
+        fold = ContextPacker(history_tokens=20).pack_fold([long, long])
+
+        assert len(fold) == 1
+        assert 0 < len(fold[0]['content']) < len(long['content'])
+
+    def test_oversized_single_sentence_is_sliced(self):
+        """Test a message whose first sentence alone overruns the budget still folds its beginning."""
+        long = {"role": "assistant", "content": "The wind howls " * 50 + "across the dunes."}
+        fold = ContextPacker(history_tokens=20).pack_fold([long])
+
+        assert len(fold) == 1
+        assert fold[0]['content'] == long['content'][:18 * 4]
+
+    async def test_fold_retired_by_undo_during_the_call(self):
+        """Test a fold over turns undone (and replaced) while it ran never reaches the summary."""
+        import asyncio
+        from api_server import summarize_in_background
+
+        class GatedLLM(RecordingLLM):
+            def __init__(self, reply):
+                super().__init__(reply)
+                self.release = asyncio.Event()
+
+            async def ainvoke(self, prompt):
+                await self.release.wait()
+                return await super().ainvoke(prompt)
+
+        conv_manager = fill_session("summary_undo_fold", 3)
+        llm = GatedLLM("They reached waypoint 1.")
+        with patch('api_server.context_packer', ContextPacker(history_tokens=30)), \
+                patch('api_server.summary_agent', SummaryAgent(llm)):
+            fold = asyncio.create_task(summarize_in_background(conv_manager))
+            await asyncio.sleep(0)
+            end = conv_manager.fold_end
+            assert end
+
+            conv_manager.truncate(end - 1)  # undo into the window being folded
+            conv_manager.add_message('user', "I turn back instead.")
+            conv_manager.add_message('assistant', "You retreat.")
+            llm.release.set()
+            await fold
+
+        assert end <= len(conv_manager.conversation_history)  # would have fit without the epoch
+        assert (conv_manager.summary, conv_manager.summarized_count) == ("", 0)
+        assert conv_manager.fold_end is None
+
+    def test_stale_fold_rejected_after_reset(self):
+        """Test a fold started before the summary was discarded is not applied."""
+        conv_manager = fill_session("summary_epoch", 3)
+        epoch = conv_manager.summary_epoch
+        conv_manager.reset_summary()
+
+        assert not conv_manager.apply_summary("Old telling.", 2, epoch)
+        assert conv_manager.apply_summary("New telling.", 2, conv_manager.summary_epoch)
+
+    def test_summary_persisted_with_session(self):
+        """Test the summary survives reloading the session file."""
+        conv_manager = fill_session("summary_persist", 3)
+
+        assert conv_manager.apply_summary("Lyssia crossed the canyon.", 4)
+
+        reloaded = ConversationManager("summary_persist")
+        assert reloaded.summary == "Lyssia crossed the canyon."
+        assert reloaded.summarized_count == 4
+        assert reloaded.summary_backlog(ContextPacker(history_tokens=10))[0] == 4
+
+    def test_summary_discarded_after_undo(self):
+        """Test a summary covering undone messages is not applied."""
+        conv_manager = fill_session("summary_undo", 2)
+        conv_manager.conversation_history = conv_manager.conversation_history[:2]
+
+        assert not conv_manager.apply_summary("Stale summary", 4)
+        assert conv_manager.summary == ""
+
+    async def test_fold_includes_previous_summary_and_new_events(self):
+        """Test the Chronicler prompt carries both the old summary and new turns."""
+        llm = RecordingLLM("  Updated summary.  ")
+        agent = SummaryAgent(llm)
+
+        summary = await agent.fold("Lyssia left Veyra.", [
+            {"role": "user", "content": "I land at Karveth"},
+            {"role": "assistant", "content": "Dust swirls around the skyship."}
+        ])
+
+        assert summary == "Updated summary."
+        assert "Lyssia left Veyra." in llm.prompts[0]
+        assert "Player: I land at Karveth" in llm.prompts[0]
+        assert "Narrator: Dust swirls" in llm.prompts[0]
+
+    async def test_narrator_prompt_carries_summary(self):
+        """Test the narrator sees the summary plus the recent window."""
+        conv_manager = fill_session("summary_prompt", 1)
+        conv_manager.apply_summary("Lyssia stole the star map.", 0)
+        llm = RecordingLLM("Narrative")
+        narrator = NarratorAgent(llm, llm, {"summary_prompt": conv_manager})
+
+        await narrator({
+            "user_input": "I open the map",
+            "session_id": "summary_prompt",
+            "lore_context": "",
+            "use_lmstudio": False
+        })
+
+        assert "STORY SO FAR:\nLyssia stole the star map." in llm.prompts[0]
+        assert "waypoint 0" in llm.prompts[0]
+
+
+@pytest.mark.api
+class TestRollingSummaryAPI:
+    """Test summaries are maintained in the background as a session grows."""
+
+    @patch('api_server.workflow_app', new_callable=AsyncMock)
+    def test_old_turns_folded_in_background(self, mock_workflow, client):
+        """Test overflowing turns end up in the persisted summary."""
+        async def turn(state):
+            reply = f"The story continues after '{state['user_input']}'."
+            return {**state, "narrative": reply, "final_output": reply, "quality_check": "APPROVED"}
+
+        mock_workflow.ainvoke.side_effect = turn
+        chronicler = SummaryAgent(RecordingLLM("Many steps were taken."))
+
+        with patch('api_server.context_packer', ContextPacker(history_tokens=40)), \
+                patch('api_server.summary_agent', chronicler):
+            for n in range(4):
+                response = client.post("/narrative", json={
+                    "user_input": f"I take step {n}", "session_id": "summary_api"
+                })
+                assert response.status_code == 200
+
+            from api_server import conv_managers
+            conv_manager = conv_managers["summary_api"]
+            for _ in range(50):
+                if conv_manager.summarized_count:
+                    break
+                time.sleep(0.01)
+
+        assert conv_manager.summary == "Many steps were taken."
+        assert conv_manager.summarized_count > 0
+
+    def test_editing_a_summarized_message_discards_the_summary(self, client):
+        """Test /edit of a folded message resets the summary so it is rebuilt from the new text."""
+        from api_server import ConversationManager, conv_managers
+
+        conv_manager = fill_session("summary_edit", 3)
+        conv_manager.apply_summary("Lyssia crossed the canyon.", 4)
+        conv_managers["summary_edit"] = conv_manager
+
+        with patch('api_server.summary_agent', None):
+            assert client.post("/session/summary_edit/edit",
+                               json={"message_index": 5, "new_content": "You rest."}).status_code == 200
+            assert conv_manager.summarized_count == 4  # not folded yet: the summary stands
+
+            assert client.post("/session/summary_edit/edit",
+                               json={"message_index": 1, "new_content": "You turn back."}).status_code == 200
+
+        assert (conv_manager.summary, conv_manager.summarized_count) == ("", 0)
+        assert ConversationManager("summary_edit").summary == ""
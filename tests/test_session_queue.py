@@ -0,0 +1,120 @@
+"""
+Tests for per-session turn serialization.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, AsyncMock
+
+import pytest
+
+from session_queue import SessionTurnQueue
+
+
+@pytest.mark.unit
+class TestSessionTurnQueue:
+    """Test the per-session FIFO lock layer."""
+
+    async def test_same_session_runs_in_order(self):
+        """Test turns on one session never overlap and keep arrival order."""
+        queue = SessionTurnQueue()
+        events = []
+
+        async def turn(n):
+            async with queue.turn("s1"):
+                events.append(("start", n))
+                await asyncio.sleep(0.01)
+                events.append(("end", n))
+
+        await asyncio.gather(*[turn(n) for n in range(4)])
+
+        assert events == [(kind, n) for n in range(4) for kind in ("start", "end")]
+
+    async def test_different_sessions_run_in_parallel(self):
+        """Test separate sessions don't wait for each other."""
+        queue = SessionTurnQueue()
+
+        async def turn(session_id):
+            async with queue.turn(session_id):
+                await asyncio.sleep(0.1)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[turn(f"s{n}") for n in range(5)])
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 0.3
+
+    async def test_stats_report_queue_depth(self):
+        """Test queued turns show up in stats and idle sessions are dropped."""
+        queue = SessionTurnQueue()
+        release = asyncio.Event()
+
+        async def turn():
+            async with queue.turn("s1"):
+                await release.wait()
+
+        tasks = [asyncio.create_task(turn()) for _ in range(3)]
+        await asyncio.sleep(0.01)
+
+        stats = queue.stats()
+        assert stats["sessions"] == {"s1": 3}
+        assert stats["queued_turns"] == 2
+        assert stats["max_depth_seen"] == 3
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+        stats = queue.stats()
+        assert stats["active_sessions"] == 0
+        assert stats["turns_completed"] == 3
+        assert queue.depth("s1") == 0
+
+    async def test_lock_released_on_error(self):
+        """Test a failing turn doesn't block the session."""
+        queue = SessionTurnQueue()
+
+        with pytest.raises(RuntimeError):
+            async with queue.turn("s1"):
+                raise RuntimeError("boom")
+
+        async with queue.turn("s1"):
+            pass
+        assert queue.depth("s1") == 0
+
+
+@pytest.mark.api
+class TestSessionSerializationAPI:
+    """Test concurrent requests on one session keep history consistent."""
+
+    @patch('api_server.workflow_app', new_callable=AsyncMock)
+    def test_concurrent_turns_do_not_interleave(self, mock_workflow, client):
+        """Test each user message is directly followed by its own response."""
+        async def slow_turn(state):
+            await asyncio.sleep(0.05)
+            return {**state, "narrative": f"Reply to {state['user_input']}",
+                    "final_output": f"Reply to {state['user_input']}", "quality_check": "APPROVED"}
+
+        mock_workflow.ainvoke.side_effect = slow_turn
+
+        def send(n):
+            return client.post("/narrative", json={"user_input": f"Action {n}", "session_id": "queue_session"})
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            responses = list(pool.map(send, range(4)))
+        assert all(r.status_code == 200 for r in responses)
+
+        from api_server import conv_managers
+        history = conv_managers["queue_session"].conversation_history
+        assert len(history) == 8
+        for user_msg, ai_msg in zip(history[::2], history[1::2]):
+            assert user_msg["role"] == "user"
+            assert ai_msg["content"] == f"Reply to {user_msg['content']}"
+
+    def test_queue_stats_endpoint(self, client):
+        """Test queue stats are exposed."""
+        response = client.get("/sessions/queue")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["active_sessions"] == 0
+        assert "turns_completed" in data
@@ -0,0 +1,315 @@
+"""
+Tests for the in-process NumPy vector index.
+"""
+import threading
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from vector_index import (STORE_NAME, MappedDocuments, NumpyVectorIndex, collection_space, export_vector_store,
+                          open_current_store, open_vector_store)
+
+VECTORS = {
+    "karveth#0": [1.0, 0.0, 0.0],
+    "karveth#1": [0.9, 0.1, 0.0],
+    "veyra#0": [0.0, 1.0, 0.0],
+    "windrunner#0": [0.0, 0.0, 3.0],
+}
+
+
+class VectorCollection:
+    """Collection stand-in that serves stored embeddings and embeds text by lookup"""
+
+    def __init__(self, vectors, space="l2"):
+        self.vectors = dict(vectors)
+        self.configuration = {"hnsw": {"space": space}}
+        self.gets = 0
+
+    def get(self, include=None, limit=None, offset=0):
+        self.gets += 1
+        ids = list(self.vectors)[offset:offset + limit]
+        return {"ids": ids, "embeddings": np.array([self.vectors[i] for i in ids]),
+                "documents": [f"text of {i}" for i in ids],
+                "metadatas": [{"filename": i.split("#")[0] + ".md"} for i in ids]}
+
+    def _embed(self, input, is_query=False):
+        return [np.array(self.vectors[text], dtype=np.float32) for text in input]
+
+    def count(self):
+        return len(self.vectors)
+
+
+class BlockingCollection(VectorCollection):
+    """Collection whose reads wait for release (set by default), flagging reading when one starts"""
+
+    def __init__(self, vectors, space="l2"):
+        super().__init__(vectors, space)
+        self.reading = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def get(self, include=None, limit=None, offset=0):
+        self.reading.set()
+        self.release.wait(timeout=5)
+        return super().get(include=include, limit=limit, offset=offset)
+
+
+@pytest.mark.unit
+class TestNumpyVectorIndex:
+    """Test exact search, distances and reloads."""
+
+    @pytest.mark.parametrize("space", ["l2", "cosine", "ip"])
+    def test_matches_brute_force(self, space):
+        """Test the top k and distances equal a direct computation in each space."""
+        index = NumpyVectorIndex(VectorCollection(VECTORS, space), page_size=3)
+        matrix = np.array(list(VECTORS.values()))
+        query = np.array([0.8, 0.3, 0.1])
+
+        if space == "l2":
+            expected = ((matrix - query) ** 2).sum(axis=1)
+        elif space == "cosine":
+            expected = 1 - matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query))
+        else:
+            expected = 1 - matrix @ query
+        order = np.argsort(expected)[:3]
+
+        results = index.query(query_embeddings=[query], n_results=3)
+
+        assert results["ids"][0] == [list(VECTORS)[i] for i in order]
+        assert np.allclose(results["distances"][0], expected[order], atol=1e-5)
+        assert index.stats()["vectors"] == 4 and index.space == space
+
+    def test_batch_of_texts(self):
+        """Test several texts are embedded and answered in one call, one result row each."""
+        index = NumpyVectorIndex(VectorCollection(VECTORS))
+
+        results = index.query(query_texts=["veyra#0", "windrunner#0"], n_results=2)
+
+        assert [ids[0] for ids in results["ids"]] == ["veyra#0", "windrunner#0"]
+        assert results["distances"][0][0] == pytest.approx(0.0)
+        assert results["metadatas"][1][0]["filename"] == "windrunner.md"
+
+    def test_more_results_than_vectors(self):
+        """Test asking for more than the corpus returns all of it in order."""
+        index = NumpyVectorIndex(VectorCollection(VECTORS))
+        results = index.query(query_embeddings=[[1.0, 0.0, 0.0]], n_results=10)
+        assert results["ids"][0][:2] == ["karveth#0", "karveth#1"]
+        assert len(results["ids"][0]) == 4
+
+    def test_empty_collection(self):
+        """Test an empty collection answers with empty rows."""
+        index = NumpyVectorIndex(VectorCollection({}))
+        assert index.query(query_embeddings=[[1.0, 0.0, 0.0]], n_results=3)["ids"] == [[]]
+
+    def test_reloads_when_version_changes(self):
+        """Test vectors written after a sync become searchable once the background reload lands."""
+        collection = VectorCollection(VECTORS)
+        version = {"value": 0}
+        index = NumpyVectorIndex(collection, version=lambda: version["value"])
+
+        index.query(query_embeddings=[[0.0, 1.0, 0.0]], n_results=1)
+        index.query(query_embeddings=[[0.0, 1.0, 0.0]], n_results=1)
+        assert index.loads == 1
+        assert index.reload_in_background() is None  # Nothing changed
+
+        collection.vectors["orrin#0"] = [0.0, 0.9, 0.9]
+        version["value"] += 1
+        index.reload_in_background().join(timeout=5)
+        results = index.query(query_embeddings=[[0.0, 1.0, 1.0]], n_results=1)
+
+        assert index.loads == 2
+        assert results["ids"] == [["orrin#0"]]
+
+    def test_queries_serve_the_old_snapshot_during_a_reload(self):
+        """Test a query after a sync neither waits for nor runs the reload itself."""
+        collection = BlockingCollection(VECTORS)
+        version = {"value": 0}
+        index = NumpyVectorIndex(collection, version=lambda: version["value"])
+        index.load()
+
+        collection.vectors["orrin#0"] = [0.0, 0.9, 0.9]
+        collection.release.clear()
+        version["value"] += 1
+        results = index.query(query_embeddings=[[0.0, 1.0, 1.0]], n_results=1)  # Starts the reload
+
+        assert results["ids"] == [["veyra#0"]]
+        assert collection.reading.wait(timeout=5)
+        assert index.query(query_embeddings=[[0.0, 1.0, 1.0]], n_results=1)["ids"] == [["veyra#0"]]
+        assert index.reload_in_background() is None  # Already running
+
+        collection.release.set()
+        deadline = time.monotonic() + 5
+        while index.loads < 2:
+            assert time.monotonic() < deadline, "background reload never finished"
+            time.sleep(0.01)
+        assert index.query(query_embeddings=[[0.0, 1.0, 1.0]], n_results=1)["ids"] == [["orrin#0"]]
+
+    def test_space_defaults_to_l2(self):
+        """Test collections without an HNSW configuration are searched with Chroma's default."""
+        assert collection_space(object()) == "l2"
+
+
+@pytest.mark.unit
+class TestChromaParity:
+    """Test the index against a real Chroma collection."""
+
+    def test_same_neighbours_as_chroma(self, tmp_path):
+        """Test the exact search returns Chroma's ids and distances on a small collection."""
+        import chromadb
+        from chromadb.api.client import SharedSystemClient
+        from chromadb.config import Settings
+        from benchmarks.hashing_embeddings import HashingEmbeddingFunction
+        from benchmarks.synthetic_lore import generate_vault, seed_collection
+
+        client = chromadb.PersistentClient(path=str(tmp_path / "chroma"), settings=Settings(anonymized_telemetry=False))
+        try:
+            collection = client.create_collection("lore", embedding_function=HashingEmbeddingFunction())
+            seed_collection(collection, generate_vault(40))
+            questions = ["the silver skyship", "who guards the ruins"]
+
+            exact = NumpyVectorIndex(collection).query(query_texts=questions, n_results=5)
+            chroma = collection.query(query_texts=questions, n_results=5)
+
+            assert exact["ids"] == chroma["ids"]
+            assert np.allclose(exact["distances"], chroma["distances"], atol=1e-4)
+        finally:
+            SharedSystemClient.clear_system_cache()
+
+
+@pytest.mark.unit
+class TestVectorStore:
+    """Test exporting the vectors and searching the memory-mapped export."""
+
+    def test_export_round_trip(self, tmp_path):
+        """Test the mapped snapshot holds the same ids, documents and vectors and searches the same."""
+        index = NumpyVectorIndex(VectorCollection(VECTORS, "cosine"))
+        snapshot = index.current()
+        info = export_vector_store(tmp_path, snapshot, "cosine", "abc")
+
+        opened, mapped = open_vector_store(tmp_path)
+        query = [[0.8, 0.3, 0.1]]
+        stored = NumpyVectorIndex(None)
+        stored.space = "cosine"
+        stored._set(mapped, 0, "store", 0.0)
+
+        assert (info["count"], info["dimensions"], opened["fingerprint"]) == (4, 3, "abc")
+        assert isinstance(mapped[3], np.memmap)
+        assert mapped[0] == snapshot[0] and list(mapped[1]) == snapshot[1] and mapped[2] == snapshot[2]
+        assert stored.query(query_embeddings=query, n_results=3) == index.query(query_embeddings=query, n_results=3)
+
+    def test_documents_decode_by_offset(self, tmp_path):
+        """Test non-ASCII and empty documents come back intact."""
+        snapshot = (["a", "b", "c"], ["Ælfwyn of Veyra", None, "Karveth"], [{}, {}, {}],
+                    np.eye(3, dtype=np.float32), np.ones(3, dtype=np.float32))
+        export_vector_store(tmp_path, snapshot, "l2", "abc")
+
+        documents = open_vector_store(tmp_path)[1][1]
+
+        assert isinstance(documents, MappedDocuments)
+        assert list(documents) == ["Ælfwyn of Veyra", "", "Karveth"]
+        assert documents[1:] == ["", "Karveth"]
+
+    def test_load_prefers_a_current_store(self, tmp_path):
+        """Test a matching fingerprint maps the store, and a stale one re-reads and replaces it."""
+        collection = VectorCollection(VECTORS)
+        fingerprint = {"value": "v1"}
+
+        def make_index():
+            return NumpyVectorIndex(collection, store_path=tmp_path, fingerprint=lambda: fingerprint["value"])
+
+        first = make_index()
+        first.load()
+        gets = collection.gets
+        second = make_index()
+        second.load()
+
+        assert (first.source, first.exports) == ("collection", 1)
+        assert (second.source, second.stats()["mapped"], collection.gets) == ("store", True, gets)
+        assert second.query(query_texts=["veyra#0"], n_results=1)["ids"] == [["veyra#0"]]
+
+        fingerprint["value"] = "v2"
+        third = make_index()
+        third.load()
+
+        assert (third.source, collection.gets > gets) == ("collection", True)
+        assert open_vector_store(tmp_path)[0]["fingerprint"] == "v2"
+        assert len(list(tmp_path.iterdir())) == 5  # store.json and one generation of data files
+
+    def test_missing_store(self, tmp_path):
+        """Test there is nothing to open without an export."""
+        assert open_vector_store(tmp_path) is None
+        assert NumpyVectorIndex.from_store(tmp_path) is None
+        assert open_current_store(tmp_path) is None
+
+    def test_cli_store_matches_chroma(self, tmp_path):
+        """Test a store opened without Chroma embeds queries itself and answers like the collection."""
+        import chromadb
+        from chromadb.api.client import SharedSystemClient
+        from chromadb.config import Settings
+        from benchmarks.hashing_embeddings import HashingEmbeddingFunction
+        from benchmarks.synthetic_lore import generate_vault, seed_collection
+        from lore_ingest import MANIFEST_NAME, read_manifest_fingerprint
+
+        chroma_path = tmp_path / "chroma"
+        client = chromadb.PersistentClient(path=str(chroma_path), settings=Settings(anonymized_telemetry=False))
+        questions = ["the silver skyship", "who guards the ruins"]
+        try:
+            collection = client.create_collection("lore", embedding_function=HashingEmbeddingFunction())
+            seed_collection(collection, generate_vault(40))
+            (chroma_path / MANIFEST_NAME).write_text('{"files": {"Karveth.md": {"sha256": "1", "chunks": 3}}}')
+            fingerprint = read_manifest_fingerprint(chroma_path / MANIFEST_NAME)
+            NumpyVectorIndex(collection, store_path=chroma_path / STORE_NAME, fingerprint=lambda: fingerprint).load()
+            chroma = collection.query(query_texts=questions, n_results=5)
+        finally:
+            SharedSystemClient.clear_system_cache()
+
+        mapped = open_current_store(chroma_path)
+
+        assert mapped.count() == 40 and mapped.collection is None
+        results = mapped.query(query_texts=questions, n_results=5)
+        assert results["ids"] == chroma["ids"]
+        assert np.allclose(results["distances"], chroma["distances"], atol=1e-4)
+
+        (chroma_path / MANIFEST_NAME).write_text('{"files": {"Karveth.md": {"sha256": "2", "chunks": 3}}}')
+        assert open_current_store(chroma_path) is None
+
+
+@pytest.mark.unit
+class TestLoreKeeperNumpy:
+    """Test LoreKeeperAgent on the numpy backend."""
+
+    async def test_agent_with_cache(self):
+        """Test the agent and query cache use the index in place of the collection."""
+        from api_server import LoreKeeperAgent
+        from lore_cache import LoreQueryCache
+
+        collection = VectorCollection(VECTORS)
+        agent = LoreKeeperAgent(NumpyVectorIndex(collection), n_results=2, cache=LoreQueryCache())
+
+        state = await agent({"user_input": "karveth#0"})
+
+        assert state["relevant_lore"] == ["karveth.md"]
+        assert collection.gets == 1
+
+
+@pytest.mark.api
+class TestRetrievalEndpoint:
+    """Test the vector backend shows up in /lore/retrieval."""
+
+    def test_numpy_backend_reported(self, client):
+        """Test the index size is reported when the numpy backend is active."""
+        index = NumpyVectorIndex(VectorCollection(VECTORS))
+        index.load()
+
+        with patch('api_server.lore_vectors', index):
+            stats = client.get("/lore/retrieval").json()
+
+        assert stats["vector_backend"] == "numpy"
+        assert (stats["vectors"]["vectors"], stats["vectors"]["dimensions"]) == (4, 3)
+
+    def test_chroma_backend_by_default(self, client):
+        """Test Chroma is the default backend."""
+        with patch('api_server.lore_vectors', None):
+            assert client.get("/lore/retrieval").json()["vector_backend"] == "chroma"
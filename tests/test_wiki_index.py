@@ -0,0 +1,219 @@
+"""
+Tests for the per-wiki page index.
+"""
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from wiki_index import WikiIndex, wiki_collection_name
+from wiki_manager import WikiManager
+
+LYSSIA = "# Lyssia\n\n## Description\n\nLyssia pilots the Windrunner, a skyship with silver sails.\n"
+KARVETH = "# Karveth\n\n## Description\n\nKarveth is a buried citadel under the southern desert.\n"
+
+
+@pytest.fixture
+def chroma(tmp_path):
+    import chromadb
+    from chromadb.api.client import SharedSystemClient
+    from chromadb.config import Settings
+
+    client = chromadb.PersistentClient(path=str(tmp_path / "chroma"), settings=Settings(anonymized_telemetry=False))
+    yield client
+    SharedSystemClient.clear_system_cache()
+
+
+def make_index(chroma, manager):
+    from benchmarks.hashing_embeddings import HashingEmbeddingFunction
+    return WikiIndex(chroma, manager.wikis_dir, embedding_function=HashingEmbeddingFunction(),
+                     debounce=0.05, max_delay=0.5)
+
+
+async def wait_for(condition, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for the wiki index"
+        await asyncio.sleep(0.02)
+
+
+def indexed_pages(index, safe_name):
+    """Pages the wiki's worker has finished syncing (None while it is busy or not yet opened)"""
+    if index._queued or safe_name not in index._wikis:
+        return None
+    indexer, watcher = index._wikis[safe_name]
+    if not watcher.initial_sync_done or watcher.pending or watcher._in_flight:
+        return None
+    return sorted(indexer.manifest["files"])
+
+
+@pytest.mark.unit
+class TestWikiManagerListeners:
+    """Test page writes and deletes are reported."""
+
+    def test_write_and_delete_notify(self, tmp_path):
+        """Test listeners get the safe wiki name and the page's relative path."""
+        manager = WikiManager(user_data_dir=str(tmp_path / "user_data"))
+        manager.create_wiki("Sky Pirates")
+        events = []
+        manager.page_listeners.append(lambda wiki, path: events.append((wiki, path)))
+
+        manager.write_wiki_page("Sky Pirates", "characters", "Lyssia Vane", LYSSIA)
+        manager.delete_wiki_page("Sky Pirates", "characters", "Lyssia Vane")
+        manager.delete_wiki_page("Sky Pirates", "characters", "Nobody")
+
+        assert events == [("sky_pirates", "characters/lyssia_vane.md")] * 2
+
+    def test_collection_names_are_valid(self):
+        """Test collection names end in a letter or digit."""
+        assert wiki_collection_name("sky_pirates") == "wiki_sky_pirates"
+        assert wiki_collection_name("campaign_") == "wiki_campaign"
+
+
+@pytest.mark.unit
+class TestWikiIndex:
+    """Test the background worker against a real Chroma client."""
+
+    async def test_writes_are_indexed_off_the_request_path(self, tmp_path, chroma):
+        """Test written pages become searchable, and a deleted page disappears."""
+        manager = WikiManager(user_data_dir=str(tmp_path / "user_data"))
+        manager.create_wiki("Sky Pirates")
+        index = make_index(chroma, manager)
+        index.start()
+        manager.page_listeners.append(index.on_page_change)
+        try:
+            manager.write_wiki_page("Sky Pirates", "characters", "Lyssia", LYSSIA)
+            manager.write_wiki_page("Sky Pirates", "locations", "Karveth", KARVETH)
+            # The write returned before the wiki's collection was even opened
+            assert "sky_pirates" not in index._wikis
+            assert index._queued == {"sky_pirates": {"characters/lyssia.md", "locations/karveth.md"}}
+
+            await wait_for(lambda: "locations/karveth.md" in (indexed_pages(index, "sky_pirates") or []))
+            rows = await asyncio.to_thread(index.query, "Sky Pirates", ["silver sails skyship", "buried citadel"], 1)
+
+            assert rows[0]["metadatas"][0][0]["filename"] == "wiki/characters/lyssia.md"
+            assert rows[1]["ids"][0][0].startswith("wiki:sky_pirates/locations/karveth.md#")
+
+            manager.delete_wiki_page("Sky Pirates", "characters", "Lyssia")
+            await wait_for(lambda: "characters/lyssia.md" not in (indexed_pages(index, "sky_pirates") or ["characters/lyssia.md"]))
+            rows = await asyncio.to_thread(index.query, "Sky Pirates", ["silver sails skyship"], 50)
+            filenames = {m["filename"] for m in rows[0]["metadatas"][0]}
+            assert "wiki/locations/karveth.md" in filenames
+            assert "wiki/characters/lyssia.md" not in filenames
+        finally:
+            await index.stop()
+
+    async def test_collection_opened_off_the_event_loop(self, tmp_path, chroma):
+        """Test a wiki's first page write opens its collection on a worker thread."""
+        manager = WikiManager(user_data_dir=str(tmp_path / "user_data"))
+        manager.create_wiki("Sky Pirates")
+        index = make_index(chroma, manager)
+        threads = []
+        open_collection = chroma.get_or_create_collection
+
+        def recording_open(**kwargs):
+            threads.append(threading.current_thread())
+            return open_collection(**kwargs)
+
+        index.start()
+        manager.page_listeners.append(index.on_page_change)
+        try:
+            with patch.object(chroma, "get_or_create_collection", side_effect=recording_open):
+                manager.write_wiki_page("Sky Pirates", "characters", "Lyssia", LYSSIA)
+                assert threads == []
+                await wait_for(lambda: "characters/lyssia.md" in (indexed_pages(index, "sky_pirates") or []))
+
+            assert len(threads) == 1 and threads[0] is not threading.main_thread()
+        finally:
+            await index.stop()
+
+    async def test_existing_pages_are_caught_up(self, tmp_path, chroma):
+        """Test pages written before the index existed are indexed on first use."""
+        manager = WikiManager(user_data_dir=str(tmp_path / "user_data"))
+        manager.create_wiki("Sky Pirates")
+        manager.write_wiki_page("Sky Pirates", "characters", "Lyssia", LYSSIA)
+        index = make_index(chroma, manager)
+        index.start()
+        try:
+            # The first query starts the wiki's worker; its catch-up sync may not be done yet
+            await asyncio.to_thread(index.query, "Sky Pirates", ["Lyssia"], 3)
+            await wait_for(lambda: "characters/lyssia.md" in (indexed_pages(index, "sky_pirates") or []))
+            assert await asyncio.to_thread(index.query, "Sky Pirates", ["Lyssia"], 3)
+        finally:
+            await index.stop()
+
+    def test_unknown_wiki(self, tmp_path, chroma):
+        """Test a wiki that doesn't exist has no results and gets no collection."""
+        manager = WikiManager(user_data_dir=str(tmp_path / "user_data"))
+        index = make_index(chroma, manager)
+        assert index.query("Nowhere", ["Lyssia"], 3) is None
+        assert index._wikis == {}
+
+
+class FakeWikiIndex:
+    def __init__(self, distance):
+        self.distance = distance
+        self.calls = []
+
+    def query(self, wiki_name, queries, n_results):
+        self.calls.append((wiki_name, list(queries)))
+        return [{"ids": [["wiki:sky/characters/lyssia.md#0"]], "documents": [["Lyssia\\n\\nShe lost an eye."]],
+                 "metadatas": [[{"filename": "wiki/characters/lyssia.md"}]], "distances": [[self.distance]]}]
+
+
+class VaultCollection:
+    def query(self, query_texts, n_results):
+        return {"ids": [["Karveth.md", "Veyra.md"]], "documents": [["Karveth lore.", "Veyra lore."]],
+                "metadatas": [[{"filename": "Karveth.md"}, {"filename": "Veyra.md"}]], "distances": [[0.3, 0.6]]}
+
+
+@pytest.mark.unit
+class TestLoreKeeperWiki:
+    """Test LoreKeeperAgent merges the session's wiki pages with the vault."""
+
+    async def test_wiki_pages_merged_by_distance(self):
+        """Test a wiki page ranks between vault files by its distance."""
+        from api_server import LoreKeeperAgent
+
+        wiki = FakeWikiIndex(distance=0.4)
+        agent = LoreKeeperAgent(VaultCollection(), n_results=3, wiki_index=wiki, session_wikis={"s1": "Sky"})
+
+        state = await agent({"user_input": "Tell me about Lyssia", "session_id": "s1"})
+
+        assert wiki.calls == [("Sky", ["Tell me about Lyssia"])]
+        assert "wiki/characters/lyssia.md" in state["relevant_lore"]
+        assert "She lost an eye." in state["lore_context"]
+
+    async def test_sessions_without_a_wiki(self):
+        """Test sessions not tied to a wiki search the vault only."""
+        from api_server import LoreKeeperAgent
+
+        wiki = FakeWikiIndex(distance=0.1)
+        agent = LoreKeeperAgent(VaultCollection(), wiki_index=wiki, session_wikis={"s1": "Sky"})
+
+        state = await agent({"user_input": "Tell me about Lyssia", "session_id": "other"})
+
+        assert wiki.calls == []
+        assert state["relevant_lore"] == ["Karveth.md", "Veyra.md"]
+
+
+@pytest.mark.api
+class TestWikiIndexEndpoint:
+    """Test the status endpoint and session -> wiki bookkeeping."""
+
+    def test_disabled_by_default(self, client):
+        """Test the status endpoint reports the index as off."""
+        with patch('api_server.wiki_index', None):
+            assert client.get("/lore/wiki-index").json() == {"enabled": False}
+
+    def test_loading_a_wiki_session_ties_it_to_the_wiki(self, client):
+        """Test loading a session from a wiki makes that wiki the session's lore source."""
+        import api_server
+
+        client.post("/wiki/create", json={"name": "Sky Pirates"})
+        api_server.wiki_manager.save_session_to_wiki("Sky Pirates", "s42", [])
+
+        assert client.get("/wiki/Sky Pirates/session/s42").status_code == 200
+        assert api_server.session_wikis["s42"] == "Sky Pirates"
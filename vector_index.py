@@ -0,0 +1,429 @@
+"""
+DOAMMO Vector Index
+In-process NumPy vector index over the lore collection's embeddings, and a
+memory-mapped export of them that opens without reading the collection
+"""
+
+import json
+import mmap
+import os
+import threading
+import time
+from collections.abc import Sequence
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from lore_ingest import MANIFEST_NAME, read_manifest_fingerprint
+
+VECTOR_BACKENDS = ("chroma", "numpy")
+DISTANCE_SPACES = ("l2", "cosine", "ip")
+
+STORE_NAME = "vector_store"  # Directory inside CHROMA_PATH
+STORE_VERSION = 1
+STORE_SIDECAR = "store.json"
+
+
+def collection_space(collection) -> str:
+    """Distance space of a Chroma collection (Chroma's default is squared L2)"""
+    configuration = getattr(collection, "configuration", None) or {}
+    hnsw = configuration.get("hnsw") if isinstance(configuration, dict) else None
+    space = (hnsw or {}).get("space") or "l2"
+    return space if space in DISTANCE_SPACES else "l2"
+
+
+def embedding_function_config(embedding_function) -> Optional[Dict]:
+    """{"name", "config"} of a Chroma embedding function, or None if it can't be rebuilt from config"""
+    try:
+        return {"name": embedding_function.name(), "config": embedding_function.get_config()}
+    except Exception:
+        return None
+
+
+class MappedDocuments(Sequence):
+    """Documents in one memory-mapped UTF-8 blob, decoded on access"""
+
+    def __init__(self, path: Path, offsets: np.ndarray):
+        self.offsets = offsets
+        self._blob = b""
+        if path.stat().st_size:
+            with open(path, "rb") as f:
+                self._blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        return self._blob[self.offsets[row]:self.offsets[row + 1]].decode("utf-8")
+
+
+def export_vector_store(directory: Path, snapshot, space: str, fingerprint: str,
+                        embedding_function=None) -> Dict:
+    """
+    Write a snapshot as flat files a later process can memory-map (blocking).
+
+    The matrix (float32, rows already normalized for cosine) and its squared
+    norms are raw arrays; documents are one UTF-8 blob with an int64 offsets
+    array. Ids, metadatas, the distance space, the embedding function's
+    config and the fingerprint of the content go in the store.json sidecar.
+    Each export writes new generation-named data files and then swaps the
+    sidecar in, so readers see the old store or the new one, never a mix.
+    Returns the sidecar without ids and metadatas.
+    """
+    ids, documents, metadatas, matrix, squared_norms = snapshot
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    generation = f"{time.time_ns():x}-{os.getpid()}"
+    files = {
+        "matrix": f"embeddings-{generation}.f32",
+        "norms": f"norms-{generation}.f32",
+        "documents": f"documents-{generation}.bin",
+        "offsets": f"offsets-{generation}.i64"
+    }
+
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    matrix.tofile(directory / files["matrix"])
+    np.ascontiguousarray(squared_norms, dtype=np.float32).tofile(directory / files["norms"])
+    encoded = [(document or "").encode("utf-8") for document in documents]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(data) for data in encoded], out=offsets[1:])
+    with open(directory / files["documents"], "wb") as f:
+        f.writelines(encoded)
+    offsets.tofile(directory / files["offsets"])
+
+    info = {
+        "version": STORE_VERSION,
+        "fingerprint": fingerprint,
+        "space": space,
+        "count": len(ids),
+        "dimensions": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+        "files": files,
+        "embedding_function": embedding_function_config(embedding_function) if embedding_function else None,
+        "exported": datetime.now().isoformat()
+    }
+    sidecar = directory / STORE_SIDECAR
+    previous = _read_sidecar(directory)
+    tmp_path = sidecar.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(dict(info, ids=list(ids), metadatas=list(metadatas)), f)
+    os.replace(tmp_path, sidecar)
+
+    # The generation this one replaced. Processes that mapped it keep their
+    # pages (POSIX); where the OS refuses (Windows), the files stay behind
+    for name in (previous or {}).get("files", {}).values():
+        if name not in files.values():
+            try:
+                (directory / name).unlink()
+            except OSError:
+                pass
+    return info
+
+
+def _read_sidecar(directory: Path) -> Optional[Dict]:
+    try:
+        with open(Path(directory) / STORE_SIDECAR, "r", encoding="utf-8") as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return info if info.get("version") == STORE_VERSION else None
+
+
+def open_vector_store(directory: Path) -> Optional[Tuple[Dict, Tuple]]:
+    """
+    The sidecar and a memory-mapped snapshot of an exported store, or None
+    if there is none (or it is unreadable). Nothing but the sidecar is read
+    up front: the OS pages the matrix and documents in as searches touch
+    them, and every process mapping the same files shares those pages.
+    """
+    directory = Path(directory)
+    info = _read_sidecar(directory)
+    if info is None:
+        return None
+    count, dimensions = info["count"], info["dimensions"]
+    files = {key: directory / name for key, name in info["files"].items()}
+    try:
+        if count and dimensions:
+            matrix = np.memmap(files["matrix"], dtype=np.float32, mode="r", shape=(count, dimensions))
+            squared_norms = np.memmap(files["norms"], dtype=np.float32, mode="r", shape=(count,))
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+            squared_norms = np.zeros(0, dtype=np.float32)
+        offsets = np.memmap(files["offsets"], dtype=np.int64, mode="r", shape=(count + 1,))
+        documents = MappedDocuments(files["documents"], offsets)
+    except (OSError, ValueError):
+        return None
+    if len(info["ids"]) != count or len(info["metadatas"]) != count:
+        return None
+    return info, (info.pop("ids"), documents, info.pop("metadatas"), matrix, squared_norms)
+
+
+class NumpyVectorIndex:
+    """
+    Exact nearest-neighbour search over every embedding in a collection.
+
+    All vectors live in one contiguous float32 matrix loaded from the
+    collection, so a batch of queries is a single matrix product plus an
+    argpartition per row. For a corpus of a few thousand chunks this is
+    exact and faster than a round trip through Chroma's HNSW segment.
+
+    It answers query() with Chroma's result shape and distances (in the
+    collection's own space), and hands embedding and get() through to the
+    collection, so LoreKeeperAgent, LoreQueryCache and HybridRetriever use
+    it in place of the collection. Writes still go to Chroma; the matrix is
+    reloaded when version() changes. Only the first load blocks: after
+    that, a stale snapshot is reloaded on a background thread (started by
+    reload_in_background() after each sync, or by the first search that
+    notices) while searches keep using the previous one.
+
+    With a store_path and a fingerprint() of the collection's content, a
+    load maps the exported store instead when its fingerprint matches, and
+    re-exports it after reading the collection otherwise.
+    """
+
+    def __init__(self, collection, version: Optional[Callable[[], int]] = None, page_size: int = 1000,
+                 store_path: Optional[Path] = None, fingerprint: Optional[Callable[[], Optional[str]]] = None):
+        self.collection = collection
+        self.version = version or (lambda: 0)
+        self.page_size = page_size
+        self.space = collection_space(collection) if collection is not None else "l2"
+        self.store_path = Path(store_path) if store_path else None
+        self.fingerprint = fingerprint
+        self.embedding_function = None  # Set when searching a store without its collection
+        # (ids, documents, metadatas, matrix, squared norms), swapped as a whole on reload
+        self._snapshot: Optional[Tuple[List[str], List[str], List[Dict], np.ndarray, np.ndarray]] = None
+        self.snapshot_version = None
+        self._rows = (None, {})  # (snapshot, id -> row), built on first embeddings() lookup
+        self.source = None  # "collection" or "store"
+        self.exports = 0
+        self.loads = 0
+        self.last_load_seconds = None
+        self._load_lock = threading.Lock()
+
+    @classmethod
+    def from_store(cls, store_path: Path, fingerprint: Optional[str] = None) -> Optional["NumpyVectorIndex"]:
+        """
+        A read-only index over an exported store, without opening Chroma
+        (blocking). Queries are embedded by the function recorded in the
+        sidecar. None if there is no store, it doesn't match the given
+        fingerprint, or its embedding function can't be rebuilt.
+        """
+        opened = open_vector_store(store_path)
+        if opened is None:
+            return None
+        info, snapshot = opened
+        if fingerprint is not None and info["fingerprint"] != fingerprint:
+            return None
+        try:
+            from chromadb.utils.embedding_functions import config_to_embedding_function
+            embedding_function = config_to_embedding_function(info["embedding_function"])
+        except Exception:
+            return None
+        index = cls(None, store_path=store_path)
+        index.space = info["space"]
+        index.embedding_function = embedding_function
+        index._set(snapshot, 0, "store", 0.0)
+        return index
+
+    def _set(self, snapshot, version, source: str, seconds: float):
+        self._snapshot = snapshot
+        self.snapshot_version = version
+        self.source = source
+        self.last_load_seconds = round(seconds, 3)
+        self.loads += 1
+
+    def load(self):
+        """Map the exported store if it is current, else read every embedding from the collection (blocking)"""
+        version = self.version()
+        start = time.perf_counter()
+        # Taken before reading, so a sync landing mid-read leaves a stale fingerprint, not a wrong one
+        fingerprint = self.fingerprint() if self.store_path and self.fingerprint else None
+        if fingerprint is not None:
+            opened = open_vector_store(self.store_path)
+            if opened and opened[0]["fingerprint"] == fingerprint and opened[0]["space"] == self.space:
+                self._set(opened[1], version, "store", time.perf_counter() - start)
+                return
+
+        snapshot = self._read_collection()
+        if fingerprint is not None:
+            export_vector_store(self.store_path, snapshot, self.space, fingerprint,
+                                getattr(self.collection, "_embedding_function", None))
+            self.exports += 1
+        self._set(snapshot, version, "collection", time.perf_counter() - start)
+
+    def _read_collection(self) -> Tuple[List[str], List[str], List[Dict], np.ndarray, np.ndarray]:
+        ids, documents, metadatas, blocks = [], [], [], []
+        offset = 0
+        while True:
+            page = self.collection.get(include=["embeddings", "documents", "metadatas"],
+                                       limit=self.page_size, offset=offset)
+            ids += page["ids"]
+            documents += page["documents"]
+            metadatas += page["metadatas"]
+            if len(page["ids"]):
+                blocks.append(np.asarray(page["embeddings"], dtype=np.float32))
+            if len(page["ids"]) < self.page_size:
+                break
+            offset += self.page_size
+
+        matrix = np.ascontiguousarray(np.vstack(blocks)) if blocks else np.zeros((0, 0), dtype=np.float32)
+        if self.space == "cosine" and len(matrix):
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms == 0, 1, norms)
+        squared_norms = np.einsum("ij,ij->i", matrix, matrix)
+        return ids, documents, metadatas, matrix, squared_norms
+
+    def _stale(self) -> bool:
+        return self._snapshot is None or self.version() != self.snapshot_version
+
+    def refresh(self):
+        """
+        Load if there is no snapshot yet (blocking); if the collection
+        changed since the last load, start a reload in the background and
+        keep the current snapshot meanwhile
+        """
+        if self._snapshot is None:
+            with self._load_lock:
+                if self._snapshot is None:
+                    self.load()
+        elif self.version() != self.snapshot_version:
+            self.reload_in_background()
+
+    def reload_in_background(self) -> Optional[threading.Thread]:
+        """
+        Reload (and re-export the store) on a daemon thread if the snapshot
+        is stale and no load is running; returns the thread, if one started
+        """
+        if not self._stale() or not self._load_lock.acquire(blocking=False):
+            return None
+
+        def reload():
+            try:
+                # Syncs that land mid-load are picked up by another pass
+                while self._stale():
+                    self.load()
+            except Exception as e:
+                print(f"Vector index reload failed: {type(e).__name__}: {e}")
+            finally:
+                self._load_lock.release()
+
+        thread = threading.Thread(target=reload, name="vector-index-reload", daemon=True)
+        thread.start()
+        return thread
+
+    def current(self) -> Tuple[List[str], List[str], List[Dict], np.ndarray, np.ndarray]:
+        """The latest loaded snapshot (blocking only for the first load)"""
+        self.refresh()
+        return self._snapshot
+
+    def search(self, queries: np.ndarray, n_results: int, snapshot=None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Row numbers and distances of the n_results nearest vectors for each
+        query row, nearest first (blocking). Row numbers index the given
+        snapshot, or the current one.
+        """
+        _, _, _, matrix, squared_norms = snapshot or self.current()
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        k = min(n_results, len(matrix))
+        if k == 0:
+            return np.zeros((len(queries), 0), dtype=np.int64), np.zeros((len(queries), 0), dtype=np.float32)
+
+        if self.space == "cosine":
+            norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            queries = queries / np.where(norms == 0, 1, norms)
+        products = queries @ matrix.T
+        if self.space == "l2":
+            # |m - q|^2 = |m|^2 - 2 m.q + |q|^2
+            distances = squared_norms - 2 * products + np.einsum("ij,ij->i", queries, queries)[:, None]
+            np.maximum(distances, 0, out=distances)
+        else:
+            distances = 1 - products
+
+        if k < distances.shape[1]:
+            candidates = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(k), (len(queries), k))
+        candidate_distances = np.take_along_axis(distances, candidates, axis=1)
+        order = np.argsort(candidate_distances, axis=1, kind="stable")
+        return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_distances, order, axis=1)
+
+    def query(self, query_texts: Optional[List[str]] = None, query_embeddings=None,
+              n_results: int = 10, **_) -> Dict:
+        """Chroma-compatible query; a batch of texts is embedded and searched at once"""
+        if query_embeddings is None:
+            query_embeddings = self._embed(input=list(query_texts), is_query=True)
+        snapshot = self.current()
+        ids, documents, metadatas, _, _ = snapshot
+        rows, distances = self.search(np.asarray(query_embeddings, dtype=np.float32), n_results, snapshot)
+        return {
+            "ids": [[ids[i] for i in row] for row in rows],
+            "documents": [[documents[i] for i in row] for row in rows],
+            "metadatas": [[metadatas[i] for i in row] for row in rows],
+            "distances": distances.tolist()
+        }
+
+    def embeddings(self, ids: List[str]) -> Optional[np.ndarray]:
+        """
+        float32 (len(ids), dim) matrix of the given chunks' stored vectors
+        in ids order, zero rows for unknown ids, None if none are known.
+        Served from the snapshot, so MMR needs no round trip to Chroma.
+        Rows are unit length in cosine space (the direction is what counts).
+        """
+        snapshot = self.current()
+        indexed, rows = self._rows
+        if indexed is not snapshot:
+            rows = {doc_id: row for row, doc_id in enumerate(snapshot[0])}
+            self._rows = (snapshot, rows)
+        matrix = snapshot[3]
+        found = [(position, rows[doc_id]) for position, doc_id in enumerate(ids) if doc_id in rows]
+        if not found:
+            return None
+        vectors = np.zeros((len(ids), matrix.shape[1]), dtype=np.float32)
+        positions, matrix_rows = zip(*found)
+        vectors[list(positions)] = matrix[list(matrix_rows)]
+        return vectors
+
+    def _embed(self, input: List[str], is_query: bool = True):
+        if self.embedding_function is not None:
+            if is_query:
+                return self.embedding_function.embed_query(input=input)
+            return self.embedding_function(input)
+        # The collection's embedding function, as used by its own query(query_texts=...)
+        return self.collection._embed(input=input, is_query=is_query)
+
+    def get(self, **kwargs) -> Dict:
+        return self.collection.get(**kwargs)
+
+    def count(self) -> int:
+        if self.collection is None:
+            return len(self.current()[0])
+        return self.collection.count()
+
+    def stats(self) -> Dict:
+        matrix = self._snapshot[3] if self._snapshot is not None else None
+        return {
+            "space": self.space,
+            "vectors": int(matrix.shape[0]) if matrix is not None else 0,
+            "dimensions": int(matrix.shape[1]) if matrix is not None and matrix.ndim == 2 else 0,
+            "matrix_bytes": int(matrix.nbytes) if matrix is not None else 0,
+            "snapshot_version": self.snapshot_version,
+            "source": self.source,
+            "mapped": isinstance(matrix, np.memmap),
+            "exports": self.exports,
+            "loads": self.loads,
+            "last_load_seconds": self.last_load_seconds
+        }
+
+
+def open_current_store(chroma_path: Path) -> Optional[NumpyVectorIndex]:
+    """
+    A read-only index over the store exported next to a Chroma directory,
+    if the lore manifest there says it is current; None otherwise (blocking)
+    """
+    fingerprint = read_manifest_fingerprint(Path(chroma_path) / MANIFEST_NAME)
+    if fingerprint is None:
+        return None
+    return NumpyVectorIndex.from_store(Path(chroma_path) / STORE_NAME, fingerprint)
@@ -0,0 +1,143 @@
+"""
+DOAMMO Wiki Index
+Per-wiki vector collections kept in step with page writes by a background batch worker
+"""
+
+import asyncio
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from lore_cache import split_rows
+from lore_ingest import LoreIndexer
+from lore_watcher import VaultWatcher
+from wiki_manager import sanitize_name
+
+WIKI_MANIFEST_NAME = "index_manifest.json"
+
+
+def wiki_collection_name(safe_name: str) -> str:
+    """Chroma collection for a wiki (names must start and end with a letter or digit)"""
+    return f"wiki_{re.sub(r'[^a-z0-9_-]', '', safe_name)}".rstrip("_-")
+
+
+class WikiIndex:
+    """
+    Embeds each wiki's pages into its own collection, "wiki_<name>".
+
+    WikiManager reports page writes and deletes through on_page_change().
+    That only records the page and wakes a dispatcher task, which opens the
+    wiki's collection on a worker thread and hands the page on: a
+    VaultWatcher with the manual backend collects the queued pages of each
+    wiki and, after a short debounce,
+    syncs them in one batch on a worker thread through a LoreIndexer (the
+    same heading-aware chunks, hash manifest and batched upserts as the
+    vault). Page writes never wait for an embedding. Pages written while
+    the server was down are caught up by the full sync each wiki gets the
+    first time it is used.
+
+    Results come back with "wiki:"-prefixed ids and filenames under
+    "wiki/", so they never collide with vault chunks when merged.
+    """
+
+    def __init__(self, client, wikis_dir: Path, embedding_function=None, debounce: float = 0.5,
+                 max_delay: float = 5.0):
+        self.client = client
+        self.wikis_dir = Path(wikis_dir)
+        self.embedding_function = embedding_function
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._wikis: Dict[str, Tuple[LoreIndexer, VaultWatcher]] = {}
+        self._lock = threading.Lock()
+        self._queued: Dict[str, Set[str]] = {}  # safe name -> pages not yet handed to the wiki's worker
+        self._queue_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Remember the event loop the workers run on and start the dispatcher (call from it)"""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def stop(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+        await asyncio.gather(*(watcher.stop() for _, watcher in list(self._wikis.values())))
+
+    def _open(self, safe_name: str) -> Tuple[LoreIndexer, VaultWatcher]:
+        """The wiki's indexer and worker, created (and started) on first use"""
+        with self._lock:
+            entry = self._wikis.get(safe_name)
+            if entry is None:
+                options = {"embedding_function": self.embedding_function} if self.embedding_function else {}
+                collection = self.client.get_or_create_collection(
+                    name=wiki_collection_name(safe_name),
+                    metadata={"description": f"Pages of the '{safe_name}' wiki, chunked by heading"},
+                    **options
+                )
+                wiki_path = self.wikis_dir / safe_name
+                indexer = LoreIndexer(collection, wiki_path / "pages", wiki_path / WIKI_MANIFEST_NAME)
+                watcher = VaultWatcher(indexer, debounce=self.debounce, max_delay=self.max_delay, backend="manual")
+                entry = self._wikis[safe_name] = (indexer, watcher)
+                if self._loop is not None:
+                    self._loop.call_soon_threadsafe(watcher.start)
+            return entry
+
+    def on_page_change(self, safe_name: str, relative_path: str):
+        """WikiManager listener: queue a written or deleted page (cheap, any thread; opens nothing)"""
+        if self._loop is None:
+            return
+        with self._queue_lock:
+            self._queued.setdefault(safe_name, set()).add(relative_path)
+        self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _dispatch(self):
+        """Hand queued pages to their wiki's worker, opening new wikis on a worker thread"""
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            with self._queue_lock:
+                queued, self._queued = self._queued, {}
+            for safe_name, pages in queued.items():
+                try:
+                    _, watcher = await asyncio.to_thread(self._open, safe_name)
+                except Exception as e:
+                    print(f"Wiki index for '{safe_name}' failed to open: {type(e).__name__}: {e}")
+                    # Keep the pages queued and retry later
+                    with self._queue_lock:
+                        self._queued.setdefault(safe_name, set()).update(pages)
+                    self._loop.call_later(self.max_delay, self._wake.set)
+                    continue
+                watcher.notify(sorted(pages))
+
+    def query(self, wiki_name: str, queries: List[str], n_results: int) -> Optional[List[Dict]]:
+        """
+        One result per query from the wiki's pages (blocking), or None if
+        the wiki doesn't exist or has nothing indexed yet.
+        """
+        safe_name = sanitize_name(wiki_name)
+        if not safe_name or not (self.wikis_dir / safe_name).is_dir():
+            return None
+        indexer, _ = self._open(safe_name)
+        available = indexer.collection.count()
+        if not available:
+            return None
+        results = indexer.collection.query(query_texts=queries, n_results=min(n_results, available))
+        rows = split_rows(results) if len(queries) > 1 else [results]
+        for row in rows:
+            row["ids"] = [[f"wiki:{safe_name}/{doc_id}" for doc_id in row["ids"][0]]]
+            row["metadatas"] = [[dict(metadata, filename=f"wiki/{metadata['filepath']}")
+                                 for metadata in row["metadatas"][0]]]
+        return rows
+
+    def freshness(self) -> Dict:
+        """Per wiki: indexed pages and how far the index is behind the page writes"""
+        return {
+            safe_name: {**indexer.status(), "worker": watcher.freshness()}
+            for safe_name, (indexer, watcher) in list(self._wikis.items())
+        }
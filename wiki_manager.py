@@ -5,9 +5,19 @@ Handles wiki creation, storage, and retrieval for story sessions
 
 import json
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 from datetime import datetime
 
+from metrics import DISK_WRITE_SECONDS
+
+
+def sanitize_name(name: str) -> str:
+    """Convert name to filesystem-safe format"""
+    # Replace spaces with underscores, remove special characters
+    safe = name.replace(" ", "_")
+    safe = "".join(c for c in safe if c.isalnum() or c in "_-")
+    return safe.lower()
+
 
 class WikiManager:
     """Manages story wikis with sessions and markdown pages"""
@@ -23,6 +33,9 @@ class WikiManager:
         self.wikis_dir.mkdir(parents=True, exist_ok=True)
         self.chats_dir.mkdir(parents=True, exist_ok=True)
 
+        # Called as listener(safe wiki name, "category/page.md") after a page is written or deleted
+        self.page_listeners: List[Callable[[str, str], None]] = []
+
     # ========================================================================
     # Wiki Creation & Setup
     # ========================================================================
@@ -55,7 +68,7 @@ class WikiManager:
         }
 
         metadata_path = wiki_path / "wiki_metadata.json"
-        with open(metadata_path, 'w', encoding='utf-8') as f:
+        with DISK_WRITE_SECONDS.time(target="wiki_metadata"), open(metadata_path, 'w', encoding='utf-8') as f:
             json.dump(metadata, f, indent=2)
 
         # Create template examples
@@ -141,7 +154,7 @@ Outcomes and impacts
 
         for relative_path, content in templates.items():
             file_path = wiki_path / relative_path
-            with open(file_path, 'w', encoding='utf-8') as f:
+            with DISK_WRITE_SECONDS.time(target="wiki_page"), open(file_path, 'w', encoding='utf-8') as f:
                 f.write(content)
 
     # ========================================================================
@@ -198,7 +211,7 @@ Outcomes and impacts
             "conversation": conversation_history
         }
 
-        with open(session_path, 'w', encoding='utf-8') as f:
+        with DISK_WRITE_SECONDS.time(target="wiki_session"), open(session_path, 'w', encoding='utf-8') as f:
             json.dump(session_data, f, indent=2)
 
         # Update wiki metadata
@@ -208,7 +221,7 @@ Outcomes and impacts
         metadata['updated'] = datetime.now().isoformat()
 
         metadata_path = wiki_path / "wiki_metadata.json"
-        with open(metadata_path, 'w', encoding='utf-8') as f:
+        with DISK_WRITE_SECONDS.time(target="wiki_metadata"), open(metadata_path, 'w', encoding='utf-8') as f:
             json.dump(metadata, f, indent=2)
 
     def load_wiki_sessions(self, wiki_name: str) -> List[Dict]:
@@ -289,15 +302,16 @@ Outcomes and impacts
         # Ensure category directory exists
         page_path.parent.mkdir(parents=True, exist_ok=True)
 
-        with open(page_path, 'w', encoding='utf-8') as f:
+        with DISK_WRITE_SECONDS.time(target="wiki_page"), open(page_path, 'w', encoding='utf-8') as f:
             f.write(content)
+        self._page_changed(safe_name, category, safe_page)
 
         # Update wiki metadata timestamp
         metadata = self.get_wiki_metadata(wiki_name)
         metadata['updated'] = datetime.now().isoformat()
 
         metadata_path = self.wikis_dir / safe_name / "wiki_metadata.json"
-        with open(metadata_path, 'w', encoding='utf-8') as f:
+        with DISK_WRITE_SECONDS.time(target="wiki_metadata"), open(metadata_path, 'w', encoding='utf-8') as f:
             json.dump(metadata, f, indent=2)
 
     def delete_wiki_page(self, wiki_name: str, category: str, page_name: str):
@@ -308,6 +322,7 @@ Outcomes and impacts
 
         if page_path.exists():
             page_path.unlink()
+            self._page_changed(safe_name, category, safe_page)
 
     # ========================================================================
     # Utility Methods
@@ -315,7 +330,8 @@ Outcomes and impacts
 
     def _sanitize_name(self, name: str) -> str:
         """Convert name to filesystem-safe format"""
-        # Replace spaces with underscores, remove special characters
-        safe = name.replace(" ", "_")
-        safe = "".join(c for c in safe if c.isalnum() or c in "_-")
-        return safe.lower()
+        return sanitize_name(name)
+
+    def _page_changed(self, safe_name: str, category: str, safe_page: str):
+        for listener in self.page_listeners:
+            listener(safe_name, f"{category}/{safe_page}.md")